@@ -0,0 +1,168 @@
+"""Admin-only maintenance endpoints shared by both apps.
+
+Requests must carry ``X-Admin-Token`` matching ``LABCODE_ADMIN_TOKEN``.
+When no token is configured only loopback clients are allowed.
+"""
+import hmac
+import time
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+
+from config import env_str
+from rules import RulesError, reload_rules
+
+LOOPBACK_ADDRS = ("127.0.0.1", "::1")
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/api/admin")
+
+
+def is_admin():
+    """Whether the current request may use admin endpoints."""
+    token = env_str("ADMIN_TOKEN")
+    if token:
+        supplied = request.headers.get("X-Admin-Token", "")
+        return hmac.compare_digest(supplied.encode(), token.encode())
+    return request.remote_addr in LOOPBACK_ADDRS
+
+
+def admin_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin():
+            return jsonify({"error": "admin access required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin_bp.route("/cache", methods=["GET"])
+@admin_required
+def cache_stats():
+    return jsonify(current_app.extensions["explain_cache"].stats())
+
+
+@admin_bp.route("/cache/flush", methods=["POST"])
+@admin_required
+def cache_flush():
+    flushed = current_app.extensions["explain_cache"].clear()
+    return jsonify({"flushed": flushed})
+
+
+@admin_bp.route("/similarity", methods=["GET"])
+@admin_required
+def similarity_stats():
+    index = current_app.extensions.get("similarity_index")
+    if index is None:
+        return jsonify({"error": "similarity index is disabled"}), 503
+    return jsonify(index.stats())
+
+
+@admin_bp.route("/incremental", methods=["GET"])
+@admin_required
+def incremental_stats():
+    analyzer = current_app.extensions.get("incremental")
+    if analyzer is None:
+        return jsonify({"error": "incremental analysis is disabled"}), 503
+    return jsonify(analyzer.stats())
+
+
+@admin_bp.route("/admission", methods=["GET"])
+@admin_required
+def admission_stats():
+    admission = current_app.extensions.get("admission")
+    if admission is None:
+        return jsonify({"error": "admission control is disabled"}), 503
+    return jsonify(admission.stats())
+
+
+@admin_bp.route("/pathways", methods=["GET"])
+@admin_required
+def pathways_stats():
+    graph = current_app.extensions.get("concept_graph")
+    if graph is None:
+        return jsonify({"error": "concept graph is disabled"}), 503
+    return jsonify(graph.stats())
+
+
+@admin_bp.route("/progress", methods=["GET"])
+@admin_required
+def progress_stats():
+    log = current_app.extensions.get("progress_log")
+    if log is None:
+        return jsonify({"error": "progress tracking is disabled"}), 503
+    return jsonify(log.stats())
+
+
+@admin_bp.route("/progress/refresh", methods=["POST"])
+@admin_required
+def progress_refresh():
+    log = current_app.extensions.get("progress_log")
+    if log is None:
+        return jsonify({"error": "progress tracking is disabled"}), 503
+    start = time.perf_counter()
+    log.refresh()
+    return jsonify(dict(log.stats(), seconds=round(time.perf_counter() - start, 3)))
+
+
+@admin_bp.route("/dashboard/rebuild", methods=["POST"])
+@admin_required
+def dashboard_rebuild():
+    dashboard = current_app.extensions.get("class_dashboard")
+    if dashboard is None:
+        return jsonify({"error": "progress tracking is disabled"}), 503
+    start = time.perf_counter()
+    stats = dashboard.rebuild()
+    return jsonify(dict(stats, seconds=round(time.perf_counter() - start, 3)))
+
+
+@admin_bp.route("/profiling", methods=["GET", "POST"])
+@admin_required
+def profiling_settings():
+    """Turn profiling on or off: ``{enabled, sample}``. Each worker
+    process keeps its own setting."""
+    profiler = current_app.extensions["request_profiler"]
+    if request.method == "POST":
+        payload = request.get_json(force=True, silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({"error": "expected {enabled, sample}"}), 400
+        enabled = payload.get("enabled")
+        sample = payload.get("sample")
+        if enabled is not None and not isinstance(enabled, bool):
+            return jsonify({"error": "'enabled' must be true or false"}), 400
+        if sample is not None and (isinstance(sample, bool) or not isinstance(sample, (int, float))
+                                   or not 0 <= sample <= 1):
+            return jsonify({"error": "'sample' must be a number from 0 to 1"}), 400
+        profiler.configure(enabled, sample)
+    return jsonify(profiler.stats())
+
+
+@admin_bp.route("/profiles", methods=["GET"])
+@admin_required
+def profiles_slowest():
+    """The slowest profiled requests still kept, with their top functions."""
+    profiler = current_app.extensions["request_profiler"]
+    limit = min(request.args.get("limit", 10, type=int), 100)
+    functions = min(request.args.get("top", 15, type=int), 100)
+    return jsonify({"profiles": profiler.slowest(limit, functions)})
+
+
+@admin_bp.route("/profiles/<name>", methods=["GET"])
+@admin_required
+def profile_download(name):
+    """The raw ``pstats`` file, for snakeviz or ``python -m pstats``."""
+    path = current_app.extensions["request_profiler"].profile_path(name)
+    if path is None:
+        return jsonify({"error": "no such profile"}), 404
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                     download_name=name + ".prof")
+
+
+@admin_bp.route("/rules/reload", methods=["POST"])
+@admin_required
+def rules_reload():
+    # Cache keys include the rules version, so old entries simply stop matching.
+    try:
+        rules = reload_rules()
+    except (OSError, RulesError) as exc:
+        return jsonify({"error": f"rules not reloaded: {exc}"}), 400
+    return jsonify({"version": rules.version, "concepts": list(rules.order)})
@@ -0,0 +1,169 @@
+"""Admission control for ``/api/explain``: rate limits and a bounded queue.
+
+Off unless ``LABCODE_ADMISSION=1``. Every request then passes two checks
+before its body is read:
+
+* A token bucket per client (the ``X-Student-Id`` header, else the remote
+  address) refills at ``rate`` requests per second up to ``burst``. An
+  empty bucket is answered 429 with ``Retry-After`` set to when the next
+  token arrives.
+* At most ``slots`` requests are worked on at once. Others wait in a FIFO
+  queue of at most ``queue`` requests for up to ``wait`` seconds. A full
+  queue, or a wait that runs out, is answered 503 with ``Retry-After``
+  estimated from the queue length and recent service times.
+
+Refusing early is what keeps latency bounded under a spike: a request
+that would only finish after its client gave up costs as much as one that
+is answered, and delays everything queued behind it. The time spent
+waiting is the ``queue`` stage in ``/metrics``, and refusals are counted
+by reason.
+
+Each process keeps its own buckets and queue, so with ``serve.py
+--workers N`` the limits apply per worker.
+"""
+import math
+import threading
+from collections import OrderedDict, deque
+from time import monotonic
+
+from flask import jsonify
+
+from config import env_bool, env_float, env_int
+
+# Buckets kept before the least recently seen clients are forgotten; a
+# forgotten client starts again with a full bucket.
+MAX_CLIENTS = 10_000
+MAX_RETRY_AFTER = 60
+
+
+class Overloaded(Exception):
+    """A request refused by admission control."""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, min(MAX_RETRY_AFTER, math.ceil(retry_after)))
+
+    def response(self):
+        response = jsonify({"error": f"server busy ({self.reason}); retry later",
+                            "retry_after": self.retry_after})
+        response.status_code = self.status
+        response.headers["Retry-After"] = str(self.retry_after)
+        return response
+
+
+class AdmissionControl:
+    def __init__(self, slots=4, queue=64, wait=2.0, rate=5.0, burst=20):
+        self.slots = slots
+        self.queue = queue
+        self.wait = wait
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()  # Events of queued requests, oldest first
+        # Smoothed time a slot is held, for Retry-After estimates.
+        self._service = 0.05
+        self._rate_lock = threading.Lock()
+        self._buckets = OrderedDict()  # client -> [tokens, last refill]
+        self._counters = dict.fromkeys(
+            ("admitted", "queued", "rate_limited", "queue_full", "timed_out"), 0
+        )
+
+    @classmethod
+    def from_env(cls):
+        """Admission control as configured, or None when
+        ``LABCODE_ADMISSION`` is off."""
+        if not env_bool("ADMISSION"):
+            return None
+        return cls(
+            slots=env_int("ADMISSION_SLOTS", 4),
+            queue=env_int("ADMISSION_QUEUE", 64),
+            wait=env_float("ADMISSION_WAIT", 2.0),
+            rate=env_float("RATE_LIMIT", 5.0),
+            burst=env_int("RATE_BURST", 20),
+        )
+
+    def init_app(self, app):
+        app.extensions["admission"] = self
+
+    # ---------- admission ----------
+
+    def admit(self, request):
+        """Wait for a slot; raises :class:`Overloaded` instead. Returns the
+        seconds spent queued. Every admitted request must be ``release``d."""
+        client = request.headers.get("X-Student-Id") or request.remote_addr or ""
+        self._take_token(client)
+        return self._acquire()
+
+    def _take_token(self, client):
+        if self.rate <= 0:
+            return
+        now = monotonic()
+        with self._rate_lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [float(self.burst), now]
+                if len(self._buckets) > MAX_CLIENTS:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                self._counters["rate_limited"] += 1
+                raise Overloaded(429, "rate limit", (1.0 - bucket[0]) / self.rate)
+            bucket[0] -= 1.0
+
+    def _acquire(self):
+        started = monotonic()
+        with self._lock:
+            if self._active < self.slots and not self._waiters:
+                self._active += 1
+                self._counters["admitted"] += 1
+                return 0.0
+            if len(self._waiters) >= self.queue:
+                self._counters["queue_full"] += 1
+                raise Overloaded(503, "queue full", self._retry_after())
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+            self._counters["queued"] += 1
+        if not waiter.wait(self.wait):
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass  # handed a slot just as the wait ran out
+                else:
+                    self._counters["timed_out"] += 1
+                    raise Overloaded(503, "queue wait timed out", self._retry_after())
+        with self._lock:
+            self._counters["admitted"] += 1
+        return monotonic() - started
+
+    def release(self, held):
+        """Give up the slot of a request admitted ``held`` seconds ago."""
+        with self._lock:
+            self._service += (held - self._service) * 0.1
+            if self._waiters:
+                # The slot passes straight to the oldest waiter.
+                self._waiters.popleft().set()
+            else:
+                self._active -= 1
+
+    def _retry_after(self):
+        # Caller holds self._lock: the time for the queue to drain once.
+        return (len(self._waiters) + self._active) / self.slots * self._service
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["active"] = self._active
+            stats["waiting"] = len(self._waiters)
+            stats["service_seconds"] = round(self._service, 6)
+        with self._rate_lock:
+            stats["clients"] = len(self._buckets)
+        stats.update(slots=self.slots, queue=self.queue, wait=self.wait,
+                     rate=self.rate, burst=self.burst)
+        return stats
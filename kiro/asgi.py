@@ -0,0 +1,327 @@
+"""Async (ASGI) entry point serving the same ``/`` and ``/api/explain``.
+
+The Flask apps hold a worker thread for every request in flight, which
+stops scaling once explanations come from a slow model. This entry point
+awaits the backend instead (see ``backends``), so thousands of requests can
+wait on one event loop while the backend's semaphore bounds the real work.
+
+It reuses the chosen UI's pre-rendered page and explanation cache, so the
+responses are byte-for-byte what the Flask app would send. Run it with::
+
+    uvicorn asgi:app                 # mvp UI
+    uvicorn asgi:dashboard           # dashboard UI
+    python asgi.py --ui dashboard --port 8000
+
+``uvicorn`` is an optional dependency (``pip install uvicorn``).
+"""
+import argparse
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from werkzeug.datastructures import Accept, MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+import factory
+from backends import backend_from_env
+from cache import etag_for, normalize_code
+from intake import BodyTooLarge, SubmissionError, SubmissionReader, query_submission
+from rules import get_rules
+from streaming import STREAM_HEADERS, choose_format, encode_event, mimetype_for
+
+
+def _dumps(obj):
+    # Same bytes as flask.jsonify outside debug mode.
+    return (json.dumps(obj, sort_keys=True, separators=(",", ":")) + "\n").encode()
+
+
+class ExplainApp:
+    def __init__(self, ui, page, cache, backend, limits, encode=_dumps):
+        self.ui = ui
+        self.page = page
+        self.cache = cache
+        self.backend = backend
+        self.limits = limits
+        self.encode = encode  # explanation -> JSON response body
+        # Single-flight for this event loop: cache key -> future explanation.
+        self._inflight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path, method = scope["path"], scope["method"]
+        if path == "/":
+            if method not in ("GET", "HEAD"):
+                await self._json(send, 405, {"error": "method not allowed"})
+                return
+            await self._home(scope, send)
+        elif path == "/api/explain":
+            if method not in ("GET", "POST"):
+                await self._json(send, 405, {"error": "method not allowed"})
+                return
+            await self._explain(scope, receive, send)
+        else:
+            await self._json(send, 404, {"error": "not found"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ---------- handlers ----------
+
+    async def _home(self, scope, send):
+        headers = _headers(scope)
+        status, page_headers, body = self.page.negotiate(
+            parse_accept_header(headers.get("accept-encoding"), Accept),
+            parse_etags(headers.get("if-none-match")),
+        )
+        if status == 200:
+            page_headers = dict(page_headers, **{
+                "Content-Type": f"{self.page.mimetype}; charset=utf-8",
+            })
+        if scope["method"] == "HEAD":
+            page_headers["Content-Length"] = str(len(body))
+            body = b""
+        await _respond(send, status, page_headers, body)
+
+    async def _explain(self, scope, receive, send):
+        headers = _headers(scope)
+        query_string = scope.get("query_string", b"")
+        query = parse_qs(query_string.decode("latin-1"), keep_blank_values=True)
+        try:
+            if scope["method"] == "GET":
+                fields = {name: values[0] for name, values in query.items()}
+                submission = query_submission(fields, len(query_string))
+            else:
+                submission = await _read_submission(receive, headers, self.limits)
+        except SubmissionError as exc:
+            await self._json(send, exc.status, {"error": str(exc)})
+            return
+        language = submission.language
+        concept = submission.concept
+        job_role = submission.job_role
+
+        if submission.sampled:
+            key = self.cache.key_for(submission.digest, language, concept, job_role)
+            # The backend sees the samples; concepts and lines come from intake.
+            args = (submission.prefix + "\n" + submission.suffix, language, concept, job_role)
+            scan = submission.scan(get_rules().detector) + (submission.sampled,)
+        else:
+            normalized = normalize_code(submission.code)
+            key = self.cache.key_for(normalized, language, concept, job_role)
+            args = (normalized, language, concept, job_role)
+            scan = None
+
+        fmt = choose_format(
+            query.get("stream", [None])[0],
+            parse_accept_header(headers.get("accept"), MIMEAccept),
+        )
+        etag = etag_for(key, fmt)
+        explain_headers = dict(factory.EXPLAIN_HEADERS, ETag=f'"{etag}"')
+        if parse_etags(headers.get("if-none-match")).contains_weak(etag):
+            await _respond(send, 304, explain_headers, b"")
+            return
+        cached = await self._cache_get(key)
+        if fmt:
+            await self._stream(send, fmt, cached, key, args, scan, explain_headers)
+            return
+
+        if cached is None:
+            cached = await self._explain_once(key, args, scan)
+        await _respond(send, 200, dict(explain_headers, **{"Content-Type": "application/json"}),
+                       self.encode(cached))
+
+    # ---------- cache tiers ----------
+    # The shared-memory and SQLite tiers wait on file locks and disk, so
+    # they run in the default executor rather than on the event loop
+    # (run_in_executor, not asyncio.to_thread, which needs Python 3.9).
+
+    async def _cache_get(self, key):
+        value = self.cache.get_local(key)
+        if value is not None:
+            return value
+        if not self.cache.blocking:
+            return self.cache.get(key)  # counts the miss
+        return await asyncio.get_running_loop().run_in_executor(None, self.cache.get, key)
+
+    async def _cache_put(self, key, value):
+        if not self.cache.blocking:
+            self.cache.put(key, value)
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.cache.put, key, value)
+
+    # ---------- single flight ----------
+
+    def _begin(self, key):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.cache.flights.record("coalesced")
+            return future, False
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        self.cache.flights.record("leaders")
+        return future, True
+
+    def _finish(self, key, future, value=None, error=None):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if error is not None:
+            future.set_exception(error)
+            future.exception()  # followers re-raise it; nobody else has to
+        else:
+            future.set_result(value)
+            if value is None:
+                self.cache.flights.record("abandoned")
+
+    async def _follow(self, future):
+        # None: the leader gave up or is too slow; compute instead.
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.cache.flights.timeout)
+        except asyncio.TimeoutError:
+            self.cache.flights.record("timeouts")
+            return None
+
+    async def _explain_once(self, key, args, scan):
+        future, leader = self._begin(key)
+        if not leader:
+            value = await self._follow(future)
+            if value is not None:
+                return value
+        value = None
+        try:
+            value = await self.backend.explain(*args, scan=scan)
+            await self._cache_put(key, value)
+        except Exception as exc:
+            if leader:
+                self._finish(key, future, error=exc)
+                leader = False
+            raise
+        finally:
+            if leader:
+                self._finish(key, future, value)
+        return value
+
+    async def _stream(self, send, fmt, cached, key, args, scan, headers):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": _encode_headers(dict(STREAM_HEADERS, **headers, **{
+                "Content-Type": mimetype_for(fmt),
+            })),
+        })
+
+        async def chunk(event, payload):
+            await send({
+                "type": "http.response.body",
+                "body": encode_event(fmt, event, payload).encode(),
+                "more_body": True,
+            })
+
+        future, leader = (None, False) if cached is not None else self._begin(key)
+        complete, error = None, None
+        try:
+            if future is not None and not leader:
+                cached = await self._follow(future)
+            if cached is not None:
+                for name, value in cached.items():
+                    await chunk("section", {"section": name, "data": value})
+            else:
+                explanation = {}
+                async for name, value in self.backend.sections(*args, scan=scan):
+                    explanation[name] = value
+                    await chunk("section", {"section": name, "data": value})
+                await self._cache_put(key, explanation)
+                complete = explanation
+        except Exception as exc:  # noqa: BLE001 - status line is already sent
+            error = exc
+            await chunk("error", {"error": f"{type(exc).__name__}: {exc}"})
+        else:
+            await chunk("done", {"done": True})
+        finally:
+            if leader:
+                self._finish(key, future, complete, error)
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _json(self, send, status, obj):
+        await _respond(send, status, {"Content-Type": "application/json"}, _dumps(obj))
+
+
+def _headers(scope):
+    return {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+
+async def _read_submission(receive, headers, limits):
+    length = headers.get("content-length")
+    if length and length.isdigit() and int(length) > limits.max_body:
+        raise BodyTooLarge(f"request body exceeds {limits.max_body} bytes")
+    reader = SubmissionReader(limits)
+    while True:
+        message = await receive()
+        reader.feed(message.get("body", b""))
+        if not message.get("more_body"):
+            return reader.close()
+
+
+async def _respond(send, status, headers, body):
+    if status != 304 and "Content-Length" not in headers:
+        headers = dict(headers, **{"Content-Length": str(len(body))})
+    await send({"type": "http.response.start", "status": status, "headers": _encode_headers(headers)})
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_app(ui="mvp", backend=None):
+    """Build the ASGI app for one UI, sharing the Flask app's page and cache."""
+    extensions = factory.create_app(ui).extensions
+    return ExplainApp(
+        ui,
+        extensions["home_page"],
+        extensions["explain_cache"],
+        backend or backend_from_env(ui),
+        extensions["intake_limits"],
+        extensions["explain_engine"].encode,
+    )
+
+
+class _LazyApp:
+    # Defers building the Flask app until the server first calls us.
+    def __init__(self, ui):
+        self.ui = ui
+        self._app = None
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            self._app = create_app(self.ui)
+        await self._app(scope, receive, send)
+
+
+app = _LazyApp("mvp")
+dashboard = _LazyApp("dashboard")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the explain API over ASGI.")
+    parser.add_argument("--ui", choices=factory.UIS, default="mvp")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("asgi.py needs uvicorn: pip install uvicorn") from None
+    uvicorn.run(create_app(args.ui), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
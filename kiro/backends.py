@@ -0,0 +1,103 @@
+"""Async explanation backends for the ASGI entry point (``asgi.py``).
+
+A backend turns a normalized submission into explanation sections::
+
+    async for name, value in backend.sections(code, language, concept, job_role):
+        ...
+
+``MockBackend`` runs the rule-based explainer from ``rules.json``.
+``StubModelBackend`` adds a fixed delay before each answer, like a remote
+model call. Every backend admits at most ``concurrency`` explanations at a
+time; the others wait on an ``asyncio.Semaphore`` without holding a thread.
+
+Select one with ``LABCODE_BACKEND`` (``mock`` or ``stub``); see
+:func:`backend_from_env`.
+"""
+import asyncio
+
+from config import env_float, env_int, env_str
+from rules import get_rules
+
+
+class ExplainBackend:
+    def __init__(self, profile, concurrency=64):
+        self.profile = profile
+        self.concurrency = concurrency
+        self._slots = None  # see _semaphore
+        self._slots_loop = None
+        self.in_flight = 0
+
+    def _semaphore(self):
+        # Made in the loop that waits on it: before Python 3.10 a Semaphore
+        # binds to the loop current when it is created, and asgi.main()
+        # builds the app before uvicorn starts its loop.
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.concurrency), loop
+        return self._slots
+
+    async def sections(self, code_text, language, concept, job_role, scan=None):
+        """Explanation sections; ``scan`` is an optional precomputed
+        ``(concepts, num_lines, sampled)`` for pastes analysed from samples."""
+        async with self._semaphore():
+            self.in_flight += 1
+            try:
+                async for item in self._generate(code_text, language, concept, job_role, scan):
+                    yield item
+            finally:
+                self.in_flight -= 1
+
+    async def explain(self, code_text, language, concept, job_role, scan=None):
+        return {
+            name: value
+            async for name, value in self.sections(code_text, language, concept, job_role, scan)
+        }
+
+    async def _generate(self, code_text, language, concept, job_role, scan):
+        raise NotImplementedError
+        yield  # makes this an async generator
+
+
+class MockBackend(ExplainBackend):
+    """The rule-based explainer; cheap enough to run on the event loop."""
+
+    async def _generate(self, code_text, language, concept, job_role, scan):
+        rules = get_rules()
+        if scan is None:
+            scan = rules.detector.scan(code_text, language) + (None,)
+        main_concepts, num_lines, sampled = scan
+        for item in rules.profile(self.profile).sections(
+            main_concepts, num_lines, language, concept, job_role, sampled
+        ):
+            yield item
+
+
+class StubModelBackend(MockBackend):
+    """Mock output after ``latency`` seconds, standing in for a remote model."""
+
+    def __init__(self, profile, concurrency=64, latency=0.5):
+        super().__init__(profile, concurrency)
+        self.latency = latency
+
+    async def _generate(self, code_text, language, concept, job_role, scan):
+        await asyncio.sleep(self.latency)
+        async for item in super()._generate(code_text, language, concept, job_role, scan):
+            yield item
+
+
+BACKENDS = {
+    "mock": MockBackend,
+    "stub": StubModelBackend,
+}
+
+
+def backend_from_env(profile):
+    name = env_str("BACKEND", "mock")
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown backend {name!r}; choose from {sorted(BACKENDS)}") from None
+    kwargs = {"concurrency": env_int("BACKEND_CONCURRENCY", 64)}
+    if backend_cls is StubModelBackend:
+        kwargs["latency"] = env_float("BACKEND_LATENCY_MS", 500.0) / 1000
+    return backend_cls(profile, **kwargs)
@@ -0,0 +1,165 @@
+"""Batch explanations for whole lab records.
+
+``POST /api/explain/batch`` takes a list of ``{code, language, concept,
+job_role}`` items (or ``{"items": [...]}``). Identical items are collapsed
+before dispatch, cached explanations are reused, and the remaining work is
+spread over a thread or process pool. Results come back in input order;
+a failing item gets ``{"error": ...}`` without affecting the others.
+
+The body is bounded by ``LABCODE_MAX_BODY`` like ``/api/explain``'s, and
+with admission control on a batch takes one token and one slot.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import monotonic
+
+from flask import Blueprint, current_app, jsonify, request
+
+from admission import Overloaded
+from cache import normalize_code
+from config import env_int, env_str
+from rules import ensure_version, rules_version
+
+# Below this many uncached items the pool round-trip costs more than it saves.
+INLINE_THRESHOLD = 8
+
+batch_bp = Blueprint("batch", __name__)
+
+
+def _explain_one(job):
+    # Module-level so process pools can pickle it; errors stay per item.
+    explain_fn, args, version = job
+    try:
+        ensure_version(version)
+        return {"explanation": explain_fn(*args)}
+    except Exception as exc:  # noqa: BLE001 - reported back to the client
+        return {"error": f"{type(exc).__name__}: {exc}"}
+
+
+class BatchExplainer:
+    def __init__(self, explain_fn, cache, pool="process", workers=None, max_items=5000):
+        if pool not in ("process", "thread"):
+            raise ValueError(f"unknown pool type {pool!r}")
+        self.explain_fn = explain_fn
+        self.cache = cache
+        self.pool = pool
+        self.workers = workers
+        self.max_items = max_items
+        self._executor = None
+
+    @classmethod
+    def from_env(cls, explain_fn, cache):
+        return cls(
+            explain_fn,
+            cache,
+            pool=env_str("BATCH_POOL", "process"),
+            workers=env_int("BATCH_WORKERS", 0) or None,
+            max_items=env_int("BATCH_MAX_ITEMS", 5000),
+        )
+
+    def init_app(self, app):
+        app.extensions["batch_explainer"] = self
+
+    @property
+    def executor(self):
+        # Created on first use so importing the app does not fork workers.
+        if self._executor is None:
+            pool_cls = ProcessPoolExecutor if self.pool == "process" else ThreadPoolExecutor
+            self._executor = pool_cls(max_workers=self.workers)  # None: stdlib default
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def run(self, items):
+        results = [None] * len(items)
+        pending = {}  # cache key -> (args, [input indexes])
+
+        for index, item in enumerate(items):
+            error = _validate(item)
+            if error:
+                results[index] = {"error": error}
+                continue
+            normalized = normalize_code(item.get("code", ""))
+            args = (
+                normalized,
+                item.get("language", "C"),
+                item.get("concept", ""),
+                item.get("job_role", ""),
+            )
+            key = self.cache.key_for(*args)
+            if key in pending:
+                pending[key][1].append(index)
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[index] = {"explanation": cached}
+            else:
+                pending[key] = (args, [index])
+
+        # Workers reload the rules if they were forked before a reload.
+        version = rules_version()
+        jobs = [(self.explain_fn, args, version) for args, _ in pending.values()]
+        if len(jobs) < INLINE_THRESHOLD:
+            outcomes = map(_explain_one, jobs)
+        else:
+            workers = self.workers or os.cpu_count() or 1
+            chunksize = max(1, len(jobs) // (workers * 4))
+            outcomes = self.executor.map(_explain_one, jobs, chunksize=chunksize)
+
+        for (key, (_, indexes)), outcome in zip(pending.items(), outcomes):
+            if "explanation" in outcome:
+                self.cache.put(key, outcome["explanation"])
+            for index in indexes:
+                results[index] = outcome
+        return results
+
+
+def _validate(item):
+    if not isinstance(item, dict):
+        return "item must be an object"
+    for field in ("code", "language", "concept", "job_role"):
+        if field in item and not isinstance(item[field], str):
+            return f"'{field}' must be a string"
+    return None
+
+
+@batch_bp.route("/api/explain/batch", methods=["POST"])
+def api_explain_batch():
+    # A batch is one request to admission control, like one /api/explain.
+    admission = current_app.extensions.get("admission")
+    if admission is None:
+        return _explain_batch()
+    try:
+        admission.admit(request)
+    except Overloaded as exc:
+        return exc.response()
+    admitted = monotonic()
+    try:
+        return _explain_batch()
+    finally:
+        admission.release(monotonic() - admitted)
+
+
+def _explain_batch():
+    explainer = current_app.extensions["batch_explainer"]
+    limit = current_app.extensions["intake_limits"].max_body
+    if request.content_length is not None and request.content_length > limit:
+        return jsonify({"error": f"request body larger than {limit} bytes"}), 413
+    # Read at most one byte past the limit, so chunked bodies are bounded too.
+    body = request.stream.read(limit + 1)
+    if len(body) > limit:
+        return jsonify({"error": f"request body larger than {limit} bytes"}), 413
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return jsonify({"error": "request body is not valid JSON"}), 400
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return jsonify({"error": "expected a list of items"}), 400
+    if len(items) > explainer.max_items:
+        return jsonify({"error": f"at most {explainer.max_items} items per batch"}), 413
+    return jsonify({"results": explainer.run(items)})
@@ -0,0 +1,183 @@
+"""Exam-day spike on ``/api/explain``, with and without admission control.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.admission [--model-ms 50] [--model-slots 4] [--spike-rps 300]
+
+The server runs in a subprocess (threaded werkzeug, as in one ``serve.py``
+worker) in front of a simulated model: every explanation waits for one of
+``--model-slots`` model calls of ``--model-ms`` each, then burns
+``--work-ms`` of CPU, so capacity is about ``model-slots * 1000 / model-ms``
+requests per second. The load is open-loop: requests start on schedule
+whether or not earlier ones have finished, as students' clicks do, at
+``--base-rps`` for ``--base`` seconds, then ``--spike-rps`` for ``--spike``
+seconds, then the base rate again. Each request has distinct code (no
+cache hits) and one of ``--students`` student ids. Per phase it reports how
+many requests were answered 200, 429 and 503, how many failed or took
+longer than ``--timeout``, and the latency of the 200s.
+
+Without admission control every request is accepted and queues inside
+the server, so latency grows for as long as the spike lasts and keeps
+growing into the recovery phase. With it the excess is refused at once and
+the admitted requests' p99 stays near ``queue / slots`` service times.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench.concurrency import HOST, free_port, wait_for_port
+
+KIRO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(port, model_slots, model_latency, work):
+    import socket
+    import threading
+
+    from werkzeug.serving import make_server
+
+    from factory import create_app
+    from serve import QuietHandler
+
+    app = create_app("mvp")
+    engine = app.extensions["explain_engine"]
+    scan = engine.scan
+    model = threading.BoundedSemaphore(model_slots)
+
+    def model_scan(*args):
+        with model:
+            time.sleep(model_latency)
+        deadline = time.thread_time() + work
+        while time.thread_time() < deadline:
+            pass
+        return scan(*args)
+
+    engine.scan = model_scan
+    listener = socket.create_server((HOST, port), backlog=4096)  # as serve.py
+    make_server(HOST, port, app, threaded=True, request_handler=QuietHandler,
+                fd=listener.fileno()).serve_forever()
+
+
+async def post(port, index, student, timeout):
+    body = json.dumps({"code": f"int x = {index};", "language": "C", "job_role": "SDE"})
+    request = (
+        f"POST /api/explain HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nX-Student-Id: {student}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n{body}"
+    ).encode()
+
+    async def exchange():
+        reader, writer = await asyncio.open_connection(HOST, port)
+        try:
+            writer.write(request)
+            await writer.drain()
+            return int((await reader.readline()).split()[1])
+        finally:
+            writer.close()
+
+    try:
+        return await asyncio.wait_for(exchange(), timeout)
+    except asyncio.TimeoutError:
+        return "timeout"
+    except (OSError, IndexError, ValueError):
+        return "error"
+
+
+async def spike(port, phases, students, timeout):
+    """Open-loop load; returns ``(phase, status, seconds)`` per request."""
+    results = []
+    tasks = []
+
+    async def one(phase, index):
+        start = time.perf_counter()
+        status = await post(port, index, f"student-{index % students}", timeout)
+        results.append((phase, status, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    index = 0
+    offset = 0.0
+    for phase, rate, seconds in phases:
+        for n in range(int(rate * seconds)):
+            due = start + offset + n / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one(phase, index)))
+            index += 1
+        offset += seconds
+    await asyncio.gather(*tasks)
+    return results
+
+
+def report(label, results, phases):
+    for phase, rate, _ in phases:
+        rows = [r for r in results if r[0] == phase]
+        ok = sorted(seconds for _, status, seconds in rows if status == 200)
+        counts = {status: sum(1 for r in rows if r[1] == status) for status in (429, 503, "timeout")}
+        failed = len(rows) - len(ok) - sum(counts.values())
+
+        def pct(p):
+            return ok[min(len(ok) - 1, int(p * len(ok)))] * 1e3 if ok else 0.0
+
+        print(f"{label:<10} {phase:<9} {rate:>6.0f} {len(rows):>6} {len(ok):>6} {counts[429]:>5} "
+              f"{counts[503]:>5} {counts['timeout']:>8} {failed:>6} {pct(0.5):>8.0f} {pct(0.99):>8.0f} "
+              f"{(ok[-1] * 1e3 if ok else 0.0):>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-ms", type=float, default=50.0, help="latency of one model call")
+    parser.add_argument("--model-slots", type=int, default=4, help="model calls at once")
+    parser.add_argument("--work-ms", type=float, default=1.0, help="CPU per explanation")
+    parser.add_argument("--base-rps", type=float, default=20.0)
+    parser.add_argument("--spike-rps", type=float, default=300.0)
+    parser.add_argument("--base", type=float, default=3.0, help="seconds before and after the spike")
+    parser.add_argument("--spike", type=float, default=5.0, help="seconds of spike")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=10.0, help="client gives up after this")
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=32)
+    parser.add_argument("--wait", type=float, default=1.0)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.model_slots, args.model_ms / 1000, args.work_ms / 1000)
+        return
+
+    phases = [("base", args.base_rps, args.base), ("spike", args.spike_rps, args.spike),
+              ("recovery", args.base_rps, args.base)]
+    modes = [
+        ("off", {"LABCODE_ADMISSION": "0"}),
+        ("on", {"LABCODE_ADMISSION": "1", "LABCODE_ADMISSION_SLOTS": str(args.slots),
+                "LABCODE_ADMISSION_QUEUE": str(args.queue), "LABCODE_ADMISSION_WAIT": str(args.wait)}),
+    ]
+    print(f"model {args.model_slots} x {args.model_ms:.0f} ms, {args.work_ms:.0f} ms CPU per "
+          f"explanation, {os.cpu_count()} CPUs; "
+          f"admission on: {args.slots} slots, queue {args.queue}, wait {args.wait} s")
+    print(f"{'admission':<10} {'phase':<9} {'rps':>6} {'sent':>6} {'200':>6} {'429':>5} {'503':>5} "
+          f"{'timeout':>8} {'failed':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, env in modes:
+        port = free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "bench.admission", "--serve", "--port", str(port),
+             "--model-ms", str(args.model_ms), "--model-slots", str(args.model_slots),
+             "--work-ms", str(args.work_ms)],
+            cwd=KIRO, env=dict(os.environ, LABCODE_METRICS="1", **env),
+        )
+        try:
+            wait_for_port(port)
+            results = asyncio.run(spike(port, phases, args.students, args.timeout))
+        finally:
+            proc.terminate()
+            proc.wait()
+        report(label, results, phases)
+
+
+if __name__ == "__main__":
+    main()
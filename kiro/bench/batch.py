@@ -0,0 +1,85 @@
+"""Throughput benchmark: /api/explain/batch vs. N individual /api/explain calls.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.batch [--items 2000] [--latency-ms 0]
+
+``--latency-ms`` wraps the explainer with a sleep to stand in for a slow
+model backend, which is where pooling pays off.
+"""
+import argparse
+import time
+
+import app as mvp
+from batch import BatchExplainer
+from bench.scanner import make_source
+from rules import get_rules
+
+
+class SlowScan:
+    """Picklable stand-in for a model backend: concept detection plus
+    fixed latency."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, code_text, language):
+        time.sleep(self.latency)
+        return get_rules().detector.scan(code_text, language)
+
+
+def make_items(count, distinct):
+    sources = [make_source(20 + i % 40, 1 + i % 6, seed=i) for i in range(distinct)]
+    return [
+        {"code": sources[i % distinct], "language": "C", "concept": "", "job_role": "SDE"}
+        for i in range(count)
+    ]
+
+
+def run_individual(client, items):
+    for item in items:
+        assert client.post("/api/explain", json=item).status_code == 200
+
+
+def run_batch(client, items):
+    res = client.post("/api/explain/batch", json={"items": items})
+    assert res.status_code == 200 and len(res.json["results"]) == len(items)
+
+
+def timed(label, func, count):
+    mvp.explain_cache.clear()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1e3:>9.1f} ms  {count / elapsed:>10.0f} items/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="distinct programs (default: all items distinct)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.distinct or args.items)
+    if args.latency_ms:
+        # Set on the engine, so individual and batch calls see the same latency.
+        mvp.engine.scan = SlowScan(args.latency_ms / 1000.0)
+    explain_fn = mvp.engine.explain
+    client = mvp.app.test_client()
+
+    timed("individual /api/explain", lambda: run_individual(client, items), len(items))
+    for pool in ("thread", "process"):
+        explainer = BatchExplainer(
+            explain_fn, mvp.explain_cache, pool=pool, workers=args.workers or None
+        )
+        explainer.init_app(mvp.app)
+        explainer.executor  # start the pool outside the timed region
+        timed(f"batch ({pool} pool)", lambda: run_batch(client, items), len(items))
+        explainer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
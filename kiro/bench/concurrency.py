@@ -0,0 +1,197 @@
+"""Load test: threaded Flask vs. the ASGI entry point behind a slow model.
+
+Run from the ``kiro`` directory (needs ``uvicorn`` for the ASGI side)::
+
+    python -m bench.concurrency [--latency-ms 200] [--concurrency 10 100 500]
+
+Both servers run in a subprocess with the same simulated model latency:
+Flask sleeps in its worker thread, the ASGI app awaits ``StubModelBackend``.
+For each concurrency level the load generator keeps that many requests in
+flight (every request has distinct code, so the cache never answers) and
+reports throughput, latency percentiles and the server's peak RSS and
+thread count, so capacity can be compared at equal memory.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+HOST = "127.0.0.1"
+
+
+# ---------- servers (run in a subprocess) ----------
+
+def serve_flask(port, latency):
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    import app as mvp
+
+    scan = mvp.engine.scan
+
+    def slow_scan(*args):
+        time.sleep(latency)
+        return scan(*args)
+
+    mvp.engine.scan = slow_scan
+    make_server(HOST, port, mvp.app, threaded=True).serve_forever()
+
+
+def serve_asgi(port, latency, limit):
+    import uvicorn
+
+    from asgi import create_app
+    from backends import StubModelBackend
+
+    app = create_app("mvp", StubModelBackend("mvp", concurrency=limit, latency=latency))
+    uvicorn.run(app, host=HOST, port=port, log_level="error", backlog=4096)
+
+
+# ---------- load generator ----------
+
+async def post(port, index):
+    body = json.dumps({"code": f"int x = {index};", "language": "C", "job_role": "SDE"})
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(
+        f"POST /api/explain HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n{body}".encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response.startswith(b"HTTP/1.1 200") or response.startswith(b"HTTP/1.0 200")
+
+
+async def load(port, concurrency, total, first=0):
+    latencies, errors = [], 0
+    counter = iter(range(first, first + total))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                ok = await post(port, index)
+            except OSError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def proc_status(pid):
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields[key] = value.split()
+    return int(fields["VmHWM"][0]) / 1024, int(fields["Threads"][0])
+
+
+class PeakThreads(threading.Thread):
+    """Samples the server's thread count while the load runs."""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(0.02):
+            self.peak = max(self.peak, proc_status(self.pid)[1])
+
+
+def wait_for_port(port, timeout=15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def run_server(kind, args, concurrency):
+    port = free_port()
+    cmd = [
+        sys.executable, "-m", "bench.concurrency", "--serve", kind,
+        "--port", str(port), "--latency-ms", str(args.latency_ms), "--limit", str(args.limit),
+    ]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        wait_for_port(port)
+        asyncio.run(load(port, 8, 16, first=-16))  # warm up imports, distinct code
+        sampler = PeakThreads(proc.pid)
+        sampler.start()
+        latencies, errors, elapsed = asyncio.run(load(port, concurrency, concurrency * args.rounds))
+        sampler.stopped.set()
+        rss, threads = proc_status(proc.pid)[0], sampler.peak
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1e3 if latencies else 0.0
+
+    print(
+        f"{kind:<6} {concurrency:>6} {len(latencies) / elapsed:>9.0f} {pct(0.5):>9.0f} "
+        f"{pct(0.99):>9.0f} {errors:>7} {rss:>8.1f} {threads:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--rounds", type=int, default=4, help="requests per connection slot")
+    parser.add_argument("--limit", type=int, default=1024, help="ASGI backend concurrency limit")
+    parser.add_argument("--serve", choices=("flask", "asgi"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    if args.serve == "flask":
+        serve_flask(args.port, latency)
+        return
+    if args.serve == "asgi":
+        serve_asgi(args.port, latency, args.limit)
+        return
+
+    try:
+        import uvicorn  # noqa: F401
+        kinds = ("flask", "asgi")
+    except ImportError:
+        print("uvicorn not installed; measuring Flask only")
+        kinds = ("flask",)
+
+    print(f"model latency {args.latency_ms:.0f} ms")
+    print(f"{'server':<6} {'conc':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MB':>8} {'threads':>8}")
+    for concurrency in args.concurrency:
+        for kind in kinds:
+            run_server(kind, args, concurrency)
+
+
+if __name__ == "__main__":
+    main()
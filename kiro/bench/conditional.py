@@ -0,0 +1,74 @@
+"""Repeat ``/api/explain`` requests: full response vs. ``If-None-Match`` 304.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.conditional [--requests 2000] [--rounds 5]
+
+For the same generated lab programs, reports the median latency and the
+body bytes of an uncached request, a cached one, and a revalidation that
+sends the ETag of the earlier response, for JSON and NDJSON responses and
+for the ``GET`` form.
+"""
+import argparse
+import random
+import time
+
+from bench.corpus import CONCEPTS, LANGUAGES, generate
+from factory import create_app
+from rules import get_rules
+
+
+def send(client, body, method, fmt, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    path = f"/api/explain?stream={fmt}" if fmt else "/api/explain"
+    if method == "GET":
+        return client.get(path, query_string=body, headers=headers)
+    return client.post(path, json=body, headers=headers)
+
+
+def median_round(app, bodies, method, fmt, case):
+    client = app.test_client()
+    etags = [send(client, body, method, fmt).headers["ETag"] for body in bodies]
+    timings, sent = [], 0
+    for body, etag in zip(bodies, etags):
+        if case == "miss":
+            app.extensions["explain_cache"].clear()
+        start = time.perf_counter()
+        response = send(client, body, method, fmt, etag if case == "304" else None)
+        sent += len(response.get_data())
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == (304 if case == "304" else 200)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e6, sent / len(bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app("mvp")
+    roles = list(get_rules().profile("mvp").roles)
+    rng = random.Random(1)
+    bodies = []
+    for seed in range(args.requests):
+        language = LANGUAGES[seed % len(LANGUAGES)]
+        concepts = tuple(c for c in CONCEPTS if rng.random() < 0.5)
+        bodies.append({"code": generate(language, concepts, 30, seed=seed), "language": language,
+                       "job_role": roles[seed % len(roles)]})
+
+    print(f"{'request':<8} {'response':<8} {'miss us':>8} {'hit us':>8} {'304 us':>8} "
+          f"{'body B':>7} {'304 B':>6}")
+    for method, fmt in (("POST", None), ("POST", "ndjson"), ("GET", None)):
+        results = {}
+        for _ in range(args.rounds):
+            for case in ("miss", "hit", "304"):
+                results.setdefault(case, []).append(median_round(app, bodies, method, fmt, case))
+        best = {case: min(runs) for case, runs in results.items()}
+        print(f"{method:<8} {fmt or 'json':<8} {best['miss'][0]:>8.1f} {best['hit'][0]:>8.1f} "
+              f"{best['304'][0]:>8.1f} {best['hit'][1]:>7.0f} {best['304'][1]:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Deterministic synthetic lab programs in C, C++, Java and Python.
+
+Programs are assembled from small statement templates per concept, wrapped
+in each language's usual skeleton (``main``, a class, a top-level
+script). Comments and string literals deliberately mention other concepts'
+keywords, so only code-aware detection reports exactly the requested mix
+(plus whatever the skeleton itself implies, see ``Program.expected``).
+The same ``(language, concepts, num_lines, seed)`` always gives the same text.
+
+Run from the ``kiro`` directory to inspect a sample::
+
+    python -m bench.corpus [--language Java] [--lines 40] [--concepts loops arrays]
+    python -m bench.corpus --out /tmp/corpus     # write the default corpus
+"""
+import argparse
+import os
+import random
+from collections import namedtuple
+
+LANGUAGES = ("C", "C++", "Java", "Python")
+CONCEPTS = ("loops", "arrays", "functions", "conditions")
+
+# Concept mixes used by the default corpus, from plain arithmetic to all four.
+MIXES = (
+    (),
+    ("loops",),
+    ("conditions",),
+    ("loops", "arrays"),
+    ("functions", "conditions"),
+    CONCEPTS,
+)
+SIZES = (10, 100, 1_000, 10_000)
+
+EXTENSIONS = {"C": "c", "C++": "cpp", "Java": "java", "Python": "py"}
+
+Program = namedtuple("Program", "language concepts num_lines seed code expected")
+
+# Signals every program in a language carries: Java's
+# ``public static void main(String[] args)`` reads as functions and arrays.
+SKELETON_CONCEPTS = {"Java": ("arrays", "functions")}
+
+# Per language: statements with no concept signal, comment/string decoys,
+# one template list per concept, and the skeleton around the body. Templates
+# take {i} (a running counter) and {ind} (indentation).
+_C_FAMILY = {
+    "plain": [
+        "{ind}total = total + {i};",
+        "{ind}count = count * 2 - {i};",
+        "{ind}x{i} = total % 7;",
+    ],
+    "decoys": [
+        "{ind}/* for each value while the array[i] is read, if needed */",
+        "{ind}// def and void helpers: if (x) for (;;) arr[{i}]",
+    ],
+    "loops": [
+        "{ind}for (k = 0; k < {i}; k++) total += k;",
+        "{ind}while (count > {i}) count--;",
+    ],
+    "arrays": [
+        "{ind}buf[{i} % 16] = total;",
+    ],
+    "functions": [
+        "{ind}total = twice(total) + {i};",
+    ],
+    "conditions": [
+        "{ind}if (total > {i}) total = total - {i};",
+    ],
+}
+
+SPECS = {
+    "C": dict(_C_FAMILY, **{
+        "string": '{ind}printf("for [%d] if while\\n", total);',
+        "header": "#include <stdio.h>\n\n",
+        "function": "void show(int v)\n{{\n    printf(\"%d\\n\", v);\n}}\n\n",
+        "open": "int main()\n{{\n    int total = 0, count = 1, k = 0;\n",
+        "decl_arrays": "    int buf[16];\n",
+        "close": "    return 0;\n}}\n",
+        "indent": "    ",
+    }),
+    "C++": dict(_C_FAMILY, **{
+        "string": '{ind}std::cout << "for [" << total << "] if while" << std::endl;',
+        "header": "#include <iostream>\n\n",
+        "function": "void show(int v)\n{{\n    std::cout << v << std::endl;\n}}\n\n",
+        "open": "int main()\n{{\n    int total = 0, count = 1, k = 0;\n",
+        "decl_arrays": "    int buf[16];\n",
+        "close": "    return 0;\n}}\n",
+        "indent": "    ",
+    }),
+    "Java": dict(_C_FAMILY, **{
+        "string": '{ind}System.out.println("for [" + total + "] if while");',
+        "header": "public class Lab {{\n",
+        "function": "    static void show(int v) {{\n        System.out.println(v);\n    }}\n\n",
+        "open": "    public static void main(String[] args) {{\n"
+                "        int total = 0, count = 1, k = 0;\n",
+        "decl_arrays": "        int[] buf = new int[16];\n",
+        "close": "    }}\n}}\n",
+        "indent": "        ",
+    }),
+    "Python": {
+        "plain": [
+            "{ind}total = total + {i}",
+            "{ind}count = count * 2 - {i}",
+            "{ind}x{i} = total % 7",
+        ],
+        "decoys": [
+            "{ind}# for each value while the array[i] is read, if needed",
+            "{ind}# def and void helpers: if x: for _ in arr[{i}]",
+        ],
+        "string": '{ind}print("for [%d] if while" % total)',
+        "loops": [
+            "{ind}for k in range({i} % 5): total += k",
+            "{ind}while count > {i}: count -= 1",
+        ],
+        "arrays": [
+            "{ind}buf[{i} % 16] = total",
+        ],
+        "functions": [
+            "{ind}total = twice(total) + {i}",
+        ],
+        "conditions": [
+            "{ind}if total > {i}: total = total - {i}",
+        ],
+        "header": "",
+        "function": "def show(v):\n    print(v)\n\n\n",
+        "open": "total, count, k = 0, 1, 0\n",
+        "decl_arrays": "buf = [0] * 16\n",
+        "close": "",
+        "indent": "",
+    },
+}
+
+# ``twice`` is called by the functions templates.
+_C_HELPER = "int twice(int v)\n{{\n    return v * 2;\n}}\n\n"
+_HELPERS = {
+    "C": _C_HELPER,
+    "C++": _C_HELPER,
+    "Java": "    static int twice(int v) {{\n        return v * 2;\n    }}\n\n",
+    "Python": "def twice(v):\n    return v * 2\n\n\n",
+}
+
+
+def generate(language, concepts=(), num_lines=40, seed=0):
+    """Return a program of about ``num_lines`` lines using exactly ``concepts``."""
+    spec = SPECS[language]
+    rng = random.Random(f"{language}:{','.join(sorted(concepts))}:{num_lines}:{seed}")
+    ind = spec["indent"]
+
+    head = [spec["header"]]
+    if "functions" in concepts:
+        head.append(_HELPERS[language])
+        # "void show" in C-family and "def show" in Python both signal functions.
+        head.append(spec["function"])
+    head.append(spec["open"])
+    if "arrays" in concepts:
+        head.append(spec["decl_arrays"])
+    head = "".join(head).format()
+    tail = spec["close"].format()
+
+    signals = [t for c in concepts for t in spec[c]]
+    # Every requested concept appears at least once, even in tiny programs.
+    body_lines = max(1, len(signals), num_lines - head.count("\n") - tail.count("\n"))
+    body = []
+    for i in range(body_lines):
+        roll = rng.random()
+        if signals and (i < len(signals) or roll < 0.3):
+            template = signals[i] if i < len(signals) else rng.choice(signals)
+        elif roll < 0.45:
+            template = rng.choice(spec["decoys"])
+        elif roll < 0.55:
+            template = spec["string"]
+        else:
+            template = rng.choice(spec["plain"])
+        body.append(template.format(i=i, ind=ind))
+    return head + "\n".join(body) + "\n" + tail
+
+
+def expected_concepts(language, concepts):
+    """Concepts a detector should report for a generated program, in report order."""
+    found = set(concepts) | set(SKELETON_CONCEPTS.get(language, ()))
+    return tuple(c for c in CONCEPTS if c in found)
+
+
+def corpus(languages=LANGUAGES, sizes=SIZES, mixes=MIXES, seed=0):
+    """Every (language, size, mix) combination as :class:`Program` tuples."""
+    return [
+        Program(
+            language, mix, size, seed,
+            generate(language, mix, size, seed),
+            expected_concepts(language, mix),
+        )
+        for language in languages
+        for size in sizes
+        for mix in mixes
+    ]
+
+
+def file_name(program):
+    mix = "-".join(program.concepts) or "plain"
+    return f"{program.language.replace('+', 'p').lower()}_{program.num_lines}_{mix}.{EXTENSIONS[program.language]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--language", choices=LANGUAGES, default="C")
+    parser.add_argument("--lines", type=int, default=30)
+    parser.add_argument("--concepts", nargs="*", choices=CONCEPTS, default=list(CONCEPTS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the default corpus to this directory")
+    args = parser.parse_args()
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        programs = corpus(seed=args.seed)
+        for program in programs:
+            with open(os.path.join(args.out, file_name(program)), "w") as f:
+                f.write(program.code)
+        print(f"wrote {len(programs)} programs to {args.out}")
+        return
+    print(generate(args.language, tuple(args.concepts), args.lines, args.seed), end="")
+
+
+if __name__ == "__main__":
+    main()
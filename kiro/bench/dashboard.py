@@ -0,0 +1,97 @@
+"""Class dashboard latency as event history grows.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.dashboard [--students 10000] [--class-size 300] [--history 30 120 365]
+
+For each history length, writes a log with ``--per-day`` events per
+student per day (``bench.progress.write_log``) and a roster of classes of
+``--class-size``, then reports the rebuild time, the latency of one
+class's 7-day dashboard from the aggregates, the same numbers computed by
+scanning the raw log with NumPy, and the cost an explain request pays to
+keep the aggregates current.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from bench.progress import write_log
+from dashboard import ClassDashboard
+from progress import DAY, EXPLAIN, ProgressLog
+
+
+def scan_summary(log, students, days):
+    """The week's per-concept counts, from the raw log."""
+    records = log.read(0, len(log))
+    since = (time.time() // DAY - days + 1) * DAY
+    mine = records[np.isin(records["student"], students) & (records["time"] >= since)]
+    explains = np.bincount(mine["concept"], mine["kind"] == EXPLAIN)
+    distinct = np.unique(mine["concept"].astype(np.int64) << 32 | mine["student"])
+    return explains, np.bincount(distinct >> 32)
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return percentile(timings, 0.5) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--class-size", type=int, default=300)
+    parser.add_argument("--per-day", type=float, default=3.0)
+    parser.add_argument("--history", type=int, nargs="+", default=[30, 120, 365])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'days':>5} {'events':>11} {'rebuild s':>10} {'dashboard ms':>13} {'scan ms':>8} "
+          f"{'record us':>10}")
+    for days in args.history:
+        root = tempfile.mkdtemp(prefix="labcode-dashboard-")
+        try:
+            count = write_log(root, args.students, int(args.per_day * days), days)
+            with open(os.path.join(root, "roster.txt"), "w") as f:
+                f.writelines(f"student{n}\tclass{n // args.class_size}\n" for n in range(args.students))
+            log = ProgressLog(root)
+            start = time.perf_counter()
+            dashboard = ClassDashboard(log)  # no checkpoint yet: rebuilds
+            rebuild = time.perf_counter() - start
+
+            members = np.arange(args.class_size, dtype=np.uint32)
+            from_aggregates = timed(lambda: dashboard.summary("class0", 7), args.repeat)
+            from_scan = timed(lambda: scan_summary(log, members, 7), max(3, args.repeat // 10))
+
+            rng = random.Random(days)
+            appends = [(f"student{rng.randrange(args.students)}", ["loops", "arrays"])
+                       for _ in range(2000)]
+            start = time.perf_counter()
+            for student, concepts in appends:
+                log.record(student, concepts)
+            with_dashboard = time.perf_counter() - start
+            log.listeners.clear()
+            start = time.perf_counter()
+            for student, concepts in appends:
+                log.record(student, concepts)
+            overhead = (with_dashboard - (time.perf_counter() - start)) / len(appends)
+            print(f"{days:>5} {count:>11,} {rebuild:>10.2f} {from_aggregates:>13.2f} "
+                  f"{from_scan:>8.1f} {overhead * 1e6:>10.1f}")
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Explain response bodies: ``jsonify`` vs. pre-encoded fragments.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.fragments [--requests 2000] [--rounds 5]
+
+Serializes the same explanations with ``flask.jsonify`` and with the
+profile's :class:`fragments.FragmentEncoder`, first as the rule tables
+build them (every fixed section is a registered fragment) and then as
+copies read back from JSON (the SQLite tier; every section is encoded
+whole), each with and without ``orjson``. Then the median latency of a
+cached ``/api/explain`` call with either body builder, and how many
+fragments the encoder holds.
+"""
+import argparse
+import json
+import random
+import time
+
+from flask import jsonify
+
+import fragments
+from bench.corpus import CONCEPTS, LANGUAGES, generate
+from factory import create_app
+from rules import get_rules
+
+
+def serialize_cost(encode, explanations, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for explanation in explanations:
+            encode(explanation)
+        best = min(best, time.perf_counter() - start)
+    return best / len(explanations) * 1e6
+
+
+def hit_latency(app, bodies):
+    client = app.test_client()
+    for body in bodies:
+        client.post("/api/explain", json=body)
+    timings = []
+    for body in bodies:
+        start = time.perf_counter()
+        client.post("/api/explain", json=body)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app("mvp")
+    engine = app.extensions["explain_engine"]
+    roles = list(get_rules().profile(engine.profile).roles)
+    rng = random.Random(1)
+    bodies, explanations = [], []
+    for seed in range(args.requests):
+        language = LANGUAGES[seed % len(LANGUAGES)]
+        concepts = tuple(c for c in CONCEPTS if rng.random() < 0.5)
+        code = generate(language, concepts, 30, seed=seed)
+        role = roles[seed % len(roles)]
+        bodies.append({"code": code, "language": language, "job_role": role})
+        explanations.append(engine.explain(code, language, "", role))
+    copies = [json.loads(json.dumps(e)) for e in explanations]
+
+    def with_jsonify(explanation):
+        return jsonify(explanation).get_data()
+
+    fast = fragments.orjson
+    print(f"serialize, us per body (orjson {'installed' if fast else 'not installed'})")
+    print(f"{'explanations':<14} {'encoder':<12} {'jsonify':>8} {'fragments':>10} {'speedup':>8}")
+    with app.app_context():
+        for label, sample in (("from tables", explanations), ("from JSON", copies)):
+            for encoder in (("orjson", "json") if fast else ("json",)):
+                fragments.orjson = fast if encoder == "orjson" else None
+                old = serialize_cost(with_jsonify, sample, args.rounds)
+                new = serialize_cost(engine.encode, sample, args.rounds)
+                print(f"{label:<14} {encoder:<12} {old:>8.2f} {new:>10.2f} {old / new:>7.1f}x")
+    fragments.orjson = fast
+
+    results = {}
+    for _ in range(args.rounds):
+        for label in ("jsonify", "fragments"):
+            if label == "jsonify":
+                engine.encode = with_jsonify  # instance attribute shadows the method
+            else:
+                del engine.encode
+            results.setdefault(label, []).append(hit_latency(app, bodies))
+    old, new = min(results["jsonify"]), min(results["fragments"])
+    print(f"/api/explain hit: jsonify {old:.1f} us, fragments {new:.1f} us ({old - new:.1f} us saved)")
+    print(f"encoder: {get_rules().profile(engine.profile).encoder.stats()}")
+
+
+if __name__ == "__main__":
+    main()
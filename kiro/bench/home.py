@@ -0,0 +1,53 @@
+"""Requests/sec for ``/``: per-request render_template_string vs. pre-rendered bytes.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.home [--seconds 2]
+"""
+import argparse
+import time
+
+from flask import render_template_string
+
+import app as mvp
+import app1 as dashboard
+from factory import read_template
+
+
+def measure(client, path, headers, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        assert client.get(path, headers=headers).status_code in (200, 304)
+        count += 1
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for label, module, ui in (("app.py", mvp, "mvp"), ("app1.py", dashboard, "dashboard")):
+        # The previous handler, mounted next to the new one for comparison.
+        module.app.add_url_rule(
+            "/_legacy_home", "legacy_home",
+            lambda page=read_template(ui): render_template_string(page),
+        )
+        client = module.app.test_client()
+        etag = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+
+        cases = [
+            ("render_template_string", "/_legacy_home", {}),
+            ("pre-rendered", "/", {}),
+            ("pre-rendered gzip", "/", {"Accept-Encoding": "gzip"}),
+            ("If-None-Match -> 304", "/", {"Accept-Encoding": "gzip", "If-None-Match": etag}),
+        ]
+        print(label)
+        for name, path, headers in cases:
+            rps = measure(client, path, headers, args.seconds)
+            print(f"  {name:<24} {rps:>9.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
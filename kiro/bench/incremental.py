@@ -0,0 +1,93 @@
+"""Per-edit cost of incremental re-analysis against analysing the whole program.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.incremental [--lines 100 1000 10000] [--edits 200]
+
+For each program size a generated lab program is submitted once to an
+:class:`incremental.IncrementalAnalyzer`, then edited ``--edits`` times
+the way a student types: each edit changes one line, or inserts two, at a
+random place, always against the previous version. Every edit is timed
+through ``apply`` plus building the explanation, and against what
+``/api/explain`` does with the whole edited program (normalize, detect,
+count lines, build). It also times an edit that opens a block comment
+near the top and the edit that closes it again, which re-analyse every
+line in between. Times are medians in microseconds; "lines" is the mean
+number of lines re-analysed per edit.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from bench.corpus import CONCEPTS, generate
+from cache import normalize_code
+from factory import ExplainEngine
+from incremental import IncrementalAnalyzer
+
+TYPED = [
+    "        total += buf[k % 16];",
+    "        if (total > 100) { total = 0; }",
+    "        for (int j = 0; j < 4; j++) { k += j; }",
+    "        k = twice(k);",
+    "",
+]
+
+
+def median_us(times):
+    return statistics.median(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--language", default="C")
+    args = parser.parse_args()
+
+    engine = ExplainEngine("mvp")
+    print(f"{args.edits} edits per size, {args.language}; times are medians in us")
+    print(f"{'lines':>7} {'full us':>10} {'edit us':>9} {'lines':>6} {'speedup':>8} "
+          f"{'open /* us':>11} {'close */ us':>12}")
+    for size in args.lines:
+        rng = random.Random(size)
+        code = generate(args.language, CONCEPTS, size, seed=size)
+        lines = code.split("\n")
+        analyzer = IncrementalAnalyzer(engine)
+        version, _ = analyzer.submit(code, args.language)
+
+        full_times, edit_times, analysed = [], [], 0
+        for _ in range(args.edits):
+            at = rng.randrange(1, len(lines) - 1)
+            if rng.random() < 0.5:
+                edit = {"start": at, "end": at + 1, "lines": [rng.choice(TYPED)]}
+            else:
+                edit = {"start": at, "end": at, "lines": rng.sample(TYPED, 2)}
+            lines[edit["start"]:edit["end"]] = edit["lines"]
+
+            start = time.perf_counter()
+            version, count = analyzer.apply(version.id, [edit])
+            explanation = analyzer.explain(version, "", "SDE")
+            edit_times.append(time.perf_counter() - start)
+            analysed += count
+
+            start = time.perf_counter()
+            expected = engine.explain(normalize_code("\n".join(lines)), args.language, "", "SDE")
+            full_times.append(time.perf_counter() - start)
+            assert explanation == expected
+
+        # Open a comment on line 1, then close it again.
+        comment_times = []
+        for text in ("/* " + lines[1], lines[1]):
+            start = time.perf_counter()
+            version, _ = analyzer.apply(version.id, [{"start": 1, "end": 2, "lines": [text]}])
+            analyzer.explain(version, "", "SDE")
+            comment_times.append(time.perf_counter() - start)
+
+        full_us, edit_us = median_us(full_times), median_us(edit_times)
+        print(f"{size:>7} {full_us:>10.0f} {edit_us:>9.1f} {analysed / args.edits:>6.1f} "
+              f"{full_us / edit_us:>7.0f}x {comment_times[0] * 1e6:>11.0f} {comment_times[1] * 1e6:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
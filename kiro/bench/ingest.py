@@ -0,0 +1,101 @@
+"""Time lab-manual ingestion for a department-sized set of manuals.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.ingest [--manuals 300] [--experiments 10] [--pools thread process]
+
+Writes synthetic Markdown manuals (programs from ``bench.corpus``, half in
+labelled fences, a quarter in bare fences and a quarter indented) to a
+temporary directory, then for each pool type times a cold ingest into an
+empty output directory, a rerun with nothing changed and a rerun after
+editing one manual.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import app as mvp
+import ingest
+from batch import BatchExplainer
+from bench.corpus import CONCEPTS, LANGUAGES, generate
+
+FENCE_INFO = {"C": "c", "C++": "cpp", "Java": "java", "Python": "python"}
+
+
+def manual(number, experiments, rng):
+    parts = [f"# Programming Lab {number}\n\nObjective: practise the week's concepts.\n"]
+    for exp in range(1, experiments + 1):
+        language = rng.choice(LANGUAGES)
+        concepts = tuple(c for c in CONCEPTS if rng.random() < 0.5)
+        parts.append(f"\n## Experiment {exp}: {' and '.join(concepts) or 'basics'}\n\n"
+                     f"Aim: To write a {language} program using {', '.join(concepts) or 'basic syntax'}.\n")
+        for block in range(rng.randint(1, 3)):
+            code = generate(language, concepts, rng.randint(15, 60), seed=number * 1000 + exp * 10 + block)
+            style = rng.random()
+            if style < 0.5:
+                parts.append(f"\n```{FENCE_INFO[language]}\n{code}```\n")
+            elif style < 0.75:
+                parts.append(f"\n```\n{code}```\n")
+            else:
+                parts.append("\n" + "".join(f"    {line}\n" for line in code.splitlines()))
+            parts.append("\nExplain the output for a sample input.\n")
+    return "".join(parts)
+
+
+def write_manuals(directory, count, experiments):
+    rng = random.Random(0)
+    size = 0
+    for number in range(count):
+        text = manual(number, experiments, rng)
+        size += len(text)
+        with open(os.path.join(directory, f"lab_{number:04d}.md"), "w") as f:
+            f.write(text)
+    return size
+
+
+def timed(out_dir, explainer, paths):
+    start = time.perf_counter()
+    counts = ingest.Ingester(out_dir, explainer).run(paths)
+    return time.perf_counter() - start, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manuals", type=int, default=300)
+    parser.add_argument("--experiments", type=int, default=10)
+    parser.add_argument("--pools", nargs="+", choices=("thread", "process"), default=["thread", "process"])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="labcode-ingest-")
+    try:
+        manuals = os.path.join(root, "manuals")
+        os.makedirs(manuals)
+        size = write_manuals(manuals, args.manuals, args.experiments)
+        print(f"{args.manuals} manuals, {size / (1 << 20):.1f} MiB, {os.cpu_count()} CPUs\n")
+        print(f"{'pool':<8} {'run':<10} {'time':>8} {'manuals':>8} {'blocks':>7} {'blocks/s':>9}")
+        for pool in args.pools:
+            out_dir = os.path.join(root, f"out-{pool}")
+            explainer = BatchExplainer(mvp.mock_explain_code, mvp.explain_cache, pool=pool,
+                                       workers=args.workers)
+            mvp.explain_cache.clear()
+            try:
+                runs = [("cold", None), ("unchanged", None), ("one edit", "lab_0000.md")]
+                for label, edit in runs:
+                    if edit:
+                        with open(os.path.join(manuals, edit), "a") as f:
+                            f.write(f"\nEdited by the {pool} run.\n")
+                    elapsed, counts = timed(out_dir, explainer, [manuals])
+                    print(f"{pool:<8} {label:<10} {elapsed:>7.2f}s {counts['ingested']:>8} "
+                          f"{counts['blocks']:>7} {counts['blocks'] / elapsed:>9.0f}")
+            finally:
+                explainer.shutdown()
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Peak memory and time for huge pastes: buffered get_json vs. streaming intake.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.intake [--sizes-mb 1 10 50]
+
+The legacy handler (``get_json`` plus ``strip().split`` line counting, as
+``api_explain`` used to do) is mounted next to ``/api/explain`` and both
+are posted the same body through the Flask test client. Each request is
+timed untraced, then repeated under ``tracemalloc`` for its peak memory,
+reported relative to the body size; the body itself is allocated before
+tracing starts.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from flask import jsonify, request
+
+import app as mvp
+from bench.corpus import generate
+from bench.scanner import legacy_scan
+
+
+def legacy_explain():
+    payload = request.get_json(force=True)
+    code_text = payload.get("code", "")
+    main_concepts, num_lines = legacy_scan(code_text)
+    return jsonify({"concepts": main_concepts, "num_lines": num_lines})
+
+
+def make_body(size_mb):
+    block = generate("C", ("loops", "arrays", "conditions"), 200, seed=1)
+    code = block * (size_mb * (1 << 20) // len(block) + 1)
+    return json.dumps({"code": code, "language": "C", "job_role": "SDE"}).encode()
+
+
+def post(client, path, body):
+    mvp.explain_cache.clear()
+    response = client.post(path, data=body, content_type="application/json")
+    assert response.status_code == 200, response.data[:200]
+
+
+def measure(client, path, body):
+    start = time.perf_counter()
+    post(client, path, body)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    post(client, path, body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    mvp.app.add_url_rule("/_legacy_explain", "legacy_explain", legacy_explain, methods=["POST"])
+    mvp.intake_limits.max_body = max(mvp.intake_limits.max_body, (max(args.sizes_mb) + 1) << 20)
+    client = mvp.app.test_client()
+
+    print(f"{'body':>8}  {'handler':<10} {'time':>9} {'peak MiB':>9} {'x body':>7}")
+    for size_mb in args.sizes_mb:
+        body = make_body(size_mb)
+        mib = len(body) / (1 << 20)
+        for label, path in (("get_json", "/_legacy_explain"), ("streaming", "/api/explain")):
+            elapsed, peak = measure(client, path, body)
+            print(
+                f"{mib:>6.1f}MB  {label:<10} {elapsed * 1e3:>7.0f}ms "
+                f"{peak / (1 << 20):>9.1f} {peak / len(body):>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Lexer scaling benchmark on large generated sources.
+
+Checks that comment/string-aware concept detection stays linear in the
+input size and that memory stays flat when the source is fed in chunks.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.lexer [--max-mb 64]
+"""
+import argparse
+import time
+import tracemalloc
+
+from lexer import Lexer
+from rules import get_rules
+
+# Every block mentions array syntax only inside comments and strings, so
+# the "arrays" concept is never found and the scanner must walk everything.
+BLOCKS = {
+    "C": (
+        "/* step {i}: for each item use arr[i] */\n"
+        "int f{i}(int x) {{\n"
+        "    // while [ looping ] in a comment\n"
+        "    printf(\"value[%d] if any\\n\", x);\n"
+        "    if (x > {i}) {{ x = x - 1; }}\n"
+        "    return x * 2;\n"
+        "}}\n"
+    ),
+    "Python": (
+        "def f{i}(x):\n"
+        "    \"\"\"Docstring: for each item in array[i]\n"
+        "    while [ brackets ] are ignored.\"\"\"\n"
+        "    # for [ in a comment\n"
+        "    label = 'value [%d]' % x\n"
+        "    if x > {i}:\n"
+        "        x = x - 1\n"
+        "    return x * 2\n"
+    ),
+}
+
+
+def iter_chunks(language, total_bytes, chunk_size=1 << 16):
+    template = BLOCKS[language]
+    buf, produced, i = [], 0, 0
+    size = 0
+    while produced < total_bytes:
+        block = template.format(i=i)
+        buf.append(block)
+        size += len(block)
+        i += 1
+        if size >= chunk_size:
+            chunk = "".join(buf)
+            produced += len(chunk)
+            buf, size = [], 0
+            yield chunk
+    if buf:
+        yield "".join(buf)
+
+
+def run(language, total_bytes, consumer):
+    start = time.perf_counter()
+    consumer(language, iter_chunks(language, total_bytes))
+    elapsed = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows allocation-heavy code considerably.
+    tracemalloc.start()
+    consumer(language, iter_chunks(language, total_bytes))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def generate_only(language, chunks):
+    for _ in chunks:
+        pass
+
+
+def lex_only(language, chunks):
+    lexer = Lexer(language)
+    for chunk in chunks:
+        for _ in lexer.feed(chunk):
+            pass
+    for _ in lexer.close():
+        pass
+
+
+def detect(language, chunks):
+    scanner = get_rules().detector.scanner(language)
+    for chunk in chunks:
+        scanner.feed(chunk)
+    scanner.close()
+    assert "arrays" not in scanner.concepts()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-mb", type=int, default=64)
+    args = parser.parse_args()
+
+    sizes = []
+    mb = 1
+    while mb <= args.max_mb:
+        sizes.append(mb)
+        mb *= 4
+
+    print(f"{'language':<8} {'stage':<8} {'MB':>5} {'seconds':>9} {'ns/byte':>8} {'peak KiB':>9}")
+    for language in BLOCKS:
+        stages = (("generate", generate_only), ("lex", lex_only), ("detect", detect))
+        for label, consumer in stages:
+            for mb in sizes:
+                elapsed, peak = run(language, mb << 20, consumer)
+                print(
+                    f"{language:<8} {label:<8} {mb:>5} {elapsed:>9.3f} "
+                    f"{elapsed * 1e9 / (mb << 20):>8.1f} {peak / 1024:>9.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Cost of the ``/metrics`` instrumentation on ``/api/explain``.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.metrics [--requests 2000] [--rounds 5]
+
+Reports what one request pays for its :class:`metrics.StageClock` (a mark
+per stage plus the locked observe at the end) and for the disabled
+stand-in, then the latency of cached and uncached ``/api/explain`` calls
+with metrics on and off, alternating rounds so both see the same machine
+state, and how long a scrape of ``/metrics`` takes once every language and
+role has series.
+"""
+import argparse
+import os
+import random
+import time
+
+from bench.corpus import CONCEPTS, LANGUAGES, generate
+from factory import create_app
+from metrics import NULL_CLOCK
+from rules import get_rules
+
+STAGES = ("parse", "cache", "detect", "build", "cache", "serialize")
+
+
+def clock_cost(metrics, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        clock = metrics.clock() if metrics is not None else NULL_CLOCK
+        for stage in STAGES:
+            clock.mark(stage)
+        clock.finish("Python", "Backend", 512)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def explain_round(app, bodies, cached):
+    client = app.test_client()
+    if cached:
+        for body in bodies:
+            client.post("/api/explain", json=body)
+    timings = []
+    for body in bodies:
+        if not cached:
+            app.extensions["explain_cache"].clear()
+        start = time.perf_counter()
+        client.post("/api/explain", json=body)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    apps = {}
+    for label, flag in (("on", "1"), ("off", "0")):
+        os.environ["LABCODE_METRICS"] = flag
+        apps[label] = create_app("mvp")
+    metrics = apps["on"].extensions["explain_metrics"]
+    print(f"stage clock:    {clock_cost(metrics, args.iterations):.2f} us per request "
+          f"({len(STAGES)} marks + observe)")
+    print(f"disabled clock: {clock_cost(None, args.iterations):.2f} us per request")
+
+    roles = list(get_rules().profile("mvp").roles)
+    rng = random.Random(1)
+    bodies = []
+    for seed in range(args.requests):
+        language = LANGUAGES[seed % len(LANGUAGES)]
+        concepts = tuple(c for c in CONCEPTS if rng.random() < 0.5)
+        bodies.append({"code": generate(language, concepts, 30, seed=seed), "language": language,
+                       "job_role": roles[seed % len(roles)]})
+
+    results = {}
+    for _ in range(args.rounds):
+        for label, app in apps.items():
+            for cached in (True, False):
+                results.setdefault((label, cached), []).append(explain_round(app, bodies, cached))
+    print(f"{'explain':<10} {'metrics on us':>14} {'off us':>8} {'delta us':>9}")
+    for cached in (True, False):
+        on = min(results["on", cached])
+        off = min(results["off", cached])
+        print(f"{'hit' if cached else 'miss':<10} {on:>14.1f} {off:>8.1f} {on - off:>9.1f}")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        text = metrics.render()
+    print(f"scrape:         {(time.perf_counter() - start) * 10:.2f} ms "
+          f"({text.count(chr(10))} lines, {len(text) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compile time, memory and query latency of the concept graph.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.pathways [--sizes 1000 5000 20000] [--queries 2000]
+
+Builds random DAGs where each node requires up to ``--fanin`` earlier
+nodes, mostly recent ones so prerequisite chains run deep, and reports the
+time and memory to compile each graph, the mean chain length, then
+p50/p99 latency in microseconds of the
+reachability test, the prerequisite chain, everything downstream and the
+quickest path. ``bfs`` is the same prerequisite chain found by walking the
+edges on every request, as a graph without precomputed closures would.
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from pathways import ConceptGraph
+
+
+def nodes(count, fanin, seed=0):
+    rng = random.Random(seed)
+    result = []
+    for number in range(count):
+        requires = set()
+        for _ in range(rng.randint(0, fanin) if number else 0):
+            # Favour nearby nodes: chains run deep, like a curriculum.
+            requires.add(max(0, number - 1 - int(rng.expovariate(1 / 20))))
+        result.append({
+            "name": f"concept {number}",
+            "kind": "course" if rng.random() < 0.05 else "concept",
+            "weeks": rng.randint(1, 4),
+            "requires": [f"concept {p}" for p in requires],
+        })
+    rng.shuffle(result)
+    return result
+
+
+def bfs_prerequisites(graph, i):
+    seen, stack = set(), [i]
+    while stack:
+        for p in graph._requires[stack.pop()]:
+            if p not in seen:
+                seen.add(p)
+                stack.append(p)
+    return sorted(seen)
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def timed(fn, args):
+    timings = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(*arg)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return percentile(timings, 0.5) * 1e6, percentile(timings, 0.99) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    parser.add_argument("--fanin", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>7} {'edges':>7} {'build ms':>9} {'MiB':>6} {'chain':>6} "
+          f"{'requires':>11} {'prereqs':>11} {'bfs':>11} "
+          f"{'downstream':>11} {'path':>11}")
+    for size in args.sizes:
+        spec = nodes(size, args.fanin)
+        start = time.perf_counter()
+        ConceptGraph(spec)
+        build = time.perf_counter() - start
+        gc.collect()
+        tracemalloc.start()
+        graph = ConceptGraph(spec)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        rng = random.Random(size)
+        singles = [(rng.randrange(size),) for _ in range(args.queries)]
+        pairs = [tuple(sorted(rng.sample(range(size), 2))) for _ in range(args.queries)]
+        # Pairs that are connected, so path queries do real work.
+        connected = []
+        for (target,) in singles:
+            chain = graph.prerequisites(target)
+            if chain:
+                connected.append((rng.choice(chain), target))
+        chain = sum(len(graph.prerequisites(i)) for (i,) in singles) / len(singles)
+        columns = [
+            timed(graph.requires, pairs),
+            timed(graph.prerequisites, singles),
+            timed(lambda i: bfs_prerequisites(graph, i), singles),
+            timed(graph.downstream, singles),
+            timed(graph.path, connected),
+        ]
+        print(f"{size:>7} {graph.edges:>7} {build * 1e3:>9.0f} {memory / (1 << 20):>6.1f} "
+              f"{chain:>6.0f} "
+              + " ".join(f"{p50:>5.1f}/{p99:<5.0f}" for p50, p99 in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Load time, memory and lookup latency of the practice catalog.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.practice [--sizes 1000 10000 50000] [--lookups 20000]
+
+Writes synthetic catalogs (JSON and CSV, a few concepts per problem drawn
+from a skewed vocabulary, four platforms) to a temporary directory and, for
+each, reports the time to load and index the file, memory retained by the
+loaded catalog, and ``top_k`` latency for the five-problem ladder the
+practice panel asks for. Finally it times ``/api/explain`` with the shipped
+catalog and with ``LABCODE_PRACTICE_CATALOG=none``: practice blocks are
+built when the rules load, so the difference is the larger response body.
+"""
+import argparse
+import csv
+import gc
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import rules
+from bench.corpus import CONCEPTS, generate
+from practice import DIFFICULTIES, PracticeCatalog
+
+PLATFORMS = ("LeetCode", "HackerRank", "CodeChef", "Codeforces")
+TOPICS = list(CONCEPTS) + [f"topic-{n}" for n in range(200)]
+
+
+def problems(count, seed=0):
+    rng = random.Random(seed)
+    # Zipf-like weights: the lab concepts are the most common tags.
+    weights = [1 / (rank + 1) for rank in range(len(TOPICS))]
+    for number in range(count):
+        platform = rng.choice(PLATFORMS)
+        yield {
+            "id": f"p{number}",
+            "title": f"Problem {number}",
+            "url": f"https://example.com/{platform.lower()}/{number}",
+            "platform": platform,
+            "difficulty": rng.choice(DIFFICULTIES),
+            "concepts": sorted(set(rng.choices(TOPICS, weights, k=rng.randint(1, 4)))),
+            "score": round(rng.random() * 100, 2),
+        }
+
+
+def write_catalogs(directory, count):
+    rows = list(problems(count))
+    json_path = os.path.join(directory, f"catalog-{count}.json")
+    with open(json_path, "w") as f:
+        json.dump(rows, f)
+    csv_path = os.path.join(directory, f"catalog-{count}.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, concepts=";".join(row["concepts"])))
+    return json_path, csv_path
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def load(path):
+    start = time.perf_counter()
+    PracticeCatalog.from_file(path)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    catalog = PracticeCatalog.from_file(path)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return catalog, elapsed, retained
+
+
+def lookups(catalog, count, k):
+    rng = random.Random(1)
+    concepts = rng.choices(list(CONCEPTS) + TOPICS[len(CONCEPTS):len(CONCEPTS) + 20], k=count)
+    timings = []
+    for concept in concepts:
+        start = time.perf_counter()
+        catalog.top_k(concept, k)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings
+
+
+def explain_timings(requests):
+    # Imported here so the rules pick up the environment set by the caller.
+    import app as mvp
+
+    client = mvp.app.test_client()
+    rng = random.Random(2)
+    bodies = []
+    for seed in range(requests):
+        concepts = tuple(c for c in CONCEPTS if rng.random() < 0.5)
+        bodies.append({"code": generate("C", concepts, 30, seed=seed), "language": "C",
+                       "job_role": "Web Developer"})
+    for body in bodies:  # warm up
+        client.post("/api/explain", json=body)
+    timings, size = [], 0
+    for body in bodies:
+        mvp.explain_cache.clear()
+        start = time.perf_counter()
+        response = client.post("/api/explain", json=body)
+        timings.append(time.perf_counter() - start)
+        size += len(response.data)
+    timings.sort()
+    return timings, size / len(bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="labcode-practice-")
+    try:
+        print(f"{'problems':>9} {'format':<6} {'load ms':>8} {'KiB':>8} {'concepts':>9} "
+              f"{'top_k p50':>10} {'p99':>8}")
+        for size in args.sizes:
+            for path in write_catalogs(root, size):
+                catalog, elapsed, retained = load(path)
+                timings = lookups(catalog, args.lookups, args.k)
+                print(f"{len(catalog):>9} {path.rsplit('.', 1)[1]:<6} {elapsed * 1e3:>8.1f} "
+                      f"{retained / 1024:>8.0f} {len(catalog.concepts):>9} "
+                      f"{percentile(timings, 0.5) * 1e6:>8.1f}us "
+                      f"{percentile(timings, 0.99) * 1e6:>6.1f}us")
+    finally:
+        shutil.rmtree(root)
+
+    print(f"\n/api/explain, {args.requests} uncached requests")
+    for label, setting in (("no catalog", "none"), ("catalog", None)):
+        if setting is None:
+            os.environ.pop("LABCODE_PRACTICE_CATALOG", None)
+        else:
+            os.environ["LABCODE_PRACTICE_CATALOG"] = setting
+        rules.reload_rules()
+        timings, size = explain_timings(args.requests)
+        print(f"{label:<11} p50 {percentile(timings, 0.5) * 1e6:>6.0f}us "
+              f"p99 {percentile(timings, 0.99) * 1e6:>6.0f}us  {size:>6.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Mastery recompute and query latency for a semester of learning events.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.progress [--students 10000] [--events 400] [--days 120]
+
+Writes a synthetic log straight into a temporary ``LABCODE_PROGRESS_DIR``
+(``--events`` per student on average, spread over ``--days``, a fifth of
+them practice completions), then reports the time to open it, a full
+recompute of every student's scores, and single-student query latency
+just after a recompute and with events appended since. ``loop`` is the
+same scores for one student computed record by record in Python.
+"""
+import argparse
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from bench.corpus import CONCEPTS
+from progress import PRACTICE, RECORD, ProgressLog
+from progress import EXPLAIN_WEIGHT, MASTERY_SCALE, PRACTICE_WEIGHT
+
+TOPICS = list(CONCEPTS) + [f"topic {n}" for n in range(36)]
+
+
+def write_log(directory, students, per_student, days, seed=0):
+    rng = np.random.default_rng(seed)
+    count = students * per_student
+    records = np.empty(count, RECORD)
+    start = time.time() - days * 86400
+    records["time"] = np.sort(start + rng.random(count) * days * 86400)
+    records["student"] = rng.integers(0, students, count)
+    # Earlier topics come up far more often, as in a lab course.
+    weights = 1 / np.arange(1, len(TOPICS) + 1)
+    records["concept"] = rng.choice(len(TOPICS), count, p=weights / weights.sum())
+    practice = rng.random(count) < 0.2
+    records["kind"] = np.where(practice, PRACTICE, 0)
+    records["value"] = np.where(practice, rng.integers(40, 101, count), 100)
+    records.tofile(os.path.join(directory, "events.bin"))
+    with open(os.path.join(directory, "students.txt"), "w") as f:
+        f.writelines(f"student{n}\n" for n in range(students))
+    with open(os.path.join(directory, "concepts.txt"), "w") as f:
+        f.writelines(f"{topic}\n" for topic in TOPICS)
+    return count
+
+
+def loop_mastery(path, student, half_life, now):
+    """Reference: the scores of one student, one record at a time."""
+    evidence = {}
+    for record in np.fromfile(path, RECORD):
+        if record["student"] != student:
+            continue
+        weight = PRACTICE_WEIGHT * record["value"] / 100 if record["kind"] == PRACTICE else EXPLAIN_WEIGHT
+        concept = int(record["concept"])
+        evidence[concept] = evidence.get(concept, 0.0) + weight * 2 ** ((record["time"] - now) / half_life)
+    return {c: 100 * (1 - math.exp(-e / MASTERY_SCALE)) for c, e in evidence.items()}
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def query_latency(log, students, queries, seed):
+    rng = random.Random(seed)
+    timings = []
+    for _ in range(queries):
+        student = f"student{rng.randrange(students)}"
+        start = time.perf_counter()
+        log.mastery(student)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return f"p50 {percentile(timings, 0.5) * 1e3:.2f} ms, p99 {percentile(timings, 0.99) * 1e3:.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=400, help="events per student")
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--appended", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="labcode-progress-")
+    try:
+        count = write_log(root, args.students, args.events, args.days)
+        size = os.path.getsize(os.path.join(root, "events.bin"))
+        print(f"{count:,} events for {args.students:,} students, {size / (1 << 20):.0f} MiB")
+
+        start = time.perf_counter()
+        log = ProgressLog(root, refresh_events=count + args.appended + 1)
+        print(f"open:            {time.perf_counter() - start:.3f} s")
+        start = time.perf_counter()
+        log.refresh()
+        print(f"full recompute:  {time.perf_counter() - start:.2f} s")
+        print(f"query, fresh:    {query_latency(log, args.students, args.queries, 1)}")
+
+        rng = random.Random(2)
+        start = time.perf_counter()
+        for _ in range(args.appended):
+            log.record(f"student{rng.randrange(args.students)}", rng.sample(CONCEPTS, 2))
+        elapsed = time.perf_counter() - start
+        print(f"record:          {elapsed / args.appended * 1e6:.0f} us per explain "
+              f"({len(log) - count:,} events appended)")
+        print(f"query, +appends: {query_latency(log, args.students, args.queries, 3)}")
+
+        now = time.time()
+        start = time.perf_counter()
+        expected = loop_mastery(log._path, 0, log.half_life, now)
+        loop = time.perf_counter() - start
+        got = {item["concept"]: item["level"] for item in log.mastery("student0", now)}
+        worst = max(abs(got[TOPICS[c]] - round(level, 1)) for c, level in expected.items())
+        print(f"loop, 1 student: {loop:.2f} s (max difference {worst:.2f})")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Micro-benchmark: concept scanner vs. the original substring checks.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.scanner
+"""
+import random
+import timeit
+
+from rules import get_rules
+
+
+def legacy_scan(code_text):
+    # Concept and line-count logic as it was in mock_explain_code.
+    lines = code_text.strip().split("\n")
+    num_lines = len(lines)
+    has_loop = any(
+        kw in code_text
+        for kw in ["for ", "while ", "for(", "while("]
+    )
+    has_if = any(
+        kw in code_text
+        for kw in ["if ", "if("]
+    )
+
+    main_concepts = []
+    if has_loop:
+        main_concepts.append("loops")
+    if "[" in code_text or "Array" in code_text or "array" in code_text:
+        main_concepts.append("arrays")
+    if "func" in code_text or "def " in code_text or "void " in code_text:
+        main_concepts.append("functions")
+    if has_if:
+        main_concepts.append("conditions")
+    return main_concepts, num_lines
+
+
+PLAIN_LINES = [
+    "n = int(input())",
+    "s = s + n * 2",
+    "print(\"Sum:\", s)",
+    "total = total - 1",
+]
+SIGNAL_LINES = [
+    "for i in range(n):",
+    "while (k < n) {",
+    "if (x > max) max = x;",
+    "int a[10];",
+    "def helper(x):",
+    "void swap(int *a, int *b) {",
+]
+
+
+def make_source(num_lines, signal_every, seed=7):
+    rng = random.Random(seed)
+    out = []
+    for i in range(num_lines):
+        if signal_every and i % signal_every == signal_every - 1:
+            out.append(rng.choice(SIGNAL_LINES))
+        else:
+            out.append(rng.choice(PLAIN_LINES))
+    return "\n".join(out) + "\n"
+
+
+def bench(func, text, number):
+    best = min(timeit.repeat(lambda: func(text), number=number, repeat=3))
+    return best / number
+
+
+def main():
+    scan = get_rules().detector.scan
+    cases = [
+        # (label, signal_every): dense signals let the scanner stop early,
+        # signal-free sources force a full walk for both implementations.
+        ("dense", 5),
+        ("no signals", 0),
+    ]
+    print(f"{'lines':>9}  {'case':<10}  {'legacy':>12}  {'scanner':>12}  speedup")
+    for num_lines in (10, 100, 1_000, 10_000, 100_000, 1_000_000):
+        number = max(1, 100_000 // num_lines)
+        for label, every in cases:
+            text = make_source(num_lines, every)
+            assert scan(text, "C") == legacy_scan(text), label
+            old = bench(legacy_scan, text, number)
+            new = bench(lambda t: scan(t, "C"), text, number)
+            print(
+                f"{num_lines:>9}  {label:<10}  {old * 1e6:>10.1f}us  "
+                f"{new * 1e6:>10.1f}us  {old / new:>6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Startup time, memory and throughput: ``app.run`` vs. ``serve.py``.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.serve [--workers 1 4] [--requests 4000] [--concurrency 32]
+
+Each server starts in a subprocess: ``app.run(debug=True)`` as ``python
+app.py`` does (reloader and debugger on), ``app.run()`` without them, and
+``serve.py`` with each ``--workers`` count. For each it reports the time
+from launch until ``/`` answers, the latency of the first
+``/api/explain`` (cold imports and rule tables show up here), resident and
+proportional set size per process (PSS splits shared pages between the
+processes using them, so copy-on-write sharing shows as PSS well below
+RSS), and throughput with ``--clients`` load-generator processes keeping
+``--concurrency`` requests in flight, every request with distinct code so
+the cache never answers. Memory is read again after the load.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from bench.concurrency import HOST, free_port, load
+
+KIRO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve_dev(port, debug):
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    import app as mvp
+
+    mvp.app.run(host=HOST, port=port, debug=debug)
+
+
+def process_tree(pid):
+    pids = [pid]
+    for child in pids:
+        try:
+            with open(f"/proc/{child}/task/{child}/children") as f:
+                pids.extend(int(p) for p in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def memory(pid):
+    """(RSS, PSS) in MiB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields["Rss"], fields["Pss"]
+
+
+def tree_memory(pid, workers):
+    """Per-worker RSS and PSS averaged over the processes that serve
+    requests, and PSS summed over the whole tree."""
+    pids = process_tree(pid)
+    usage = [memory(p) for p in pids]
+    serving = usage[-workers:] if len(usage) > 1 else usage
+    rss = sum(u[0] for u in serving) / len(serving)
+    pss = sum(u[1] for u in serving) / len(serving)
+    return rss, pss, sum(u[1] for u in usage)
+
+
+def request(port, method, path, body=None):
+    conn = socket.create_connection((HOST, port), timeout=10)
+    try:
+        payload = json.dumps(body).encode() if body is not None else b""
+        conn.sendall(
+            f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n"
+            f"Accept: application/json\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+        response = b""
+        while chunk := conn.recv(65536):
+            response += chunk
+        return response.split(b" ", 2)[1] == b"200"
+    finally:
+        conn.close()
+
+
+def wait_ready(port, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if request(port, "GET", "/"):
+                return
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def client(job):
+    port, concurrency, total, first = job
+    return asyncio.run(load(port, concurrency, total, first))
+
+
+def run_load(port, clients, concurrency, total):
+    jobs = [(port, max(1, concurrency // clients), total // clients, n * total) for n in range(clients)]
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(client, jobs)
+    ok = sum(len(latencies) for latencies, _, _ in results)
+    errors = sum(errors for _, errors, _ in results)
+    latencies = sorted(l for latencies, _, _ in results for l in latencies)
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1e3 if latencies else 0.0
+    return ok / max(elapsed for _, _, elapsed in results), p99, errors
+
+
+def run_server(label, cmd, workers, args):
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd + ["--port", str(port)], cwd=KIRO, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, proc)
+        startup = time.perf_counter() - start
+        start = time.perf_counter()
+        request(port, "POST", "/api/explain", {"code": "int main(void) { return 0; }", "language": "C"})
+        first = time.perf_counter() - start
+        rss, pss, total_pss = tree_memory(proc.pid, workers)
+        rps, p99, errors = run_load(port, args.clients, args.concurrency, args.requests)
+        rss_after, pss_after, _ = tree_memory(proc.pid, workers)
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(f"{label:<22} {startup:>8.2f} {first * 1e3:>9.1f} {rss:>7.1f} {pss:>7.1f} {total_pss:>9.1f} "
+          f"{rss_after:>7.1f} {pss_after:>7.1f} {rps:>8.0f} {p99:>8.1f} {errors:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--clients", type=int, default=2, help="load-generator processes")
+    parser.add_argument("--serve", choices=("dev", "nodebug"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_dev(args.port, args.serve == "dev")
+        return
+
+    bench = [sys.executable, "-m", "bench.serve", "--serve"]
+    servers = [
+        ("app.run(debug=True)", bench + ["dev"], 1),
+        ("app.run()", bench + ["nodebug"], 1),
+    ]
+    for workers in dict.fromkeys(args.workers):
+        servers.append((f"serve.py --workers {workers}",
+                        [sys.executable, "serve.py", "--host", HOST, "--workers", str(workers)], workers))
+
+    print(f"{args.requests} distinct /api/explain requests, {args.concurrency} in flight, "
+          f"{os.cpu_count()} CPUs; memory in MiB per serving process")
+    print(f"{'server':<22} {'start s':>8} {'first ms':>9} {'RSS':>7} {'PSS':>7} {'PSS total':>9} "
+          f"{'RSS+load':>7} {'PSS+load':>7} {'req/s':>8} {'p99 ms':>8} {'errors':>6}")
+    for label, cmd, workers in servers:
+        run_server(label, cmd, workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Explanation cache hit rate and latency across forked workers.
+
+Run from the ``kiro`` directory::
+
+    python -m bench.shared_cache [--workers 1 4 16] [--requests 40000] [--programs 5000]
+
+A stream of ``--requests`` explain requests over ``--programs`` distinct
+lab programs, with Zipf-distributed popularity (a few starter programs
+that everyone submits, a long tail of individual ones), is spread over
+each number of forked worker processes the way a shared listening socket
+spreads connections. Every worker runs the request through its own
+:class:`cache.ExplanationCache` and computes the explanation on a miss,
+first with only the per-worker LRU (``--lru`` entries each), then with the
+LRU in front of one :class:`shared_cache.SharedCache` file of
+``--shared-mb``. It reports the aggregate hit rate, how many explanations
+were computed, and the median latency of an LRU hit and of a shared-tier
+hit (looked up in every worker at once) in microseconds.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from bench.corpus import CONCEPTS, LANGUAGES, generate
+from cache import ExplanationCache, normalize_code
+from factory import ExplainEngine
+from shared_cache import SharedCache
+
+
+def programs(count, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for n in range(count):
+        language = LANGUAGES[n % len(LANGUAGES)]
+        concepts = tuple(c for c in CONCEPTS if rng.random() < 0.5)
+        out.append((normalize_code(generate(language, concepts, 20, seed=n)), language))
+    return out
+
+
+def zipf_stream(count, requests, s, seed=2):
+    weights = [1.0 / (rank + 1) ** s for rank in range(count)]
+    return random.Random(seed).choices(range(count), weights, k=requests)
+
+
+def run_worker(worker, workers, stream, progs, keys, lru, shared, lookups):
+    engine = ExplainEngine("mvp")
+    cache = ExplanationCache("mvp", maxsize=lru, shared=shared)
+    computed = 0
+    recent = {}  # this worker's most recent keys, still in its LRU
+    for n, index in enumerate(stream):
+        if n % workers != worker:
+            continue
+        code, language = progs[index]
+        recent.pop(index, None)
+        recent[index] = True
+
+        def compute():
+            nonlocal computed
+            computed += 1
+            return engine.explain(code, language, "", "SDE")
+
+        cache.get_or_compute(keys[index], compute)
+    stats = cache.stats()
+
+    # Hit latency: keys this worker holds in its LRU, then (with a shared
+    # tier) keys it never saw, which only the shared table can answer.
+    lru_times = []
+    for key in [keys[index] for index in recent][-min(lookups, lru):]:
+        start = time.perf_counter()
+        cache.get(key)
+        lru_times.append(time.perf_counter() - start)
+    shared_times = []
+    if shared is not None:
+        fresh = ExplanationCache("mvp", maxsize=lru, shared=shared)
+        for key in keys[::max(1, len(keys) // lookups)]:
+            start = time.perf_counter()
+            found = fresh.get(key)
+            elapsed = time.perf_counter() - start
+            if found is not None:
+                shared_times.append(elapsed)
+    return {
+        "hits": stats["hits"],
+        "shared_hits": stats["shared_hits"],
+        "computed": computed,
+        "lru_us": statistics.median(lru_times) * 1e6 if lru_times else 0.0,
+        "shared_us": statistics.median(shared_times) * 1e6 if shared_times else 0.0,
+    }
+
+
+def run(workers, stream, progs, keys, lru, shared, lookups):
+    """Fork ``workers`` processes over the stream; returns their results."""
+    children = []
+    for worker in range(workers):
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            status = 1
+            try:
+                result = run_worker(worker, workers, stream, progs, keys, lru, shared, lookups)
+                with os.fdopen(write, "w") as out:
+                    json.dump(result, out)
+                status = 0
+            finally:
+                os._exit(status)
+        os.close(write)
+        children.append((pid, read))
+    results = []
+    for pid, read in children:
+        with os.fdopen(read) as f:
+            data = f.read()
+        os.waitpid(pid, 0)
+        results.append(json.loads(data))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=40_000)
+    parser.add_argument("--programs", type=int, default=5_000)
+    parser.add_argument("--zipf", type=float, default=1.0, help="popularity skew")
+    parser.add_argument("--lru", type=int, default=1024, help="LRU entries per worker")
+    parser.add_argument("--shared-mb", type=int, default=16)
+    parser.add_argument("--lookups", type=int, default=500, help="timed lookups per worker")
+    args = parser.parse_args()
+
+    progs = programs(args.programs)
+    keyer = ExplanationCache("mvp")
+    keys = [keyer.key_for(code, language, "", "SDE") for code, language in progs]
+    stream = zipf_stream(args.programs, args.requests, args.zipf)
+    print(f"{args.requests} requests over {args.programs} programs (Zipf {args.zipf}), "
+          f"LRU {args.lru} per worker, shared {args.shared_mb} MiB, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'tier':<12} {'hit rate':>9} {'computed':>9} {'LRU hit us':>11} "
+          f"{'shared hit us':>14}")
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as tmp:
+        for workers in args.workers:
+            for tier in ("lru", "lru+shared"):
+                shared = None
+                if tier == "lru+shared":
+                    path = os.path.join(tmp, f"cache-{workers}")
+                    shared = SharedCache(path, size=args.shared_mb << 20)
+                results = run(workers, stream, progs, keys, args.lru, shared, args.lookups)
+                if shared is not None:
+                    shared.close()
+                hits = sum(r["hits"] + r["shared_hits"] for r in results)
+                computed = sum(r["computed"] for r in results)
+                lru_us = statistics.median(r["lru_us"] for r in results)
+                shared_us = statistics.median(r["shared_us"] for r in results)
+                print(f"{workers:>7} {tier:<12} {hits / args.requests:>9.1%} {computed:>9} "
+                      f"{lru_us:>11.2f} {(f'{shared_us:.2f}' if shared else '-'):>14}")
+
+
+if __name__ == "__main__":
+    main()
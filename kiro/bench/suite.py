@@ -0,0 +1,208 @@
+"""Benchmark suite for the explain path, with JSON results for diffing.
+
+Cases:
+
+* ``explain/<language>/<lines>``: ``mock_explain_code`` called directly.
+* ``api/explain/<cold|warm>/<lines>``: ``POST /api/explain`` through the
+  Flask test client, with the cache emptied before every call (cold) or
+  primed (warm).
+* ``home/<identity|gzip|304>``: ``GET /``.
+
+Each case reports ops/s, p50/p95/p99 latency and the peak memory traced
+while it runs (in a separate pass, since tracing slows allocation). Run
+from the ``kiro`` directory::
+
+    python -m bench.suite [--quick] [--filter api/] [--out results.json]
+    python -m bench.suite --compare baseline.json [--threshold 10]
+
+``--compare`` prints the change in ops/s and p99 against an earlier
+``--out`` file and exits non-zero if any case regressed by more than
+``--threshold`` percent.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import app as mvp
+from bench.corpus import LANGUAGES, generate
+
+SIZES = (10, 100, 1_000, 10_000)
+QUICK_SIZES = (10, 1_000)
+API_LANGUAGE = "C"
+API_CONCEPTS = ("loops", "arrays", "conditions")
+
+
+class Case:
+    """One benchmark: ``run()`` is timed, ``setup()`` runs untimed before it."""
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+
+
+def explain_cases(sizes):
+    cases = []
+    for language in LANGUAGES:
+        for size in sizes:
+            code = generate(language, ("loops", "arrays", "functions", "conditions"), size)
+            cases.append(Case(
+                f"explain/{language}/{size}",
+                lambda code=code, language=language: mvp.mock_explain_code(code, language, "", "SDE"),
+            ))
+    return cases
+
+
+def api_cases(sizes):
+    client = mvp.app.test_client()
+    cases = []
+    for size in sizes:
+        payload = {
+            "code": generate(API_LANGUAGE, API_CONCEPTS, size),
+            "language": API_LANGUAGE,
+            "job_role": "SDE",
+        }
+
+        def post(payload=payload):
+            response = client.post("/api/explain", json=payload)
+            assert response.status_code == 200
+
+        cases.append(Case(f"api/explain/cold/{size}", post, setup=mvp.explain_cache.clear))
+        cases.append(Case(f"api/explain/warm/{size}", post))
+    return cases
+
+
+def home_cases():
+    client = mvp.app.test_client()
+    etag = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    cases = []
+    for name, headers, status in (
+        ("identity", {}, 200),
+        ("gzip", {"Accept-Encoding": "gzip"}, 200),
+        ("304", {"Accept-Encoding": "gzip", "If-None-Match": etag}, 304),
+    ):
+        def get(headers=headers, status=status):
+            assert client.get("/", headers=headers).status_code == status
+
+        cases.append(Case(f"home/{name}", get))
+    return cases
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def measure(case, seconds, min_ops):
+    for _ in range(3):  # warm-up
+        if case.setup:
+            case.setup()
+        case.run()
+
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while len(samples) < min_ops or time.perf_counter() < deadline:
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.run()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    mem_ops = max(1, min(len(samples) // 10, 50))
+    tracemalloc.start()
+    for _ in range(mem_ops):
+        if case.setup:
+            case.setup()
+        case.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "ops": len(samples),
+        "ops_per_sec": len(samples) / sum(samples),
+        "p50_us": percentile(samples, 0.50) * 1e6,
+        "p95_us": percentile(samples, 0.95) * 1e6,
+        "p99_us": percentile(samples, 0.99) * 1e6,
+        "peak_kib": peak / 1024,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print per-case changes; return the names of regressed cases."""
+    regressed = []
+    print(f"\n{'case':<32} {'ops/s':>10} {'p99':>10}")
+    for name, current in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ops_change = (current["ops_per_sec"] / old["ops_per_sec"] - 1) * 100
+        p99_change = (current["p99_us"] / old["p99_us"] - 1) * 100
+        flag = ""
+        if ops_change < -threshold or p99_change > threshold:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<32} {ops_change:>+9.1f}% {p99_change:>+9.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="fewer sizes, shorter runs")
+    parser.add_argument("--seconds", type=float, default=None, help="time budget per case")
+    parser.add_argument("--min-ops", type=int, default=20)
+    parser.add_argument("--filter", default="", help="only cases whose name contains this")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="earlier --out file to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold, percent")
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    seconds = args.seconds if args.seconds is not None else (0.3 if args.quick else 1.0)
+    cases = explain_cases(sizes) + api_cases(sizes) + home_cases()
+    cases = [case for case in cases if args.filter in case.name]
+
+    results = {}
+    print(f"{'case':<32} {'ops/s':>10} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'peak KiB':>9}")
+    for case in cases:
+        r = results[case.name] = measure(case, seconds, args.min_ops)
+        print(
+            f"{case.name:<32} {r['ops_per_sec']:>10.0f} {r['p50_us']:>10.1f} "
+            f"{r['p95_us']:>10.1f} {r['p99_us']:>10.1f} {r['peak_kib']:>9.1f}"
+        )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "meta": {
+                    "revision": git_revision(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "seconds": seconds,
+                },
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"\nwrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
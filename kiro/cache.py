@@ -0,0 +1,291 @@
+"""Content-addressed cache for code explanations.
+
+Entries are keyed by a SHA-256 over the whitespace-normalized code plus the
+request options, so pastes that only differ in spacing share one entry.
+Lookups go to a bounded in-memory LRU first, then, if configured, to a
+table in shared memory that every worker process on the machine sees
+(``shared_cache``) and to a SQLite file that survives restarts.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import env_float, env_int, env_str
+from shared_cache import SharedCache
+from singleflight import SingleFlight
+
+_LINE_END_RE = re.compile(r"\r\n?")
+
+# SQLite rows past the TTL are deleted once every this many stores.
+PRUNE_EVERY = 256
+
+
+def normalize_code(code_text):
+    """Canonical form of a paste: unified newlines, trailing spaces and tabs
+    removed, runs of them after a line's indentation collapsed to one space,
+    no blank lines at either end. Indentation is kept: in Python it is the
+    block structure."""
+    return "\n".join(normalize_lines(code_text)).strip("\n")
+
+
+def etag_for(key, fmt=None):
+    """Strong ETag for the response built from the entry under ``key``.
+
+    The key covers the normalized code, the request options and the rules
+    version, so a matching ETag means the body would be the same; each
+    response format (``None`` for JSON, ``"ndjson"``, ``"sse"``) gets its own.
+    """
+    tag = key[:32]
+    return f"{tag}-{fmt}" if fmt else tag
+
+
+def normalize_lines(text):
+    """``text`` split into lines as :func:`normalize_code` leaves them, keeping
+    blank lines at either end."""
+    if "\r" in text:
+        text = _LINE_END_RE.sub("\n", text)
+    return [_normalize_line(line) for line in text.split("\n")]
+
+
+def _normalize_line(line):
+    # Plain str methods, one linear pass each; whitespace regexes anchored at
+    # line ends backtrack quadratically on long runs of spaces.
+    body = line.strip(" \t")
+    if not body:
+        return ""
+    indent = line[:len(line) - len(line.lstrip(" \t"))]
+    if "  " in body or "\t" in body:
+        body = " ".join(filter(None, body.replace("\t", " ").split(" ")))
+    return indent + body
+
+
+class ExplanationCache:
+    """Thread-safe LRU + TTL cache with optional shared-memory and SQLite tiers."""
+
+    def __init__(self, namespace, maxsize=1024, ttl=3600.0, db_path=None, version=None,
+                 lock_dir=None, shared=None):
+        self.namespace = namespace
+        self.version = version  # callable; its result is mixed into every key
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db_path = db_path
+        self.shared = shared  # SharedCache or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.flights = SingleFlight(lock_dir)
+        self._counters = dict.fromkeys(
+            ("hits", "shared_hits", "disk_hits", "misses", "evictions", "expirations", "pruned"), 0
+        )
+        self._stores = 0
+        if db_path:
+            self._db().execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db().execute(
+                "CREATE INDEX IF NOT EXISTS explanations_stored_at ON explanations (stored_at)"
+            )
+            self.prune()
+
+    @classmethod
+    def from_env(cls, namespace, version=None):
+        ttl = env_float("CACHE_TTL", 3600.0)
+        return cls(
+            namespace,
+            maxsize=env_int("CACHE_SIZE", 1024),
+            ttl=ttl,
+            db_path=env_str("CACHE_DB"),
+            version=version,
+            lock_dir=env_str("SINGLEFLIGHT_DIR"),
+            shared=SharedCache.from_env(ttl),
+        )
+
+    def init_app(self, app):
+        app.extensions["explain_cache"] = self
+
+    def key_for(self, normalized_code, language, concept, job_role):
+        return self._key((self.namespace, language, concept, job_role), normalized_code)
+
+    def scan_key_for(self, normalized_code, language):
+        """Key for what detection found in a program, shared by every
+        concept and job role it is explained for."""
+        return self._key(("scan", self.namespace, language), normalized_code)
+
+    def _key(self, parts, normalized_code):
+        digest = hashlib.sha256()
+        if self.version is not None:
+            digest.update(f"{self.version()}\0".encode())
+        for part in parts:
+            digest.update(f"{part}\0".encode("utf-8", "surrogatepass"))
+        digest.update(normalized_code.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    # ---------- lookups ----------
+
+    def get(self, key):
+        value = self._lookup(key)
+        if value is None:
+            with self._lock:
+                self._counters["misses"] += 1
+        return value
+
+    def get_local(self, key, now=None):
+        """Value for ``key`` from the in-process LRU only, or None (not
+        counted as a miss); never waits on the shared or SQLite tier."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if now - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counters["expirations"] += 1
+        return None
+
+    @property
+    def blocking(self):
+        """True when lookups and stores may wait on file locks or disk."""
+        return self.shared is not None or bool(self.db_path)
+
+    def _lookup(self, key):
+        now = time.time()
+        value = self.get_local(key, now)
+        if value is not None:
+            return value
+
+        if self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                with self._lock:
+                    self._counters["shared_hits"] += 1
+                    self._remember(key, value, stored_at)
+                return value
+
+        if self.db_path:
+            row = self._db().execute(
+                "SELECT value, stored_at FROM explanations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] < self.ttl:
+                value = json.loads(row[0])
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                    self._remember(key, value, row[1])
+                if self.shared is not None:
+                    self.shared.put(key, value, row[1])
+                return value
+        return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+        if self.shared is not None:
+            self.shared.put(key, value, now)
+        if self.db_path:
+            with self._db() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO explanations (key, value, stored_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, json.dumps(value), now),
+                )
+            with self._lock:
+                self._stores += 1
+                prune = self._stores % PRUNE_EVERY == 0
+            if prune:
+                self.prune(now)
+
+    def get_or_compute(self, key, compute):
+        """Cached value for ``key``; concurrent misses compute it only once."""
+        value = self.get(key)
+        if value is None:
+            value = self.flights.do(key, lambda: self.fill(key, compute))
+        return value
+
+    def fill(self, key, compute):
+        """Compute and store ``key`` as a single-flight leader."""
+        with self.flights.worker_lock(key):
+            value = self.recheck(key)
+            if value is None:
+                value = compute()
+                self.put(key, value)
+        return value
+
+    def recheck(self, key):
+        # A leader that finished just before this one started, or another
+        # worker holding the lock, may have stored the value meanwhile.
+        value = self._lookup(key)
+        if value is not None:
+            self.flights.record("late_hits")
+        return value
+
+    # ---------- maintenance ----------
+
+    def clear(self):
+        with self._lock:
+            flushed = len(self._entries)
+            self._entries.clear()
+        if self.shared is not None:
+            flushed = max(flushed, self.shared.clear())
+        if self.db_path:
+            with self._db() as db:
+                flushed = max(flushed, db.execute("DELETE FROM explanations").rowcount)
+        return flushed
+
+    def prune(self, now=None):
+        """Delete SQLite rows older than the TTL; returns how many."""
+        if not self.db_path:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.ttl
+        with self._db() as db:
+            pruned = db.execute("DELETE FROM explanations WHERE stored_at <= ?", (cutoff,)).rowcount
+        with self._lock:
+            self._counters["pruned"] += pruned
+        return pruned
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+        stats["maxsize"] = self.maxsize
+        stats["ttl"] = self.ttl
+        stats["persistent"] = bool(self.db_path)
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        stats["singleflight"] = self.flights.stats()
+        return stats
+
+    def close_db(self):
+        """Close this thread's SQLite connection; call before forking, since
+        a connection must not be used from two processes."""
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def _remember(self, key, value, stored_at):
+        # Caller holds self._lock.
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _db(self):
+        # sqlite3 connections are per thread; WAL lets readers run beside a writer.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
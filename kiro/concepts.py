@@ -0,0 +1,201 @@
+"""Concept detection for pasted lab programs.
+
+Concepts are classified from code only (see ``lexer``), so keywords and
+brackets inside comments, printf strings or docstrings no longer count.
+Keywords must appear as whole words; ``[`` and identifier fragments such as
+``array``/``func`` are plain substring checks on the code text.
+
+A cheap substring pre-check on the raw text first drops concepts whose
+signals do not occur at all. Lab-sized sources (up to ``SMALL_SOURCE``)
+are then lexed whole and the remaining concepts checked once on the code,
+keywords by ``str.find`` plus a boundary test rather than a regex. Larger
+ones are walked chunk by chunk, checking only the concepts still pending,
+and the walk stops as soon as all candidates are found. Line counting
+works on index bounds instead of ``strip().split()`` copies.
+
+The signal table itself lives in ``rules.json``; ``rules.get_rules().detector``
+is the active :class:`ConceptDetector`.
+"""
+import re
+
+from lexer import Lexer
+
+SCAN_CHUNK = 1 << 16
+_FIRST_CHUNK = 1 << 10
+# Sources up to this size are lexed whole and checked once; chunking and
+# stopping early only pay off on larger ones.
+SMALL_SOURCE = 1 << 14
+_NON_SPACE_RE = re.compile(r"\S")
+_TAIL_CHUNK = 4096
+
+
+class ConceptScanner:
+    """Incremental concept detection over chunks of one source."""
+
+    def __init__(self, detector, language, candidates=None):
+        self.found = set()
+        self._order = detector.order
+        self._pending = [
+            (name,) + detector.rules[name][:2]
+            for name in (detector.order if candidates is None else candidates)
+        ]
+        self._lexer = Lexer(language)
+
+    @property
+    def complete(self):
+        return not self._pending
+
+    def feed(self, chunk):
+        if self._pending:
+            self._check(self._lexer.feed(chunk))
+
+    def close(self):
+        if self._pending:
+            self._check(self._lexer.close())
+
+    def concepts(self):
+        return [c for c in self._order if c in self.found]
+
+    def _check(self, segments):
+        code = " ".join(segments)
+        if not code:
+            return
+        hits = [
+            name for name, keyword_re, substrings in self._pending
+            if (keyword_re is not None and keyword_re.search(code))
+            or any(s in code for s in substrings)
+        ]
+        if hits:
+            self.found.update(hits)
+            self._pending = [p for p in self._pending if p[0] not in self.found]
+
+
+def count_lines(code_text):
+    """Return ``len(code_text.strip().split("\\n"))`` without copying the text."""
+    if len(code_text) <= SCAN_CHUNK:
+        return code_text.strip().count("\n") + 1
+
+    first = _NON_SPACE_RE.search(code_text)
+    if first is None:
+        return 1
+    start = first.start()
+
+    # Walk back over trailing whitespace a block at a time.
+    end = len(code_text)
+    while end - _TAIL_CHUNK > start and code_text[end - _TAIL_CHUNK:end].isspace():
+        end -= _TAIL_CHUNK
+    while code_text[end - 1].isspace():
+        end -= 1
+
+    return code_text.count("\n", start, end) + 1
+
+
+def _is_word(char):
+    # The characters re's \b treats as part of a word.
+    return char.isalnum() or char == "_"
+
+
+def _word(keyword):
+    """``keyword`` with whether it starts and ends with a word character."""
+    return keyword, _is_word(keyword[0]), _is_word(keyword[-1])
+
+
+def _has_signal(code, substrings, words):
+    """True if ``code`` contains one of ``substrings`` or one of ``words``
+    (see :func:`_word`) as a whole word.
+
+    Same result as the keyword regex, but on lab-sized code the few
+    occurrences ``str.find`` turns up are checked faster in Python than the
+    regex engine tests every position; plain loops, because generator
+    expressions cost more than the checks themselves here.
+    """
+    for substring in substrings:
+        if substring in code:
+            return True
+    for keyword, head, tail in words:
+        at = code.find(keyword)
+        while at != -1:
+            after = at + len(keyword)
+            # A word boundary on each side, as r"\b" tests it.
+            if ((at > 0 and _is_word(code[at - 1])) != head
+                    and (after < len(code) and _is_word(code[after])) != tail):
+                return True
+            at = code.find(keyword, at + 1)
+    return False
+
+
+def _keyword_re(keywords):
+    # Same matches as r"\b(?:kw|...)\b", but each branch starts with its
+    # literal first character and checks the boundary behind it, so the
+    # regex engine can skip to candidate characters instead of testing \b at
+    # every position (several times faster on code without the keywords).
+    branches = [
+        "%s(?<=\\b%s)%s" % (re.escape(k[0]), re.escape(k[0]), re.escape(k[1:]))
+        for k in keywords
+    ]
+    return re.compile(r"(?:%s)\b" % "|".join(branches))
+
+
+class ConceptDetector:
+    """Concept signals compiled for scanning.
+
+    ``signals`` is a sequence of ``(name, keywords, substrings)`` in the
+    order concepts are reported (see ``rules.json``).
+    """
+
+    def __init__(self, signals):
+        self.order = tuple(name for name, _, _ in signals)
+        self.rules = {
+            name: (
+                _keyword_re(keywords) if keywords else None,
+                tuple(substrings),
+                tuple(keywords) + tuple(substrings),
+            )
+            for name, keywords, substrings in signals
+        }
+        # For lab-sized code: (bit, name, substrings, words, needles).
+        self._signals = [
+            (bit, name, tuple(substrings), tuple(_word(k) for k in keywords),
+             tuple(keywords) + tuple(substrings))
+            for bit, (name, keywords, substrings) in enumerate(signals)
+        ]
+
+    def scanner(self, language, candidates=None):
+        return ConceptScanner(self, language, candidates)
+
+    def detect(self, code_text, language):
+        """Return the concepts found in code, in ``order``."""
+        candidates = [
+            name for _, name, _, _, needles in self._signals
+            if _has_signal(code_text, needles, ())
+        ]
+        if not candidates:
+            return []
+        if len(code_text) <= SMALL_SOURCE:
+            code = " ".join(Lexer(language).segments(code_text))
+            mask = self.mask(code, candidates)
+            return [name for bit, name in enumerate(self.order) if mask >> bit & 1]
+
+        # Start small and double, so signal-dense sources stop after a few
+        # lines while large ones are still walked in bounded chunks.
+        scanner = self.scanner(language, candidates)
+        pos, size = 0, _FIRST_CHUNK
+        while pos < len(code_text) and not scanner.complete:
+            scanner.feed(code_text[pos:pos + size])
+            pos += size
+            size = min(size * 2, SCAN_CHUNK)
+        scanner.close()
+        return scanner.concepts()
+
+    def mask(self, code, candidates=None):
+        """Bit ``i`` set when ``code`` (code only, see ``lexer``) carries a
+        signal of concept ``order[i]``; only ``candidates`` are checked if given."""
+        mask = 0
+        for bit, name, substrings, words, _ in self._signals:
+            if (candidates is None or name in candidates) and _has_signal(code, substrings, words):
+                mask |= 1 << bit
+        return mask
+
+    def scan(self, code_text, language):
+        """Return ``(concepts, num_lines)`` for a submission."""
+        return self.detect(code_text, language), count_lines(code_text)
@@ -0,0 +1,30 @@
+"""Environment-driven settings for the Lab Code Assistant apps.
+
+Every setting is read from a ``LABCODE_<NAME>`` environment variable so the
+MVP still runs with zero configuration.
+"""
+import os
+
+ENV_PREFIX = "LABCODE_"
+
+
+def env_str(name, default=None):
+    value = os.environ.get(ENV_PREFIX + name)
+    return default if value is None or value == "" else value
+
+
+def env_int(name, default):
+    value = env_str(name)
+    return default if value is None else int(value)
+
+
+def env_float(name, default):
+    value = env_str(name)
+    return default if value is None else float(value)
+
+
+def env_bool(name, default=False):
+    value = env_str(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
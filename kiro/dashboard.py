@@ -0,0 +1,424 @@
+"""Class dashboard: what each class explained and practised, per concept
+and day.
+
+Students join a class through ``POST /api/classes/<class>/students`` or an
+``X-Class-Id`` header sent with ``X-Student-Id`` to ``/api/explain``.
+Enrolments are appended to ``roster.txt`` in the progress directory; each
+student gets the next position in their class, or back the position they
+had there if they rejoin it.
+
+Every event the progress log records (see ``progress``) also updates one
+aggregate per (class, day, concept): explanation and practice counts, and
+the students involved as a bitset over class positions. The dashboard
+reads only the aggregates for the days it shows, so it answers as fast
+after a year of history as after a week. Distinct students over several
+days are the OR of the daily bitsets. Days are UTC.
+
+Aggregates are checkpointed to ``dashboard.json`` with the log offset they
+cover, every ``checkpoint_events`` events and after a rebuild; on startup
+the events past the checkpoint are replayed. ``python dashboard.py
+rebuild`` (server stopped) or ``POST /api/admin/dashboard/rebuild``
+reconstructs them from the raw log with NumPy. A student who changes class
+keeps their earlier activity in the old class until the next rebuild,
+which credits all of it to the current one.
+"""
+import argparse
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import Blueprint, current_app, jsonify, request
+
+from config import env_int, env_str
+from progress import DAY, EXPLAIN, STUDENT_RE, ProgressError, ProgressLog, trim_torn_tail
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+MAX_DAYS = 90
+MAX_ROSTER = 5000
+# Aggregates whose student bitsets are built at once during a rebuild;
+# bounds the ``rows x class size`` boolean matrix.
+_REBUILD_ROWS = 4096
+
+dashboard_bp = Blueprint("dashboard", __name__)
+
+
+def _check_id(value, what):
+    if not isinstance(value, str) or not STUDENT_RE.match(value):
+        raise ProgressError(f"{what} id must be 1-64 letters, digits or ._@+-")
+
+
+def _popcount(bits):
+    # int.bit_count() needs Python 3.10.
+    return bin(bits).count("1")
+
+
+def _date(day):
+    return datetime.datetime.fromtimestamp(day * DAY, datetime.timezone.utc).date().isoformat()
+
+
+class _Roster:
+    """Student -> class, kept as appended ``student<TAB>class`` lines;
+    the last line for a student wins."""
+
+    def __init__(self, path):
+        trim_torn_tail(path)
+        self.class_of = {}
+        self.position = {}  # student -> position in their class
+        self.slots = {}  # class -> positions handed out, including students who left
+        self.held = {}  # (class, student) -> position, kept after they leave
+        self.sizes = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8", newline="") as f:
+                for line in f:
+                    student, _, class_id = line.rstrip("\n").partition("\t")
+                    self._assign(student, class_id)
+        self._file = open(path, "a", encoding="utf-8", newline="")
+
+    def _assign(self, student, class_id):
+        previous = self.class_of.get(student)
+        if previous == class_id:
+            return False
+        if previous is not None:
+            self.sizes[previous] -= 1
+        self.class_of[student] = class_id
+        position = self.held.get((class_id, student))
+        if position is None:
+            position = self.held[class_id, student] = self.slots.get(class_id, 0)
+            self.slots[class_id] = position + 1
+        self.position[student] = position
+        self.sizes[class_id] = self.sizes.get(class_id, 0) + 1
+        return True
+
+    def enroll(self, student, class_id):
+        if self._assign(student, class_id):
+            self._file.write(f"{student}\t{class_id}\n")
+            self._file.flush()
+
+
+class ClassDashboard:
+    def __init__(self, log, checkpoint_events=50_000):
+        self.log = log
+        self.checkpoint_events = checkpoint_events
+        self._roster = _Roster(os.path.join(log.directory, "roster.txt"))
+        self._path = os.path.join(log.directory, "dashboard.json")
+        self._cells = {}  # (class, day) -> {concept: [explains, practices, student bits]}
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()  # one writer; the newest snapshot lands last
+        self._checkpointing = False
+        self.offset = self._checkpointed = self._load()
+        if self.offset is None:
+            self.offset = self._checkpointed = 0
+            if len(log):
+                self.rebuild()
+        with self._lock:
+            log.listeners.append(self._on_record)
+            self._replay(self.offset, len(log))
+
+    @classmethod
+    def from_env(cls, log):
+        """The dashboard for a progress log, or None without one."""
+        if log is None:
+            return None
+        return cls(log, checkpoint_events=env_int("DASHBOARD_CHECKPOINT_EVENTS", 50_000))
+
+    def init_app(self, app):
+        app.extensions["class_dashboard"] = self
+
+    # ---------- updates ----------
+
+    def enroll(self, student, class_id):
+        _check_id(student, "student")
+        _check_id(class_id, "class")
+        with self._lock:
+            self._roster.enroll(student, class_id)
+
+    def _add(self, when, student, concept, kind):
+        name = self._student_names[student]
+        class_id = self._roster.class_of.get(name)
+        if class_id is None:
+            return
+        cells = self._cells.setdefault((class_id, int(when // DAY)), {})
+        cell = cells.get(concept)
+        if cell is None:
+            cell = cells[concept] = [0, 0, 0]
+        cell[0 if kind == EXPLAIN else 1] += 1
+        cell[2] |= 1 << self._roster.position[name]
+
+    def _replay(self, start, stop):
+        """Fold events ``[start, stop)`` in one by one; caller holds the lock."""
+        self._student_names = self.log.student_names()
+        if stop > start:
+            for when, student, concept, kind, _ in self.log.read(start, stop).tolist():
+                self._add(when, student, concept, kind)
+        self.offset = max(self.offset, stop)
+
+    def _on_record(self, records, count):
+        with self._lock:
+            start = count - len(records)
+            if count <= self.offset:
+                return  # already read back from the log by _replay
+            self._replay(self.offset, start)
+            for when, student, concept, kind, _ in records.tolist():
+                self._add(when, student, concept, kind)
+            self.offset = count
+            due = count - self._checkpointed >= self.checkpoint_events
+        if due:
+            self._checkpoint_in_background()
+
+    # ---------- rebuild ----------
+
+    def _aggregate(self, records):
+        """Aggregates for ``records`` with NumPy; Python only touches one
+        item per (class, day, concept)."""
+        names = self.log.student_names()
+        with self._lock:
+            classes = list(self._roster.slots)
+            class_of = dict(self._roster.class_of)
+            position = dict(self._roster.position)
+        class_ids = {class_id: number for number, class_id in enumerate(classes)}
+        student_class = np.full(len(names), -1, np.int64)
+        student_position = np.zeros(len(names), np.int64)
+        for number, name in enumerate(names):
+            if name in class_of:
+                student_class[number] = class_ids[class_of[name]]
+                student_position[number] = position[name]
+
+        owner = student_class[records["student"]]
+        keep = owner >= 0
+        records, owner = records[keep], owner[keep]
+        if not len(records):
+            return {}
+        day = (records["time"] // DAY).astype(np.int64)
+        first_day = int(day.min())
+        days = int(day.max()) - first_day + 1
+        concepts = int(records["concept"].max()) + 1
+        key = (owner * days + (day - first_day)) * concepts + records["concept"]
+        keys, group = np.unique(key, return_inverse=True)
+        explains = np.bincount(group, records["kind"] == EXPLAIN, len(keys)).astype(np.int64)
+        practices = np.bincount(group, minlength=len(keys)) - explains
+
+        width = int(student_position.max()) + 1
+        # Sorted so each chunk of rows is a slice; duplicates set the same bit.
+        pairs = np.sort(group * width + student_position[records["student"]])
+        pair_group, pair_position = np.divmod(pairs, width)
+        bits = []
+        for start in range(0, len(keys), _REBUILD_ROWS):
+            stop = min(start + _REBUILD_ROWS, len(keys))
+            lo, hi = np.searchsorted(pair_group, [start, stop])
+            matrix = np.zeros((stop - start, width), bool)
+            matrix[pair_group[lo:hi] - start, pair_position[lo:hi]] = True
+            packed = np.packbits(matrix, axis=1, bitorder="little")
+            bits.extend(int.from_bytes(row, "little") for row in map(bytes, packed))
+
+        owner_day, concept = np.divmod(keys, concepts)
+        owner, day = np.divmod(owner_day, days)
+        cells = {}
+        for row in zip(owner.tolist(), (day + first_day).tolist(), concept.tolist(),
+                       explains.tolist(), practices.tolist(), bits):
+            cells.setdefault((classes[row[0]], row[1]), {})[row[2]] = [row[3], row[4], row[5]]
+        return cells
+
+    def rebuild(self):
+        """Recompute every aggregate from the raw log and checkpoint it."""
+        end = len(self.log)
+        cells = self._aggregate(self.log.read(0, end))
+        with self._lock:
+            previous, self._cells = self._cells, cells
+            try:
+                self._replay(end, self.offset)  # recorded while we aggregated
+            except BaseException:
+                self._cells = previous
+                raise
+            self.offset = max(self.offset, end)
+        self.checkpoint()
+        return self.stats()
+
+    # ---------- checkpoints ----------
+
+    def _load(self):
+        try:
+            with open(self._path, "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or not 0 <= data.get("offset", -1) <= len(self.log):
+            return None
+        for class_id, day, concept, explains, practices, bits in data.get("cells", ()):
+            self._cells.setdefault((class_id, day), {})[concept] = [explains, practices, int(bits, 16)]
+        return data["offset"]
+
+    def checkpoint(self):
+        with self._checkpoint_lock:
+            with self._lock:
+                offset = self.offset
+                rows = [
+                    [class_id, day, concept, cell[0], cell[1], format(cell[2], "x")]
+                    for (class_id, day), cells in self._cells.items()
+                    for concept, cell in cells.items()
+                ]
+            fd, tmp = tempfile.mkstemp(
+                dir=os.path.dirname(self._path), prefix="dashboard.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"offset": offset, "cells": rows}, f)
+                os.replace(tmp, self._path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+        with self._lock:
+            self._checkpointed = max(self._checkpointed, offset)
+
+    def _checkpoint_in_background(self):
+        with self._lock:
+            if self._checkpointing:
+                return
+            self._checkpointing = True
+
+        def run():
+            try:
+                self.checkpoint()
+            finally:
+                self._checkpointing = False
+
+        threading.Thread(target=run, name="dashboard-checkpoint", daemon=True).start()
+
+    # ---------- queries ----------
+
+    def summary(self, class_id, days=7, end_day=None):
+        """Activity per concept and per day over the ``days`` ending at
+        ``end_day`` (default today)."""
+        if end_day is None:
+            end_day = int(time.time() // DAY)
+        concept_names = self.log.concept_names()
+        totals = {}
+        series = []
+        active = 0
+        with self._lock:
+            enrolled = self._roster.sizes.get(class_id, 0)
+            for day in range(end_day - days + 1, end_day + 1):
+                explains = practices = students = 0
+                for concept, (e, p, bits) in self._cells.get((class_id, day), {}).items():
+                    total = totals.get(concept)
+                    if total is None:
+                        total = totals[concept] = [0, 0, 0]
+                    total[0] += e
+                    total[1] += p
+                    total[2] |= bits
+                    explains += e
+                    practices += p
+                    students |= bits
+                series.append({
+                    "date": _date(day),
+                    "explains": explains,
+                    "practices": practices,
+                    "students": _popcount(students),
+                })
+                active |= students
+        concepts = [
+            {
+                "concept": concept_names[concept],
+                "explains": e,
+                "practices": p,
+                "students": _popcount(bits),
+            }
+            for concept, (e, p, bits) in totals.items()
+        ]
+        concepts.sort(key=lambda item: (-item["students"], item["concept"]))
+        return {
+            "class": class_id,
+            "from": _date(end_day - days + 1),
+            "to": _date(end_day),
+            "enrolled": enrolled,
+            "active_students": _popcount(active),
+            "concepts": concepts,
+            "days": series,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "classes": sum(1 for size in self._roster.sizes.values() if size),
+                "students": len(self._roster.class_of),
+                "aggregates": sum(map(len, self._cells.values())),
+                "offset": self.offset,
+                "checkpointed": self._checkpointed,
+            }
+
+
+# ---------- endpoints ----------
+
+def _dashboard():
+    return current_app.extensions.get("class_dashboard")
+
+
+@dashboard_bp.route("/api/classes/<class_id>/dashboard", methods=["GET"])
+def api_class_dashboard(class_id):
+    """``?days=7[&end=YYYY-MM-DD]``: per-concept and per-day activity."""
+    dashboard = _dashboard()
+    if dashboard is None:
+        return jsonify({"error": "progress tracking is disabled"}), 503
+    try:
+        days = int(request.args.get("days", 7))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= MAX_DAYS:
+        return jsonify({"error": f"days must be between 1 and {MAX_DAYS}"}), 400
+    end_day = None
+    if request.args.get("end"):
+        try:
+            end = datetime.date.fromisoformat(request.args["end"])
+        except ValueError:
+            return jsonify({"error": "end must be a YYYY-MM-DD date"}), 400
+        end_day = (end - datetime.date(1970, 1, 1)).days
+    return jsonify(dashboard.summary(class_id, days, end_day))
+
+
+@dashboard_bp.route("/api/classes/<class_id>/students", methods=["POST"])
+def api_class_enroll(class_id):
+    """Enrol ``{"students": [ids]}`` in a class, moving them from any other."""
+    dashboard = _dashboard()
+    if dashboard is None:
+        return jsonify({"error": "progress tracking is disabled"}), 503
+    payload = request.get_json(force=True, silent=True)
+    students = payload.get("students") if isinstance(payload, dict) else None
+    if not isinstance(students, list) or not 1 <= len(students) <= MAX_ROSTER:
+        return jsonify({"error": f"expected {{students: [1 to {MAX_ROSTER} ids]}}"}), 400
+    try:
+        for student in students:
+            dashboard.enroll(student, class_id)
+    except ProgressError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"class": class_id, "enrolled": len(students)})
+
+
+# ---------- command line ----------
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the class dashboard from the event log.")
+    parser.add_argument("command", choices=("rebuild",))
+    parser.add_argument("--dir", default=env_str("PROGRESS_DIR"),
+                        help="progress directory (default: LABCODE_PROGRESS_DIR)")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("no progress directory: pass --dir or set LABCODE_PROGRESS_DIR")
+    if np is None:
+        parser.error("the dashboard rebuild needs numpy")
+    start = time.perf_counter()
+    stats = ClassDashboard(ProgressLog(args.dir)).rebuild()
+    print(f"{stats['aggregates']} aggregates for {stats['classes']} classes from "
+          f"{stats['offset']} events in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
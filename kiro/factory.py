@@ -0,0 +1,311 @@
+"""Application factory shared by both UIs.
+
+``create_app("mvp")`` serves ``templates/mvp.html`` and
+``create_app("dashboard")`` serves ``templates/dashboard.html``; the
+explanation engine, cache, intake, metrics, profiling and the optional
+features configured from ``LABCODE_*`` are the same code for both, and
+only the ``rules.json`` profile used for wording differs.
+
+``app.py`` and ``app1.py`` each build one app at import, for the
+development server and for the benchmarks; ``serve.py`` builds one, warms
+it up with :func:`warm_up` and runs it in pre-forked workers.
+"""
+import os
+from time import monotonic
+
+from flask import Flask, g, jsonify, request
+
+from admin import admin_bp
+from admission import AdmissionControl, Overloaded
+from batch import BatchExplainer, batch_bp
+from cache import ExplanationCache, etag_for, normalize_code
+from dashboard import ClassDashboard, dashboard_bp
+from incremental import IncrementalAnalyzer, incremental_bp
+from intake import IntakeLimits, SubmissionError, read_submission
+from metrics import NULL_CLOCK, ExplainMetrics, metrics_bp
+from pathways import ConceptGraph, pathways_bp
+from practice import practice_bp
+from profiling import RequestProfiler, profiled
+from progress import ProgressError, ProgressLog, progress_bp
+from rules import get_rules, rules_version
+from similarity import SimilarityIndex, similarity_bp
+from static_page import PrerenderedPage
+from streaming import coalesced_sections, stream_format, stream_response
+
+UIS = ("mvp", "dashboard")
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# WSGI environ key set on warm-up requests; they are not recorded.
+WARMUP = "labcode.warmup"
+
+# Explanations may be kept but must be revalidated: reloading the rules
+# changes every ETag. The body depends on Accept (JSON or a stream format).
+EXPLAIN_HEADERS = {"Cache-Control": "no-cache", "Vary": "Accept"}
+
+# One small program per language, so warm-up touches every detector.
+WARMUP_PROGRAMS = {
+    "C": "#include <stdio.h>\nint main(void)\n{\n    int a[3] = {1, 2, 3};\n"
+         "    for (int i = 0; i < 3; i++)\n        if (a[i] > 1)\n"
+         "            printf(\"%d\\n\", a[i]);\n    return 0;\n}\n",
+    "C++": "#include <iostream>\n#include <vector>\nint twice(int v) { return v * 2; }\n"
+           "int main() {\n    std::vector<int> v = {1, 2, 3};\n"
+           "    for (int x : v) if (x > 1) std::cout << twice(x);\n}\n",
+    "Java": "public class Main {\n    static int twice(int v) { return v * 2; }\n"
+            "    public static void main(String[] args) {\n        int[] a = {1, 2, 3};\n"
+            "        for (int i = 0; i < a.length; i++)\n"
+            "            if (a[i] > 1) System.out.println(twice(a[i]));\n    }\n}\n",
+    "Python": "def twice(v):\n    return v * 2\n\nitems = [1, 2, 3]\n"
+              "for x in items:\n    if x > 1:\n        print(twice(x))\n",
+}
+
+
+def read_template(ui):
+    with open(os.path.join(TEMPLATE_DIR, f"{ui}.html"), encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+class ExplainEngine:
+    """Rule-based explanations worded by one ``rules.json`` profile.
+
+    Holds nothing but the profile name, so its bound methods pickle for
+    the batch process pool.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def scan(self, code_text, language):
+        return get_rules().detector.scan(code_text, language)
+
+    def from_scan(self, main_concepts, num_lines, language, concept, job_role, sampled=None):
+        # Sections are yielded in display order so /api/explain can stream them.
+        return get_rules().profile(self.profile).sections(
+            main_concepts, num_lines, language, concept, job_role, sampled
+        )
+
+    def sections(self, code_text, language, concept, job_role):
+        main_concepts, num_lines = self.scan(code_text, language)
+        return self.from_scan(main_concepts, num_lines, language, concept, job_role)
+
+    def explain(self, code_text, language, concept, job_role):
+        return dict(self.sections(code_text, language, concept, job_role))
+
+    def encode(self, explanation):
+        """JSON response body for an explanation; see ``fragments``."""
+        return get_rules().profile(self.profile).encoder.encode(explanation)
+
+
+def create_app(ui="mvp"):
+    """The Flask app for one UI, with every feature configured from the
+    environment."""
+    if ui not in UIS:
+        raise ValueError(f"unknown UI {ui!r}; expected one of {', '.join(UIS)}")
+    app = Flask(__name__)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(incremental_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(pathways_bp)
+    app.register_blueprint(practice_bp)
+    app.register_blueprint(progress_bp)
+    app.register_blueprint(similarity_bp)
+
+    engine = app.extensions["explain_engine"] = ExplainEngine(ui)
+    explain_cache = ExplanationCache.from_env(ui, version=rules_version)
+    explain_cache.init_app(app)
+    explain_metrics = ExplainMetrics.from_env(ui)
+    if explain_metrics is not None:
+        explain_metrics.watch_cache(explain_cache)
+        explain_metrics.init_app(app)
+    RequestProfiler.from_env().init_app(app)
+    admission = AdmissionControl.from_env()
+    if admission is not None:
+        admission.init_app(app)
+        if explain_metrics is not None:
+            explain_metrics.watch_admission(admission)
+    intake_limits = app.extensions["intake_limits"] = IntakeLimits.from_env()
+    concept_graph = ConceptGraph.from_env()
+    if concept_graph is not None:
+        concept_graph.init_app(app)
+    progress_log = ProgressLog.from_env()
+    if progress_log is not None:
+        progress_log.init_app(app)
+    class_dashboard = ClassDashboard.from_env(progress_log)
+    if class_dashboard is not None:
+        class_dashboard.init_app(app)
+    similarity_index = SimilarityIndex.from_env()
+    if similarity_index is not None:
+        similarity_index.init_app(app)
+    incremental = IncrementalAnalyzer.from_env(engine, intake_limits.sample_threshold)
+    if incremental is not None:
+        incremental.init_app(app)
+    BatchExplainer.from_env(engine.explain, explain_cache).init_app(app)
+
+    # The page has no template variables, so it is encoded once here
+    # instead of rendered per request.
+    home_page = app.extensions["home_page"] = PrerenderedPage(read_template(ui))
+
+    @app.route("/")
+    def home():
+        return home_page.response(request)
+
+    @app.route("/api/explain", methods=["GET", "POST"])
+    @profiled
+    def api_explain():
+        warmup = WARMUP in request.environ
+        # Stages are timed for /metrics and Server-Timing; see metrics.StageClock.
+        clock = g.get("stage_clock")
+        if clock is None:
+            clock = explain_metrics.clock() if explain_metrics is not None and not warmup else NULL_CLOCK
+        if admission is None or warmup:
+            return explain(clock, warmup)
+        try:
+            admission.admit(request)
+        except Overloaded as exc:
+            return exc.response()
+        clock.mark("queue")
+        admitted = monotonic()
+        try:
+            response = app.make_response(explain(clock, warmup))
+        except BaseException:
+            admission.release(monotonic() - admitted)
+            raise
+        if response.is_streamed:
+            # Sections are built as they are sent, so the slot is held until then.
+            response.call_on_close(lambda: admission.release(monotonic() - admitted))
+        else:
+            admission.release(monotonic() - admitted)
+        return response
+
+    def explain(clock, warmup):
+        try:
+            submission = read_submission(request, intake_limits)
+        except SubmissionError as exc:
+            clock.error()
+            return jsonify({"error": str(exc)}), exc.status
+        language = submission.language
+        concept = submission.concept
+        job_role = submission.job_role
+
+        if submission.sampled:
+            # Too large to analyse whole: only its prefix and suffix were kept.
+            key = explain_cache.key_for(submission.digest, language, concept, job_role)
+            scan_key = explain_cache.scan_key_for(submission.digest, language)
+
+            def detect():
+                return submission.scan(get_rules().detector)
+        else:
+            normalized = normalize_code(submission.code)
+            key = explain_cache.key_for(normalized, language, concept, job_role)
+            scan_key = explain_cache.scan_key_for(normalized, language)
+
+            def detect():
+                return engine.scan(normalized, language)
+        clock.mark("parse")
+
+        # Recorded for /api/progress when the page sends a student id.
+        student = request.headers.get("X-Student-Id")
+        recording = progress_log is not None and student and not warmup
+        scanned = []
+
+        def scan():
+            # When recording, what detection found is cached beside the
+            # explanation, so a repeat (cached explanation or 304) does not
+            # detect again and a miss detects once for both.
+            if not scanned:
+                scanned.append(
+                    explain_cache.get_or_compute(scan_key, lambda: list(detect()))
+                    if recording else detect()
+                )
+            return scanned[0]
+
+        def sections():
+            clock.mark("cache")
+            main_concepts, num_lines = scan()
+            clock.mark("detect")
+            return engine.from_scan(
+                main_concepts, num_lines, language, concept, job_role, submission.sampled
+            )
+
+        def compute():
+            explanation = dict(sections())
+            clock.mark("build")
+            return explanation
+
+        def finish():
+            clock.mark("serialize")
+            clock.finish(language, job_role, submission.body_bytes)
+
+        # Also recorded when the answer is a 304: the student still
+        # submitted the program.
+        if recording:
+            found = scan()[0]
+            try:
+                class_id = request.headers.get("X-Class-Id")
+                if class_id and class_dashboard is not None:
+                    class_dashboard.enroll(student, class_id)
+                progress_log.record(student, found)
+            except ProgressError as exc:
+                clock.error()
+                return jsonify({"error": str(exc)}), 400
+            clock.mark("progress")
+
+        fmt = stream_format(request)
+        etag = etag_for(key, fmt)
+        if request.if_none_match.contains_weak(etag):
+            # Same inputs under the same rules, so the client's copy is
+            # current: nothing is built, indexed or sent.
+            clock.mark("revalidate")
+            finish()
+            return app.response_class(status=304, headers=dict(EXPLAIN_HEADERS, ETag=f'"{etag}"'))
+
+        # Recorded for /api/similar; sampled pastes are not indexed.
+        submission_id = None
+        if similarity_index is not None and not submission.sampled and not warmup:
+            submission_id = similarity_index.add(normalized, language)
+            clock.mark("similarity")
+
+        if fmt:
+            response = stream_response(coalesced_sections(explain_cache, key, sections), fmt)
+            response.call_on_close(finish)
+        else:
+            explanation = explain_cache.get_or_compute(key, compute)
+            clock.mark("cache")
+            response = app.response_class(engine.encode(explanation), mimetype="application/json")
+            finish()
+        response.headers.update(EXPLAIN_HEADERS)
+        response.headers["ETag"] = f'"{etag}"'
+        if submission_id is not None:
+            response.headers["X-Submission-Id"] = similarity_index.public_id(submission_id)
+        return response
+
+    return app
+
+
+def warm_up(app):
+    """Send the page and one explanation per language and role through the
+    full request path, so imports, rule tables, caches of compiled
+    patterns and the response encoders are ready before real traffic.
+    Returns the number of requests sent."""
+    client = app.test_client()
+    environ = {WARMUP: True}
+    sent = 0
+    for encoding in ("identity", "gzip"):
+        client.get("/", headers={"Accept-Encoding": encoding})
+        sent += 1
+    roles = list(get_rules().profile(app.extensions["explain_engine"].profile).roles) or [""]
+    for language, code in WARMUP_PROGRAMS.items():
+        for role in roles:
+            body = {"code": code, "language": language, "job_role": role}
+            response = client.post("/api/explain", json=body, environ_overrides=environ)
+            if response.status_code != 200:
+                raise RuntimeError(f"warm-up request failed: {response.status_code} {response.data[:200]!r}")
+            sent += 1
+    client.post("/api/explain?stream=ndjson", json=body, environ_overrides=environ).get_data()
+    index = app.extensions.get("similarity_index")
+    if index is not None:
+        # Warm-up requests are not indexed; run the same hashing without storing.
+        for language, code in WARMUP_PROGRAMS.items():
+            index.query(index.signature(normalize_code(code), language))
+    return sent + 1
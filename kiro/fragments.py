@@ -0,0 +1,84 @@
+"""JSON bodies for explanations, spliced from pre-encoded fragments.
+
+An explanation is mostly fixed text: ``flow`` and ``variables`` are the
+same for every request to a profile, ``future_courses`` and
+``practice_topics`` depend only on the detected concept set, and
+``job_focus`` only on the role. ``rules.Profile`` registers those values
+with its :class:`FragmentEncoder` as it builds its tables, and the encoder
+turns each into JSON bytes the first time it is sent. A body is then
+those fragments joined in key order around the per-request ``summary``
+(and ``sampled``), which are encoded on the spot.
+
+Bodies are what ``flask.jsonify`` sends outside debug mode: sorted keys,
+compact separators, non-ASCII escaped, a trailing newline. Values the
+encoder has not seen (explanations read back from the SQLite tier or
+built in a batch worker process, practice blocks for a free-text concept)
+are encoded whole, with ``orjson`` when it is installed.
+"""
+import json
+from json.encoder import encode_basestring_ascii
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def dumps(value):
+    """Compact JSON bytes, as jsonify writes them."""
+    if isinstance(value, str):
+        return encode_basestring_ascii(value).encode()
+    if orjson is not None:
+        try:
+            data = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+        except TypeError:  # unsupported type or an int past 64 bits
+            pass
+        else:
+            # orjson writes non-ASCII and DEL unescaped where json escapes
+            # them. (It also spells float exponents differently, but
+            # explanations hold no floats.)
+            if data.isascii() and b"\x7f" not in data:
+                return data
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+
+
+class FragmentEncoder:
+    def __init__(self):
+        # id(value) -> [value, bytes or None]. Holding the value keeps the
+        # id from being reused by another object.
+        self._fragments = {}
+        self._keys = {}
+
+    def register(self, value):
+        """Mark ``value`` as fixed; it must never be mutated afterwards."""
+        self._fragments.setdefault(id(value), [value, None])
+
+    def fragment(self, value):
+        entry = self._fragments.get(id(value))
+        if entry is None:
+            return dumps(value)
+        data = entry[1]
+        if data is None:
+            data = entry[1] = dumps(value)
+        return data
+
+    def encode(self, explanation):
+        """The response body for an explanation dict."""
+        parts = []
+        for name in sorted(explanation):
+            key = self._keys.get(name)
+            if key is None:
+                key = self._keys[name] = b"," + dumps(name) + b":"
+            parts.append(key)
+            parts.append(self.fragment(explanation[name]))
+        if parts:
+            parts[0] = parts[0][1:]  # no comma before the first key
+        return b"{" + b"".join(parts) + b"}\n"
+
+    def stats(self):
+        encoded = [data for _, data in self._fragments.values() if data is not None]
+        return {
+            "fragments": len(self._fragments),
+            "encoded": len(encoded),
+            "bytes": sum(map(len, encoded)),
+        }
@@ -0,0 +1,388 @@
+"""Incremental re-analysis while a student edits code.
+
+``POST /api/explain/incremental`` lets a live editor send line diffs
+instead of the whole program on every keystroke:
+
+* ``{"code": ..., "language": ..., "concept": ..., "job_role": ...}``
+  analyses the whole program once and returns a ``version`` id.
+* ``{"base": <version>, "edits": [{"start": 3, "end": 5, "lines": [...]}],
+  "concept": ..., "job_role": ...}`` replaces lines ``start`` to ``end``
+  (0-based, end exclusive, both counted in the base version) with
+  ``lines``. Edits must be sorted and must not overlap. The answer has the
+  new ``version`` to send as the next ``base``.
+
+Every response also carries the explanation, the line count, how many
+lines had to be re-analysed, and per concept the number of lines that
+carry its signal.
+
+For each version the server keeps, per line, the normalized text (as
+:func:`cache.normalize_code` leaves it), the bitmask of concepts whose
+signals occur in the line's code, and the lexer state the line starts in
+(inside a block comment or string, or plain code). An edit re-analyses the
+replaced lines, then the lines after them only while their start state
+differs from before; closing a ``/*`` re-analyses up to where the comment
+used to end, a one-line edit inside a function re-analyses one line. The
+concept counts are updated by subtracting the masks of removed lines and
+adding those of new ones, so the Python work per edit follows the size of
+the diff, not of the program; what remains is copying the per-line lists
+for the new version (C-level, about 30 us per list of 10k lines) so older
+versions stay usable as bases. ``(start state, line)`` results are memoized,
+so retyping a line someone just deleted costs a dict lookup.
+
+Versions are kept in memory, the ``LABCODE_INCREMENTAL_VERSIONS`` most
+recently used ones per process, and fewer when together they would hold
+more than ``LABCODE_INCREMENTAL_LINES`` lines. A program longer than the
+intake's sample threshold (``LABCODE_SAMPLE_THRESHOLD``), sent whole or
+grown by edits, is refused with 413; ``/api/explain`` samples such pastes. A base the server no longer has (evicted,
+restarted, or another ``serve.py`` worker) is answered 409, and the client
+sends the full code again. Version ids chain the base id with the edits,
+so repeating a request returns the version already built. Reloading the
+rules re-analyses a version whole on its next edit.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from flask import Blueprint, current_app, jsonify, request
+
+from cache import normalize_lines
+from config import env_bool, env_int
+from intake import SubmissionError, read_json_body
+from lexer import Lexer, spec_for
+from rules import get_rules
+
+# (state, line) results remembered before the memo is started over.
+MEMO_SIZE = 1 << 16
+
+incremental_bp = Blueprint("incremental", __name__)
+
+
+class EditError(ValueError):
+    status = 400
+
+
+class UnknownBase(EditError):
+    status = 409
+
+
+class ProgramTooLarge(EditError):
+    status = 413
+
+
+class Version:
+    """One analysed version of a program; never changed once built."""
+
+    __slots__ = ("id", "language", "detector", "lines", "entries", "masks", "counts", "chars")
+
+    def __init__(self, id, language, detector, lines, entries, masks, counts, chars):
+        self.id = id
+        self.language = language
+        self.detector = detector
+        self.lines = lines
+        self.entries = entries  # lexer state at the start of each line
+        self.masks = masks
+        self.counts = counts  # lines carrying each concept, in detector order
+        self.chars = chars  # length of the normalized lines joined by newlines
+
+    def concepts(self):
+        return [name for name, count in zip(self.detector.order, self.counts) if count]
+
+    def num_lines(self):
+        """As :func:`concepts.count_lines` counts the normalized code."""
+        lines = self.lines
+        first = 0
+        while first < len(lines) and not lines[first]:
+            first += 1
+        if first == len(lines):
+            return 1
+        last = len(lines) - 1
+        while not lines[last]:
+            last -= 1
+        return last - first + 1
+
+
+class _Pass:
+    """Line-by-line analysis over one new version's lists."""
+
+    def __init__(self, analyzer, detector, language, lines, entries, masks, counts):
+        self.analyzer = analyzer
+        self.detector = detector
+        self.lexer = Lexer(language)
+        self.spec = spec_for(language).name
+        self.lines = lines
+        self.entries = entries
+        self.masks = masks
+        self.counts = counts
+        self.analysed = 0
+
+    def line(self, state, text):
+        """``(mask, end state)`` of one line starting in ``state``."""
+        memo = self.analyzer.memo_for(self.detector)
+        key = (self.spec, state, text)
+        found = memo.get(key)
+        if found is not None:
+            return found
+        self.lexer.resume(state)
+        code = " ".join(self.lexer.feed(text + "\n"))
+        found = (self.detector.mask(code) if code else 0), self.lexer.state
+        if len(memo) >= self.analyzer.memo_size:
+            memo.clear()
+        memo[key] = found
+        return found
+
+    def run(self, start, stop):
+        """Analyse lines ``start`` to ``stop`` and then on until the start
+        states agree with the stored ones again. Returns where it stopped."""
+        lines, entries, masks, counts = self.lines, self.entries, self.masks, self.counts
+        state = self.line(entries[start - 1], lines[start - 1])[1] if start else None
+        i = start
+        while i < len(lines):
+            if i >= stop and entries[i] is not _NEW and entries[i] == state:
+                break
+            mask, end = self.line(state, lines[i])
+            _add(counts, masks[i], -1)
+            _add(counts, mask, 1)
+            entries[i] = state
+            masks[i] = mask
+            state = end
+            i += 1
+        self.analysed += i - start
+        return i
+
+
+# Start state of a line not analysed yet; equal to no real state.
+_NEW = object()
+
+
+def _add(counts, mask, delta):
+    while mask:
+        low = mask & -mask
+        counts[low.bit_length() - 1] += delta
+        mask ^= low
+
+
+class IncrementalAnalyzer:
+    def __init__(self, engine, max_versions=256, memo_size=MEMO_SIZE, max_lines=1_000_000,
+                 max_chars=1 << 20):
+        self.engine = engine
+        self.max_versions = max_versions
+        self.max_lines = max_lines  # held by all versions together
+        self.max_chars = max_chars  # per program
+        self.memo_size = memo_size
+        self._lines_held = 0
+        self._memo = {}
+        self._memo_detector = None
+        self._lock = threading.Lock()
+        self._versions = OrderedDict()
+        self._counters = dict.fromkeys(
+            ("full", "edits", "lines_analysed", "repeats", "unknown_base", "too_large"), 0
+        )
+
+    @classmethod
+    def from_env(cls, engine, max_chars=1 << 20):
+        """``max_chars`` is the intake's sample threshold: longer programs
+        are for ``/api/explain``, which samples them."""
+        if not env_bool("INCREMENTAL", True):
+            return None
+        return cls(
+            engine,
+            max_versions=env_int("INCREMENTAL_VERSIONS", 256),
+            max_lines=env_int("INCREMENTAL_LINES", 1_000_000),
+            max_chars=max_chars,
+        )
+
+    def init_app(self, app):
+        app.extensions["incremental"] = self
+
+    def memo_for(self, detector):
+        """The ``(state, line)`` memo, started over when the rules change."""
+        if self._memo_detector is not detector:
+            self._memo = {}
+            self._memo_detector = detector
+        return self._memo
+
+    # ---------- versions ----------
+
+    def _get(self, version_id):
+        with self._lock:
+            version = self._versions.get(version_id)
+            if version is not None:
+                self._versions.move_to_end(version_id)
+            return version
+
+    def _put(self, version, analysed, full):
+        with self._lock:
+            old = self._versions.pop(version.id, None)
+            if old is not None:
+                self._lines_held -= len(old.lines)
+            self._versions[version.id] = version
+            self._lines_held += len(version.lines)
+            # The newest version stays even if it alone is over max_lines.
+            while len(self._versions) > 1 and (
+                len(self._versions) > self.max_versions or self._lines_held > self.max_lines
+            ):
+                self._lines_held -= len(self._versions.popitem(last=False)[1].lines)
+            self._counters["full" if full else "edits"] += 1
+            self._counters["lines_analysed"] += analysed
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    # ---------- analysis ----------
+
+    def submit(self, code, language):
+        """Analyse a whole program; returns ``(version, lines analysed)``.
+        Raises :class:`ProgramTooLarge`."""
+        if len(code) > self.max_chars:
+            self._count("too_large")
+            raise ProgramTooLarge(
+                f"code longer than {self.max_chars} characters; send it to /api/explain"
+            )
+        version_id = _digest(f"{language}\0{code}")
+        version = self._get(version_id)
+        if version is not None and version.detector is get_rules().detector:
+            self._count("repeats")
+            return version, 0
+        return self._build(version_id, language, normalize_lines(code))
+
+    def _build(self, version_id, language, lines):
+        detector = get_rules().detector
+        size = len(lines)
+        step = _Pass(self, detector, language, lines, [_NEW] * size, [0] * size,
+                     [0] * len(detector.order))
+        step.run(0, size)
+        version = Version(version_id, language, detector, lines, step.entries, step.masks, step.counts,
+                          _chars(lines))
+        self._put(version, step.analysed, full=True)
+        return version, step.analysed
+
+    def apply(self, base_id, edits):
+        """Apply line edits to a stored version; returns ``(version, lines
+        analysed)``. Raises :class:`EditError`."""
+        base = self._get(base_id) if isinstance(base_id, str) else None
+        if base is None:
+            self._count("unknown_base")
+            raise UnknownBase("unknown base version; send the full code")
+        edits = _parse_edits(edits, len(base.lines))
+        chars = base.chars + sum(
+            _chars(new) - _chars(base.lines[start:end]) for start, end, new in edits
+        )
+        if chars > self.max_chars:
+            self._count("too_large")
+            raise ProgramTooLarge(
+                f"edited code longer than {self.max_chars} characters; send it to /api/explain"
+            )
+        version_id = _digest(base_id + json.dumps(edits, separators=(",", ":")))
+        version = self._get(version_id)
+        if version is not None and version.detector is base.detector is get_rules().detector:
+            self._count("repeats")
+            return version, 0
+
+        # Copies of the base's lists (one C-level copy each, so the base
+        # stays valid for other requests); replaced lines start unanalysed.
+        lines, entries, masks = list(base.lines), list(base.entries), list(base.masks)
+        counts = list(base.counts)
+        for start, end, new in reversed(edits):
+            for mask in masks[start:end]:
+                _add(counts, mask, -1)
+            lines[start:end] = new
+            entries[start:end] = [_NEW] * len(new)
+            masks[start:end] = [0] * len(new)
+        regions = []
+        shift = 0
+        for start, end, new in edits:
+            regions.append((start + shift, start + shift + len(new)))
+            shift += len(new) - (end - start)
+
+        detector = get_rules().detector
+        if detector is not base.detector:
+            # Masks from the old rules mean nothing now; analyse it all.
+            return self._build(version_id, base.language, lines)
+        step = _Pass(self, detector, base.language, lines, entries, masks, counts)
+        done = 0
+        for start, stop in regions:
+            if done < stop or done <= start:
+                done = step.run(max(start, done), stop)
+        version = Version(version_id, base.language, detector, lines, entries, masks, counts, chars)
+        self._put(version, step.analysed, full=False)
+        return version, step.analysed
+
+    def explain(self, version, concept, job_role):
+        return dict(self.engine.from_scan(
+            version.concepts(), version.num_lines(), version.language, concept, job_role
+        ))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["versions"] = len(self._versions)
+            stats["lines_held"] = self._lines_held
+        stats.update(max_versions=self.max_versions, max_lines=self.max_lines, max_chars=self.max_chars,
+                     memo=len(self._memo), memo_size=self.memo_size)
+        return stats
+
+
+def _chars(lines):
+    # Length of the lines joined by newlines; an empty list counts as "".
+    return sum(map(len, lines)) + len(lines) - 1 if lines else 0
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()[:32]
+
+
+def _parse_edits(edits, size):
+    """``[(start, end, normalized lines)]`` from the request's edit list."""
+    if not isinstance(edits, list):
+        raise EditError("'edits' must be a list")
+    parsed = []
+    pos = 0
+    for edit in edits:
+        if not isinstance(edit, dict):
+            raise EditError("each edit must be an object")
+        start, end, new = edit.get("start"), edit.get("end", edit.get("start")), edit.get("lines", [])
+        if not all(type(v) is int for v in (start, end)) or not pos <= start <= end <= size:
+            raise EditError(f"edit range must be sorted, non-overlapping and within 0..{size}")
+        if not isinstance(new, list) or not all(isinstance(line, str) for line in new):
+            raise EditError("'lines' must be a list of strings")
+        # Lines sent with their own newlines are split the way the code would be.
+        new = normalize_lines("\n".join(new)) if new else []
+        parsed.append((start, end, new))
+        pos = end
+    return parsed
+
+
+@incremental_bp.route("/api/explain/incremental", methods=["POST"])
+def api_explain_incremental():
+    analyzer = current_app.extensions.get("incremental")
+    if analyzer is None:
+        return jsonify({"error": "incremental analysis is disabled"}), 503
+    try:
+        payload = read_json_body(request, current_app.extensions["intake_limits"])
+    except SubmissionError as exc:
+        return jsonify({"error": str(exc)}), exc.status
+    if not isinstance(payload, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    fields = {}
+    for name in ("code", "language", "concept", "job_role"):
+        value = payload.get(name, "C" if name == "language" else "")
+        if not isinstance(value, str):
+            return jsonify({"error": f"'{name}' must be a string"}), 400
+        fields[name] = value
+
+    try:
+        if "base" in payload:
+            version, analysed = analyzer.apply(payload["base"], payload.get("edits", []))
+        else:
+            version, analysed = analyzer.submit(fields["code"], fields["language"])
+    except EditError as exc:
+        return jsonify({"error": str(exc)}), exc.status
+    return jsonify({
+        "version": version.id,
+        "explanation": analyzer.explain(version, fields["concept"], fields["job_role"]),
+        "lines": len(version.lines),
+        "reanalysed": analysed,
+        "signals": {name: count for name, count in zip(version.detector.order, version.counts) if count},
+    })
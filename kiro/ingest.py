@@ -0,0 +1,475 @@
+"""Ingest plain-text and Markdown lab manuals into Lab/Exercise JSON.
+
+Run from the ``kiro`` directory::
+
+    python ingest.py manuals/ --out labs/ [--ui mvp] [--pool thread] [--workers 4]
+
+Each manual is memory-mapped and split into experiments at headings such as
+``## Experiment 3: Bubble sort``, ``Exp No. 4`` or ``Program 2`` (headings
+inside code fences are ignored). A Markdown H1 such as ``# Lab 1: Arrays``
+is the manual's title, never an experiment. A manual without such headings
+is a single experiment. Fenced (```` ``` ````/``~~~``) and indented code blocks
+become exercise code; ``Aim:``/``Objective:`` lines become learning
+objectives. Every code block is explained with the chosen UI's
+explain engine through a batch explainer, so blocks from all
+manuals are deduplicated, cached and spread over one worker pool.
+
+``--out`` receives one ``<lab id>.json`` per manual, a ``roadmap.json``
+listing exercises per concept in roadmap order, and ``manifest.json``,
+which records the SHA-256 of every ingested manual. A rerun skips manuals
+whose hash and rules version are unchanged, so an interrupted run resumes
+where it stopped.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import textwrap
+import time
+from contextlib import contextmanager
+
+from batch import INLINE_THRESHOLD, BatchExplainer
+from factory import UIS, create_app
+from rules import ensure_version, get_rules
+
+MANUAL_SUFFIXES = (".md", ".markdown", ".txt")
+MANIFEST = "manifest.json"
+ROADMAP = "roadmap.json"
+
+# Manuals parsed and explained per pool round; the manifest is saved after
+# each, so an interrupted run loses at most one round.
+ROUND_MANUALS = 100
+
+# Fence lines and experiment headings, found by one scan over the mapped
+# file so fences can hide headings that are really code comments. Only
+# lines starting with a character _SPLIT_RE can begin with are tried; the
+# leading newline lets the regex engine skip between them at memchr speed.
+_CANDIDATE_RE = re.compile(rb"\n[ \t]{0,3}[#`~AaEeLlPpWw]")
+_SPLIT_RE = re.compile(rb"""
+    [ \t]{0,3}(?:
+        (?P<fence>`{3,}|~{3,})
+      | (?:\#{2,6}|(?!\#))[ \t]*(?P<title>
+            (?:experiment|expt?\.?|lab|exercise|practical|program(?:me)?|assignment|week)
+            [ \t]*(?:no\.?[ \t]*)?[-:#.]?[ \t]*\d+\b[^\r\n]*)
+    )
+""", re.IGNORECASE | re.VERBOSE)
+_LAB_TITLE_RE = re.compile(r"^#[ \t]+(.+)$", re.MULTILINE)
+# A fenced block up to its closing fence (or the end of the experiment).
+_FENCED_RE = re.compile(r"""
+    ^[ \t]{0,3}(?P<marker>`{3,}|~{3,})[ \t]*(?P<info>[^`\s]*)[^\n]*\n
+    (?P<body>(?:[^\n]*\n)*?)
+    (?:[ \t]{0,3}(?P=marker)[`~]*[ \t]*$|(?P<tail>[^\n]*)\Z)
+""", re.MULTILINE | re.VERBOSE)
+_OBJECTIVE_RE = re.compile(
+    r"^[ \t]*(?:[-*][ \t]+)?(?:aim|objectives?|learning outcomes?|outcomes?)[ \t]*[:\-][ \t]*(.+)",
+    re.IGNORECASE,
+)
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+# Fence info strings -> language names used by the explain API.
+FENCE_LANGUAGES = {
+    "c": "C", "h": "C",
+    "cpp": "C++", "c++": "C++", "cc": "C++", "cxx": "C++", "hpp": "C++",
+    "java": "Java",
+    "py": "Python", "python": "Python", "python3": "Python",
+}
+# Unlabelled blocks: first matching hint wins, else --language.
+_LANGUAGE_HINTS = (
+    ("Java", re.compile(r"\b(?:public\s+class|System\.out\.|import\s+java\.)")),
+    ("C++", re.compile(r"#include\s*<(?:iostream|vector|string|bits/)|\bstd::|\bcout\s*<<|\bcin\s*>>")),
+    ("C", re.compile(r"#include\s*<|\bprintf\s*\(|\bscanf\s*\(")),
+    ("Python", re.compile(
+        r"^\s*(?:def\s+\w+\s*\(.*\)\s*:|import\s+\w+|print\s*\(|(?:for|while|if|elif|else)\b[^;{]*:\s*$)",
+        re.MULTILINE,
+    )),
+)
+
+
+@contextmanager
+def mapped(path):
+    """Read-only mmap of a file; an empty file maps to ``b""``."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def file_sha256(path):
+    with mapped(path) as data:
+        return hashlib.sha256(data).hexdigest()
+
+
+def _decode(raw):
+    return raw.decode("utf-8-sig", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def split_experiments(data):
+    """``(preamble_end, [(title, start, end)])`` byte spans of experiments.
+
+    ``start`` is just past the heading line; ``end`` is where the next
+    heading starts (or the end of the data).
+    """
+    headings = []
+    fence = None
+    for match in _split_lines(data):
+        marker = match.group("fence")
+        if marker:
+            if fence is None:
+                fence = marker
+            elif marker[:1] == fence[:1] and len(marker) >= len(fence):
+                fence = None
+        elif fence is None:
+            headings.append((match.start(), match.end(), match.group("title")))
+    spans = []
+    for index, (start, body, title) in enumerate(headings):
+        end = headings[index + 1][0] if index + 1 < len(headings) else len(data)
+        spans.append((_decode(title).strip(" \t#"), body, end))
+    return (headings[0][0] if headings else len(data)), spans
+
+
+def _split_lines(data):
+    first = _SPLIT_RE.match(data)
+    if first:
+        yield first
+    for candidate in _CANDIDATE_RE.finditer(data):
+        match = _SPLIT_RE.match(data, candidate.start() + 1)
+        if match:
+            yield match
+
+
+def detect_language(code, default):
+    for language, hint in _LANGUAGE_HINTS:
+        if hint.search(code):
+            return language
+    return default
+
+
+def parse_blocks(text, default_language):
+    """Split an experiment into ``(blocks, prose_lines)``.
+
+    ``blocks`` are ``(language, code)`` pairs from fenced blocks and from
+    indented blocks (two or more non-blank lines after a blank line).
+    """
+    blocks, prose = [], []
+    pos = 0
+    for match in _FENCED_RE.finditer(text):
+        _split_indented(text[pos:match.start()], default_language, blocks, prose)
+        code = textwrap.dedent(match.group("body") + (match.group("tail") or "")).strip("\n")
+        if code.strip():
+            language = FENCE_LANGUAGES.get(match.group("info").lower())
+            blocks.append((language or detect_language(code, default_language), code))
+        pos = match.end()
+    _split_indented(text[pos:], default_language, blocks, prose)
+    return blocks, prose
+
+
+def _split_indented(text, default_language, blocks, prose):
+    lines = text.split("\n")
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if (line[:1] == "\t" or line.startswith("    ")) and line.strip() \
+                and (i == 0 or not lines[i - 1].strip()):
+            j = i
+            while j < len(lines) and (not lines[j].strip() or lines[j][:1] == "\t"
+                                      or lines[j].startswith("    ")):
+                j += 1
+            if sum(1 for b in lines[i:j] if b.strip()) >= 2:
+                code = textwrap.dedent("\n".join(lines[i:j])).strip("\n")
+                blocks.append((detect_language(code, default_language), code))
+                i = j
+                continue
+        prose.append(line)
+        i += 1
+
+
+def _paragraphs(lines):
+    paragraphs, current = [], []
+    for line in lines + [""]:
+        if line.strip():
+            current.append(line.strip())
+        elif current:
+            paragraphs.append(" ".join(current))
+            current = []
+    return paragraphs
+
+
+def slug(text):
+    return _SLUG_RE.sub("-", text.lower()).strip("-") or "lab"
+
+
+def parse_manual(path, default_language="C"):
+    """Parse one manual into a Lab dict whose code blocks are not yet explained."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    with mapped(path) as data:
+        preamble_end, spans = split_experiments(data)
+        preamble = _decode(data[:preamble_end])
+        sections = [(title, _decode(data[start:end])) for title, start, end in spans]
+
+    heading = _LAB_TITLE_RE.search(preamble)
+    lab_title = heading.group(1).strip() if heading else stem
+    if not sections:
+        # No experiment headings: the whole manual is one exercise.
+        sections, preamble = [(None, preamble)], ""
+    lab_id = slug(stem)
+    preamble_prose = [line for line in parse_blocks(preamble, default_language)[1]
+                      if not _LAB_TITLE_RE.match(line)]
+    objectives = [m.group(1).strip() for m in map(_OBJECTIVE_RE.match, preamble_prose) if m]
+
+    exercises = []
+    for title, text in sections:
+        blocks, prose = parse_blocks(text, default_language)
+        if not blocks and not any(line.strip() for line in prose):
+            continue
+        exercise_objectives = [m.group(1).strip() for m in map(_OBJECTIVE_RE.match, prose) if m]
+        description = [p for p in _paragraphs([line for line in prose if not _OBJECTIVE_RE.match(line)])
+                       if not p.startswith("#")]
+        exercises.append({
+            "id": f"{lab_id}-e{len(exercises) + 1}",
+            "title": title or lab_title,
+            "description": description[0] if description else "",
+            "learning_objectives": exercise_objectives,
+            "code": [{"language": language, "code": code} for language, code in blocks],
+        })
+
+    description = _paragraphs([line for line in preamble_prose if not _OBJECTIVE_RE.match(line)])
+    return {
+        "id": lab_id,
+        "title": lab_title,
+        "source": path,
+        "description": description[0] if description else "",
+        "learning_objectives": objectives,
+        "exercises": exercises,
+    }
+
+
+def add_concepts(lab, rules):
+    """Fill in concepts for every block, exercise and the lab itself."""
+    order = rules.order
+    lab_concepts = set()
+    for exercise in lab["exercises"]:
+        found = set()
+        for block in exercise["code"]:
+            block["concepts"] = rules.detector.scan(block["code"], block["language"])[0]
+            found.update(block["concepts"])
+        exercise["concepts"] = [c for c in order if c in found]
+        lab_concepts |= found
+    lab["concepts"] = [c for c in order if c in lab_concepts]
+    return lab
+
+
+def _parse_one(job):
+    # Module-level so process pools can pickle it; errors stay per manual,
+    # so one malformed manual cannot end the run (or break the pool).
+    path, language, version = job
+    try:
+        ensure_version(version)
+        return add_concepts(parse_manual(path, language), get_rules()), None
+    except (OSError, UnicodeError) as exc:
+        return None, str(exc)
+    except Exception as exc:
+        return None, f"cannot parse: {type(exc).__name__}: {exc}"
+
+
+def build_roadmap(labs, rules):
+    """Exercises per concept in rule order, then per lab in id order."""
+    by_concept = {name: [] for name in rules.order}
+    for lab in sorted(labs, key=lambda lab: lab["id"]):
+        for exercise in lab["exercises"]:
+            for concept in exercise["concepts"]:
+                by_concept.setdefault(concept, []).append(exercise["id"])
+    return {
+        "concepts": [
+            {"concept": name, "exercises": ids} for name, ids in by_concept.items() if ids
+        ],
+        "labs": [
+            {"id": lab["id"], "title": lab["title"], "concepts": lab["concepts"]}
+            for lab in sorted(labs, key=lambda lab: lab["id"])
+        ],
+    }
+
+
+def find_manuals(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                found.extend(
+                    os.path.join(root, name) for name in sorted(files)
+                    if name.lower().endswith(MANUAL_SUFFIXES)
+                )
+        else:
+            found.append(path)
+    return found
+
+
+def _write_json(path, obj, indent=None):
+    # Write-then-rename, so an interrupted run never leaves half a file.
+    # Without indent json.dumps uses its C encoder, several times faster.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(obj, indent=indent, ensure_ascii=False))
+    os.replace(tmp, path)
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+class Ingester:
+    def __init__(self, out_dir, explainer, job_role="", language="C", force=False):
+        self.out_dir = out_dir
+        self.explainer = explainer
+        self.job_role = job_role
+        self.language = language
+        self.force = force
+        self.rules = get_rules()
+        os.makedirs(out_dir, exist_ok=True)
+        self.manifest_path = os.path.join(out_dir, MANIFEST)
+        self.manifest = _read_json(self.manifest_path, {"files": {}})
+        self.counts = dict.fromkeys(("ingested", "skipped", "failed", "exercises", "blocks"), 0)
+
+    def up_to_date(self, key, sha256):
+        entry = self.manifest["files"].get(key)
+        return (
+            not self.force
+            and entry is not None
+            and entry["sha256"] == sha256
+            and entry["rules_version"] == self.rules.version
+            and os.path.exists(os.path.join(self.out_dir, entry["lab"]))
+        )
+
+    def run(self, paths):
+        todo = []
+        for path in find_manuals(paths):
+            key = os.path.realpath(path)
+            try:
+                sha256 = file_sha256(path)
+            except OSError as exc:
+                self._failed(path, exc)
+                continue
+            if self.up_to_date(key, sha256):
+                self.counts["skipped"] += 1
+            else:
+                todo.append((path, key, sha256))
+
+        # Lab id -> manual, to keep ids unique across folders and runs.
+        lab_ids = {entry["lab"][:-len(".json")]: key for key, entry in self.manifest["files"].items()}
+        for start in range(0, len(todo), ROUND_MANUALS):
+            group = todo[start:start + ROUND_MANUALS]
+            jobs = [(path, self.language, self.rules.version) for path, _, _ in group]
+            pending = []
+            for (path, key, sha256), (lab, error) in zip(group, self._map(_parse_one, jobs)):
+                if error:
+                    self._failed(path, error)
+                    continue
+                # Manuals with the same file name in different folders.
+                if lab_ids.setdefault(lab["id"], key) != key:
+                    lab["id"] = f"{lab['id']}-{sha256[:8]}"
+                    for number, exercise in enumerate(lab["exercises"], 1):
+                        exercise["id"] = f"{lab['id']}-e{number}"
+                    lab_ids[lab["id"]] = key
+                pending.append((key, sha256, lab))
+            self.explain(pending)
+        self.write_roadmap()
+        return self.counts
+
+    def _map(self, fn, jobs):
+        if len(jobs) < INLINE_THRESHOLD:
+            return map(fn, jobs)
+        workers = self.explainer.workers or os.cpu_count() or 1
+        return self.explainer.executor.map(fn, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
+    def _failed(self, path, error):
+        print(f"{path}: {error}", file=sys.stderr)
+        self.counts["failed"] += 1
+
+    def explain(self, pending):
+        """Explain every block of ``(key, sha256, lab)`` in one batch, then
+        write the labs and the manifest."""
+        blocks = [
+            block
+            for _, _, lab in pending
+            for exercise in lab["exercises"]
+            for block in exercise["code"]
+        ]
+        results = self.explainer.run([
+            {"code": b["code"], "language": b["language"], "concept": "", "job_role": self.job_role}
+            for b in blocks
+        ])
+        for block, result in zip(blocks, results):
+            block.update(result)
+
+        for key, sha256, lab in pending:
+            lab["sha256"] = sha256
+            lab["rules_version"] = self.rules.version
+            name = f"{lab['id']}.json"
+            _write_json(os.path.join(self.out_dir, name), lab)
+            self.manifest["files"][key] = {
+                "sha256": sha256,
+                "rules_version": self.rules.version,
+                "lab": name,
+                "exercises": len(lab["exercises"]),
+            }
+            self.counts["ingested"] += 1
+            self.counts["exercises"] += len(lab["exercises"])
+        self.counts["blocks"] += len(blocks)
+        _write_json(self.manifest_path, self.manifest, indent=2)
+
+    def write_roadmap(self):
+        labs = [
+            _read_json(os.path.join(self.out_dir, entry["lab"]), None)
+            for entry in self.manifest["files"].values()
+        ]
+        roadmap = build_roadmap([lab for lab in labs if lab], self.rules)
+        _write_json(os.path.join(self.out_dir, ROADMAP), roadmap, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="manual files or directories")
+    parser.add_argument("--out", required=True, help="directory for lab JSON and the manifest")
+    parser.add_argument("--ui", choices=UIS, default="mvp",
+                        help="whose explanation wording to use")
+    parser.add_argument("--job-role", default="", help="job role passed to every explanation")
+    parser.add_argument("--language", default="C", help="language of unlabelled code blocks")
+    parser.add_argument("--pool", choices=("process", "thread"), default=None,
+                        help="worker pool (default: LABCODE_BATCH_POOL)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="re-ingest unchanged manuals")
+    args = parser.parse_args(argv)
+
+    app = create_app(args.ui)
+    explainer = BatchExplainer.from_env(
+        app.extensions["explain_engine"].explain, app.extensions["explain_cache"]
+    )
+    if args.pool:
+        explainer.pool = args.pool
+    if args.workers:
+        explainer.workers = args.workers
+
+    start = time.perf_counter()
+    try:
+        counts = Ingester(args.out, explainer, args.job_role, args.language, args.force).run(args.paths)
+    finally:
+        explainer.shutdown()
+    print(
+        f"ingested {counts['ingested']} manuals ({counts['exercises']} exercises, "
+        f"{counts['blocks']} code blocks), skipped {counts['skipped']} unchanged, "
+        f"{counts['failed']} failed in {time.perf_counter() - start:.2f}s"
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,466 @@
+"""Bounded, incremental reading of ``/api/explain`` request bodies.
+
+``request.get_json()`` buffers and parses the whole body at once; a 50 MB
+paste then costs several copies of itself before any analysis starts.
+:class:`SubmissionReader` is fed the body chunk by chunk instead:
+
+* Bodies larger than ``max_body`` bytes are refused (413).
+* Bodies up to ``sample_threshold`` bytes are buffered and parsed with
+  ``json.loads`` as before.
+* Larger bodies are parsed incrementally. The ``code`` string is decoded
+  chunk by chunk while the other fields are parsed whole. Its lines are
+  counted as it streams and only a prefix and a suffix of ``sample_chars``
+  characters are kept. Those samples are what gets analysed, and
+  :attr:`Submission.sampled` says so.
+
+The reader has no I/O of its own (``feed``/``close``), so the Flask and
+ASGI entry points share it.
+"""
+import hashlib
+import json
+import re
+from collections import deque
+
+from config import env_int
+
+CHUNK_SIZE = 1 << 16
+# Largest accepted value for a field other than ``code``.
+MAX_FIELD = 1 << 16
+
+_NON_SPACE_RE = re.compile(r"\S")
+_WS = b" \t\r\n"
+# String body up to its closing quote, matched from a position that is not
+# inside an escape; escapes are skipped whole.
+_STRING_BODY_RE = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# A \uD800-\uDBFF escape at the end of a piece; its low half may follow.
+_HIGH_SURROGATE_TAIL_RE = re.compile(rb"\\u[dD][89abAB][0-9a-fA-F]{2}$")
+
+
+class SubmissionError(ValueError):
+    status = 400
+
+
+class BodyTooLarge(SubmissionError):
+    status = 413
+
+
+class IntakeLimits:
+    def __init__(self, max_body=64 << 20, sample_threshold=1 << 20, sample_chars=256 << 10):
+        self.max_body = max_body
+        self.sample_threshold = sample_threshold
+        self.sample_chars = sample_chars
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_body=env_int("MAX_BODY", 64 << 20),
+            sample_threshold=env_int("SAMPLE_THRESHOLD", 1 << 20),
+            sample_chars=env_int("SAMPLE_CHARS", 256 << 10),
+        )
+
+
+class Submission:
+    """Fields of one explain request.
+
+    ``code`` is the full paste, or for sampled submissions ``None`` with the
+    analysed text in ``prefix``/``suffix``, the exact line count in
+    ``num_lines`` and a digest of the full code in ``digest``.
+    """
+
+    def __init__(self, fields, code=None, sample=None):
+        self.language = _field(fields, "language", "C")
+        self.concept = _field(fields, "concept", "")
+        self.job_role = _field(fields, "job_role", "")
+        self.code = code
+        self.body_bytes = 0  # set by read_submission
+        self.sampled = None
+        if sample is not None:
+            self.prefix, self.suffix, self.num_lines, self.digest, total = sample
+            self.sampled = {
+                "total_chars": total,
+                "prefix_chars": len(self.prefix),
+                "suffix_chars": len(self.suffix),
+            }
+
+    def scan(self, detector):
+        """``(concepts, num_lines)`` from the prefix and suffix samples."""
+        found = set(detector.detect(self.prefix, self.language))
+        found.update(detector.detect(self.suffix, self.language))
+        return [c for c in detector.order if c in found], self.num_lines
+
+
+def _field(fields, name, default):
+    value = fields.get(name, default)
+    if not isinstance(value, str):
+        raise SubmissionError(f"'{name}' must be a string")
+    return value
+
+
+class LineCounter:
+    """``len(text.strip().split("\\n"))`` over text that arrives in chunks."""
+
+    def __init__(self):
+        self.newlines = 0
+        self.leading = 0  # newlines before the first non-space
+        self.trailing = 0  # newlines after the last non-space
+        self.seen_text = False
+
+    def feed(self, chunk):
+        count = chunk.count("\n")
+        self.newlines += count
+        stripped = len(chunk.rstrip())
+        if not stripped:
+            if self.seen_text:
+                self.trailing += count
+            else:
+                self.leading += count
+            return
+        if not self.seen_text:
+            self.leading += chunk.count("\n", 0, _NON_SPACE_RE.search(chunk).start())
+            self.seen_text = True
+        self.trailing = chunk.count("\n", stripped)
+
+    @property
+    def lines(self):
+        if not self.seen_text:
+            return 1
+        return self.newlines - self.leading - self.trailing + 1
+
+
+class CodeSampler:
+    """Keeps the code whole up to a threshold, then only prefix and suffix."""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.chunks = []
+        self.size = 0
+        self.sampling = False
+        self.prefix = ""
+        self.tail = deque()
+        self.tail_size = 0
+        self.lines = LineCounter()
+        self.digest = hashlib.sha256()
+
+    def feed(self, text):
+        self.lines.feed(text)
+        self.digest.update(text.encode("utf-8", "surrogatepass"))
+        self.size += len(text)
+        if not self.sampling:
+            self.chunks.append(text)
+            if self.size <= self.limits.sample_threshold:
+                return
+            # Too large: from here on keep only a prefix and a rolling tail.
+            text = "".join(self.chunks)
+            self.chunks = []
+            self.sampling = True
+        room = self.limits.sample_chars - len(self.prefix)
+        if room > 0:
+            self.prefix += text[:room]
+            text = text[room:]
+            if not text:
+                return
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size - len(self.tail[0]) >= self.limits.sample_chars:
+            self.tail_size -= len(self.tail.popleft())
+
+    def result(self):
+        if not self.sampling:
+            return "".join(self.chunks), None
+        suffix = "".join(self.tail)[-self.limits.sample_chars:]
+        # The suffix starts mid-line; begin lexing at the next full line.
+        cut = suffix.find("\n")
+        suffix = suffix[cut + 1:] if cut != -1 else suffix
+        return None, (self.prefix, suffix, self.lines.lines, "sampled:" + self.digest.hexdigest(), self.size)
+
+
+class SubmissionReader:
+    """Push parser for one JSON object body; see the module docstring."""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.received = 0
+        self._buffered = []
+        self._parser = None
+        self._submission = None
+
+    def feed(self, data):
+        if not data:
+            return
+        self.received += len(data)
+        if self.received > self.limits.max_body:
+            raise BodyTooLarge(f"request body exceeds {self.limits.max_body} bytes")
+        if self._parser is None:
+            self._buffered.append(data)
+            if self.received <= self.limits.sample_threshold:
+                return
+            # Too large to buffer: continue incrementally from what we have.
+            data, self._buffered = b"".join(self._buffered), None
+            self._parser = self._parse()
+            next(self._parser)
+        self._send(data)
+
+    def close(self):
+        """Finish the body and return the :class:`Submission`."""
+        if self._parser is None:
+            try:
+                payload = json.loads(b"".join(self._buffered))
+            except ValueError:
+                raise SubmissionError("request body must be JSON") from None
+            if not isinstance(payload, dict):
+                raise SubmissionError("expected a JSON object")
+            return Submission(payload, code=_field(payload, "code", ""))
+        self._send(b"")  # end of input
+        return self._submission
+
+    def _send(self, data):
+        try:
+            self._parser.send(data)
+        except StopIteration:
+            pass
+
+    # ---------- incremental parser ----------
+    # A generator that receives chunks via send(); b"" marks end of input.
+
+    def _parse(self):
+        self._buf, self._pos = b"", 0
+        fields, sampler = {}, None
+        yield from self._skip_ws()
+        if (yield from self._take()) != b"{":
+            raise SubmissionError("expected a JSON object")
+        yield from self._skip_ws()
+        if (yield from self._peek()) == b"}":
+            self._pos += 1
+        else:
+            while True:
+                yield from self._skip_ws()
+                if (yield from self._take()) != b'"':
+                    raise SubmissionError("expected a field name")
+                name = yield from self._small_string()
+                yield from self._skip_ws()
+                if (yield from self._take()) != b":":
+                    raise SubmissionError("expected ':' after field name")
+                yield from self._skip_ws()
+                if name == "code" and (yield from self._peek()) == b'"':
+                    self._pos += 1
+                    sampler = CodeSampler(self.limits)
+                    yield from self._stream_string(sampler.feed)
+                else:
+                    fields[name] = yield from self._small_value()
+                yield from self._skip_ws()
+                sep = yield from self._take()
+                if sep == b"}":
+                    break
+                if sep != b",":
+                    raise SubmissionError("expected ',' or '}' in object")
+
+        yield from self._skip_ws()
+        if self._pos < len(self._buf):
+            raise SubmissionError("unexpected data after JSON object")
+        if sampler is None:
+            code = fields.get("code", "")
+            if not isinstance(code, str):
+                raise SubmissionError("'code' must be a string")
+            self._submission = Submission(fields, code=code)
+        else:
+            code, sample = sampler.result()
+            self._submission = Submission(fields, code=code, sample=sample)
+        while True:
+            yield  # swallow anything after the end marker
+
+    def _more(self):
+        chunk = yield
+        if not chunk:
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while self._pos >= len(self._buf):
+            if not (yield from self._more()):
+                raise SubmissionError("request body ended early")
+        return self._buf[self._pos:self._pos + 1]
+
+    def _take(self):
+        byte = yield from self._peek()
+        self._pos += 1
+        return byte
+
+    def _skip_ws(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return
+            if not (yield from self._more()):
+                return
+
+    def _string_end(self):
+        # Index of the closing quote of the string at self._pos, or -1.
+        # With escaped backslashes dropped, every quote left is either
+        # escaped (preceded by a backslash) or closing; counting both is
+        # cheap and rules out most pieces of a long string.
+        flat = self._buf[self._pos:].replace(b"\\\\", b"")
+        if flat.count(b'"') == flat.count(b'\\"'):
+            return -1
+        return _STRING_BODY_RE.match(self._buf, self._pos).end() - 1
+
+    def _stream_string(self, sink):
+        # Decode a string body piece by piece; each piece is cut where no
+        # escape or UTF-8 sequence is split, so json.loads decodes it at C
+        # speed.
+        while True:
+            end = self._string_end()
+            if end != -1:
+                if end > self._pos:
+                    sink(_decode(self._buf[self._pos:end]))
+                self._pos = end + 1
+                return
+            cut = _safe_cut(self._buf, self._pos, len(self._buf))
+            if cut > self._pos:
+                sink(_decode(self._buf[self._pos:cut]))
+                self._pos = cut
+            if not (yield from self._more()):
+                raise SubmissionError("request body ended inside a string")
+
+    def _small_string(self):
+        while True:
+            end = self._string_end()
+            if end != -1:
+                raw = self._buf[self._pos:end]
+                self._pos = end + 1
+                return _decode(raw)
+            if len(self._buf) - self._pos > MAX_FIELD:
+                raise SubmissionError("field too large")
+            if not (yield from self._more()):
+                raise SubmissionError("request body ended inside a string")
+
+    def _small_value(self):
+        # Find the extent of one value (tracking nesting and strings), then
+        # hand it to json.loads.
+        depth, start, i = 0, self._pos, self._pos
+        in_string = False
+        while True:
+            buf = self._buf
+            while i < len(buf):
+                byte = buf[i]
+                if in_string:
+                    if byte == 0x5C:
+                        i += 1
+                    elif byte == 0x22:
+                        in_string = False
+                        if depth == 0:
+                            i += 1
+                            break
+                elif byte == 0x22:
+                    in_string = True
+                elif byte in b"{[":
+                    depth += 1
+                elif byte in b"}]":
+                    if depth == 0:
+                        break
+                    depth -= 1
+                    if depth == 0:
+                        i += 1
+                        break
+                elif byte == 0x2C and depth == 0:
+                    break
+                i += 1
+            else:
+                if i - start > MAX_FIELD:
+                    raise SubmissionError("field too large")
+                offset = i - self._pos
+                if not (yield from self._more()):
+                    raise SubmissionError("request body ended inside a value")
+                start, i = self._pos, self._pos + offset
+                continue
+            raw = self._buf[self._pos:i]
+            self._pos = i
+            try:
+                return json.loads(raw)
+            except ValueError:
+                raise SubmissionError("invalid JSON value") from None
+
+
+def _decode(raw):
+    try:
+        return json.loads(b'"' + raw + b'"')
+    except ValueError:
+        raise SubmissionError("invalid JSON string") from None
+
+
+def _safe_cut(buf, start, end):
+    """Largest cut <= end that splits no escape sequence or UTF-8 character."""
+    window = buf.rfind(b"\\", max(start, end - 12), end)
+    if window != -1:
+        # Back up to the start of the backslash run; everything before it
+        # is complete (escapes contain no backslash after the first byte).
+        run = window
+        while run > start and buf[run - 1] == 0x5C:
+            run -= 1
+        end = run
+        if _HIGH_SURROGATE_TAIL_RE.search(buf, max(start, end - 6), end):
+            # Keep a surrogate pair together, unless the backslash is itself
+            # escaped (an even run before it means it starts the escape).
+            escaped = 0
+            while end - 7 - escaped >= start and buf[end - 7 - escaped] == 0x5C:
+                escaped += 1
+            if escaped % 2 == 0:
+                end -= 6
+        return end
+    for back in range(1, 4):
+        if end - back < start:
+            break
+        byte = buf[end - back]
+        if byte < 0x80:
+            break
+        if byte >= 0xC0:
+            need = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            if back < need:
+                end -= back
+            break
+    return end
+
+
+def query_submission(args, query_bytes=0):
+    """A submission from query-string fields (``GET /api/explain``); ``args``
+    maps each field to one string."""
+    submission = Submission(args, code=_field(args, "code", ""))
+    submission.body_bytes = query_bytes
+    return submission
+
+
+def read_json_body(request, limits):
+    """Parse a whole JSON body of at most ``limits.max_body`` bytes, for
+    routes other than ``/api/explain``. At most one byte past the limit is
+    read, so chunked bodies are bounded too. Raises :class:`SubmissionError`."""
+    limit = limits.max_body
+    if request.content_length is not None and request.content_length > limit:
+        raise BodyTooLarge(f"request body exceeds {limit} bytes")
+    body = request.stream.read(limit + 1)
+    if len(body) > limit:
+        raise BodyTooLarge(f"request body exceeds {limit} bytes")
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise SubmissionError("request body must be JSON") from None
+
+
+def read_submission(request, limits):
+    """Read and parse the body of a Flask request, or the query string of a
+    GET."""
+    if request.method == "GET":
+        return query_submission(request.args, len(request.query_string))
+    if request.content_length is not None and request.content_length > limits.max_body:
+        raise BodyTooLarge(f"request body exceeds {limits.max_body} bytes")
+    reader = SubmissionReader(limits)
+    stream = request.stream
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        reader.feed(chunk)
+    submission = reader.close()
+    submission.body_bytes = reader.received
+    return submission
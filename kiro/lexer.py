@@ -0,0 +1,204 @@
+"""Streaming lexers for C, C++, Java and Python lab programs.
+
+The lexer separates code from comments and string literals; it does not
+build an AST. One compiled regex per language finds the next comment or
+string opener (every alternative starts with a literal, so the regex
+engine skips plain code at C speed), and a per-construct "closer"
+skips to its end. What lies between constructs is reported as a code
+segment, and :func:`iter_tokens` splits segments into word, number and
+punctuation tokens.
+
+Input can be fed in chunks. Each chunk is processed up to its last newline
+and only the unfinished line is carried over, so memory stays bounded by
+the chunk size plus one line however large the paste is. Block comments and
+multi-line strings are tracked as state between chunks, never buffered.
+"""
+import re
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r"(?P<word>[A-Za-z_]\w*)|(?P<number>\d[\w.]*)|(?P<punct>[^\w\s])")
+
+# Lines longer than this are processed without waiting for their newline.
+MAX_CARRY = 1 << 20
+
+# A closer is called as ``closer(buf, pos, end)`` and returns a match ending
+# just past the construct, or None if the construct continues past ``end``.
+_LINE_END = re.compile(r"\n").search
+_BLOCK_END = re.compile(r"\*/").search
+
+
+def _quoted(quote):
+    # Body of a single-line string up to its closing quote, or up to the
+    # newline that ends an unterminated one.
+    q = re.escape(quote)
+    return re.compile(rf"[^{q}\\\n]*(?:\\.[^{q}\\\n]*)*[{q}\n]", re.DOTALL).match
+
+
+def _triple_quoted(quote):
+    q = re.escape(quote)
+    return re.compile(
+        rf"[^{q}\\]*(?:(?:\\.|{q}(?!{q}{q}))[^{q}\\]*)*{q}{q}{q}", re.DOTALL
+    ).match
+
+
+class LanguageSpec:
+    """Comment and string syntax for one language family.
+
+    ``openers`` is a list of ``(literal, closer)`` pairs; where one literal
+    is a prefix of another the longer one must come first.
+    """
+
+    def __init__(self, name, openers, raw_strings=False):
+        self.name = name
+        self.openers = openers
+        self.raw_strings = raw_strings
+
+
+_C_OPENERS = [
+    ("//", _LINE_END),
+    ("/*", _BLOCK_END),
+    ('"', _quoted('"')),
+    ("'", _quoted("'")),
+]
+
+C = LanguageSpec("c", _C_OPENERS)
+CPP = LanguageSpec("c++", _C_OPENERS, raw_strings=True)
+JAVA = LanguageSpec("java", [
+    ("//", _LINE_END),
+    ("/*", _BLOCK_END),
+    ('"""', _triple_quoted('"')),
+    ('"', _quoted('"')),
+    ("'", _quoted("'")),
+])
+PYTHON = LanguageSpec("python", [
+    ("#", _LINE_END),
+    ('"""', _triple_quoted('"')),
+    ("'''", _triple_quoted("'")),
+    ('"', _quoted('"')),
+    ("'", _quoted("'")),
+])
+
+_SPECS = {
+    "c": C,
+    "c++": CPP,
+    "cpp": CPP,
+    "java": JAVA,
+    "python": PYTHON,
+    "py": PYTHON,
+}
+
+
+def spec_for(language):
+    """Return the spec for a UI language name; unknown names lex as C."""
+    return _SPECS.get((language or "").strip().lower(), C)
+
+
+# C++ raw strings: R"delim( ... )delim". An encoding prefix (u8R, LR, ...)
+# is simply left behind as code.
+_RAW_OPENER = r'R"[^()\\\s]{0,16}\('
+
+
+@lru_cache(maxsize=None)
+def _raw_closer(delim):
+    return re.compile(re.escape(f'){delim}"')).search
+
+
+@lru_cache(maxsize=None)
+def _compile(spec):
+    # No capture groups: a bare alternation of literal-first branches keeps
+    # the regex engine on its first-character fast path over plain code.
+    parts = [re.escape(literal) for literal, _ in spec.openers]
+    if spec.raw_strings:
+        parts.insert(0, _RAW_OPENER)
+    return re.compile("|".join(parts)), dict(spec.openers)
+
+
+class Lexer:
+    """Incremental lexer; feed text with :meth:`feed`, finish with :meth:`close`.
+
+    Both are generators of code segments and must be consumed for the lexer
+    state to advance.
+    """
+
+    def __init__(self, language):
+        self.spec = spec_for(language)
+        self._openers, self._closers = _compile(self.spec)
+        self._closer = None  # set while inside a comment or string
+        self._carry = ""
+
+    @property
+    def in_code(self):
+        """False while a block comment or string is still open."""
+        return self._closer is None
+
+    @property
+    def state(self):
+        """What is open between lines, None in plain code. Equal states lex
+        the rest of a source the same way."""
+        return self._closer
+
+    def resume(self, state):
+        """Continue from a ``state`` saved at the end of a complete line."""
+        self._closer = state
+        self._carry = ""
+
+    def feed(self, chunk):
+        """Yield code segments for every complete line seen so far."""
+        buf = self._carry + chunk if self._carry else chunk
+        cut = buf.rfind("\n") + 1
+        if cut == 0:
+            if len(buf) <= MAX_CARRY:
+                self._carry = buf
+                return
+            cut = len(buf)
+        self._carry = buf[cut:]
+        yield from self._scan(buf, cut)
+
+    def close(self):
+        """Flush the unterminated last line."""
+        buf, self._carry = self._carry, ""
+        if buf:
+            yield from self._scan(buf, len(buf))
+
+    def segments(self, text):
+        """Code segments of a complete source held in memory."""
+        yield from self.feed(text)
+        yield from self.close()
+
+    def _scan(self, buf, end):
+        pos = 0
+        openers = self._openers
+        while pos < end:
+            closer = self._closer
+            if closer is not None:
+                match = closer(buf, pos, end)
+                if match is None:
+                    return  # construct continues in the next chunk
+                pos = match.end()
+                self._closer = None
+                continue
+
+            match = openers.search(buf, pos, end)
+            if match is None:
+                yield buf[pos:end]
+                return
+            if match.start() > pos:
+                yield buf[pos:match.start()]
+            pos = match.end()
+            opener = match.group()
+            if opener[0] == "R":
+                self._closer = _raw_closer(opener[2:-1])
+            else:
+                self._closer = self._closers[opener]
+
+
+def iter_code(code_text, language):
+    """Code segments of ``code_text`` with comments and strings removed."""
+    return Lexer(language).segments(code_text)
+
+
+def iter_tokens(code_text, language):
+    """``(kind, text)`` tokens from code only; kind is word, number or punct."""
+    for segment in iter_code(code_text, language):
+        for match in TOKEN_RE.finditer(segment):
+            yield match.lastgroup, match.group()
@@ -0,0 +1,336 @@
+"""Prometheus text-format metrics for the explain pipeline, at ``/metrics``.
+
+``/api/explain`` times itself with a :class:`StageClock`. Each ``mark``
+charges the time since the previous mark to a stage, so stages never
+overlap and add up to the whole request:
+
+* ``queue``: waiting for a slot, with admission control on (``admission``)
+* ``parse``: reading and parsing the body (``intake``)
+* ``revalidate``: answering a matching ``If-None-Match`` with 304
+* ``progress``, ``similarity``: recording the submission, when enabled
+* ``cache``: cache lookups and stores, and waiting on an identical request
+  that is already being computed
+* ``detect``: concept detection, on a cache miss
+* ``build``: assembling the explanation sections, on a cache miss
+* ``serialize``: encoding the JSON body, or for streamed responses building and
+  sending the sections
+
+Durations are held until the request ends, then observed under a single
+lock acquisition, labelled with ``language`` and ``job_role``. Values
+outside :data:`LANGUAGES` and the profile's roles are reported as
+``other``, so free text cannot grow the label set. Cache and single-flight
+counters are read from the cache, and admission counters (refusals by
+reason, queue depth) from :class:`admission.AdmissionControl`, when
+``/metrics`` is scraped.
+"""
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from flask import Blueprint, Response, current_app, jsonify
+
+from config import env_bool
+from rules import get_rules
+
+LANGUAGES = frozenset(("C", "C++", "Java", "Python"))
+
+# 50 us to 10 s; most stages of a lab-sized paste land in the first few.
+SECONDS_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0,
+)
+BYTES_BUCKETS = tuple(256 * 4 ** n for n in range(10))  # 256 B to 64 MiB
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        """Caller holds the registry lock."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, lines):
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, values)} {_number(total)}")
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [count per bucket..., count above, sum]
+
+    def series(self, labels=()):
+        """The counts for one label set, per bucket, above the last and
+        their sum; the caller holds the registry lock."""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        return series
+
+    def render(self, lines):
+        for values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, values, le)} {cumulative}")
+            labels = _label_text(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_number(float(series[-1]))}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+
+class StageClock:
+    """Per-request stage timer; see the module docstring."""
+
+    __slots__ = ("metrics", "started", "last", "stages")
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.started = self.last = perf_counter()
+        self.stages = {}
+
+    def mark(self, stage):
+        now = perf_counter()
+        stages = self.stages
+        stages[stage] = stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+    def finish(self, language, job_role, body_bytes):
+        if self.metrics is not None:
+            self.metrics.observe(self, language, job_role, body_bytes)
+
+    def error(self):
+        if self.metrics is not None:
+            self.metrics.observe_error()
+
+
+class ExplainMetrics:
+    def __init__(self, profile, buckets=SECONDS_BUCKETS):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._cache = None
+        self._admission = None
+        self.requests = Counter(
+            "labcode_explain_requests_total",
+            "Explain requests by outcome: hit, miss (explanation computed), "
+            "not_modified (answered 304) or error.",
+            ("language", "job_role", "outcome"),
+        )
+        self.seconds = Histogram(
+            "labcode_explain_request_seconds",
+            "Explain request latency, body read to response.",
+            buckets, ("language", "job_role"),
+        )
+        self.stages = Histogram(
+            "labcode_explain_stage_seconds",
+            "Time spent in each explain stage.",
+            buckets, ("stage", "language", "job_role"),
+        )
+        self.body_bytes = Histogram(
+            "labcode_explain_request_bytes",
+            "Explain request body size.",
+            BYTES_BUCKETS, ("language",),
+        )
+        self._metrics = (self.requests, self.seconds, self.stages, self.body_bytes)
+        self._rows = {}
+
+    @classmethod
+    def from_env(cls, profile):
+        """Metrics for one app profile, or None when ``LABCODE_METRICS``
+        is off."""
+        if not env_bool("METRICS", True):
+            return None
+        return cls(profile)
+
+    def init_app(self, app):
+        app.extensions["explain_metrics"] = self
+
+    def watch_cache(self, cache):
+        """Report ``cache.stats()`` counters at scrape time."""
+        self._cache = cache
+
+    def watch_admission(self, admission):
+        """Report ``admission.stats()`` counters at scrape time."""
+        self._admission = admission
+
+    def clock(self):
+        return StageClock(self)
+
+    # ---------- recording ----------
+
+    def labels(self, language, job_role):
+        if language not in LANGUAGES:
+            language = "other"
+        if job_role not in get_rules().profile(self.profile).roles:
+            job_role = "other"
+        return language, job_role
+
+    def observe(self, clock, language, job_role, body_bytes):
+        language, job_role = self.labels(language, job_role)
+        durations = clock.stages
+        if "detect" in durations:
+            outcome = "miss"
+        elif "revalidate" in durations:
+            outcome = "not_modified"
+        else:
+            outcome = "hit"
+        buckets = self.stages.buckets
+        with self._lock:
+            row = self._rows.get((language, job_role))
+            if row is None:
+                row = self._rows[language, job_role] = self._row(language, job_role)
+            total, stages, body = row
+            self.requests.inc((language, job_role, outcome))
+            seconds = clock.last - clock.started
+            total[bisect_left(buckets, seconds)] += 1
+            total[-1] += seconds
+            for stage, seconds in durations.items():
+                series = stages.get(stage)
+                if series is None:
+                    series = stages[stage] = self.stages.series((stage, language, job_role))
+                series[bisect_left(buckets, seconds)] += 1
+                series[-1] += seconds
+            body[bisect_left(BYTES_BUCKETS, body_bytes)] += 1
+            body[-1] += body_bytes
+
+    def _row(self, language, job_role):
+        """Direct references to one label set's series, so observing a
+        request costs a dict lookup and a bisect per stage."""
+        return (
+            self.seconds.series((language, job_role)),
+            {},
+            self.body_bytes.series((language,)),
+        )
+
+    def observe_error(self):
+        with self._lock:
+            self.requests.inc(("other", "other", "error"))
+
+    # ---------- exposition ----------
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for metric in self._metrics:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                metric.render(lines)
+        if self._cache is not None:
+            self._render_cache(lines, self._cache.stats())
+        if self._admission is not None:
+            self._render_admission(lines, self._admission.stats())
+        lines.append("")
+        return "\n".join(lines)
+
+    def _render_cache(self, lines, stats):
+        flights = stats.get("singleflight", {})
+        lines += [
+            "# HELP labcode_explain_cache_total Explanation cache lookups by result.",
+            "# TYPE labcode_explain_cache_total counter",
+        ]
+        for result in ("hits", "shared_hits", "disk_hits", "misses", "expirations"):
+            if result in stats:
+                lines.append(f'labcode_explain_cache_total{{result="{result}"}} {stats[result]}')
+        lines += [
+            "# HELP labcode_explain_cache_evictions_total Entries evicted from the explanation cache.",
+            "# TYPE labcode_explain_cache_evictions_total counter",
+            f"labcode_explain_cache_evictions_total {stats.get('evictions', 0)}",
+            "# HELP labcode_explain_cache_entries Entries in the explanation cache.",
+            "# TYPE labcode_explain_cache_entries gauge",
+            f"labcode_explain_cache_entries {stats.get('size', 0)}",
+        ]
+        shared = stats.get("shared")
+        if shared is not None:
+            lines += [
+                "# HELP labcode_explain_shared_cache_entries Entries in the shared-memory cache.",
+                "# TYPE labcode_explain_shared_cache_entries gauge",
+                f"labcode_explain_shared_cache_entries {shared['used']}",
+                "# HELP labcode_explain_shared_cache_slots Slots in the shared-memory cache.",
+                "# TYPE labcode_explain_shared_cache_slots gauge",
+                f"labcode_explain_shared_cache_slots {shared['slots']}",
+            ]
+        for name, value in sorted(flights.items()):
+            if isinstance(value, bool) or not isinstance(value, int):
+                continue
+            kind = "gauge" if name == "in_flight" else "counter"
+            metric = f"labcode_explain_singleflight_{name}" + ("_total" if kind == "counter" else "")
+            lines += [
+                f"# HELP {metric} Identical concurrent explain requests: {name.replace('_', ' ')}.",
+                f"# TYPE {metric} {kind}",
+                f"{metric} {value}",
+            ]
+
+    def _render_admission(self, lines, stats):
+        lines += [
+            "# HELP labcode_explain_admitted_total Explain requests given a slot.",
+            "# TYPE labcode_explain_admitted_total counter",
+            f"labcode_explain_admitted_total {stats['admitted']}",
+            "# HELP labcode_explain_queued_total Explain requests that waited for a slot.",
+            "# TYPE labcode_explain_queued_total counter",
+            f"labcode_explain_queued_total {stats['queued']}",
+            "# HELP labcode_explain_rejected_total Explain requests refused by admission control.",
+            "# TYPE labcode_explain_rejected_total counter",
+        ]
+        for reason in ("rate_limited", "queue_full", "timed_out"):
+            lines.append(f'labcode_explain_rejected_total{{reason="{reason}"}} {stats[reason]}')
+        lines += [
+            "# HELP labcode_explain_active Explain requests holding a slot.",
+            "# TYPE labcode_explain_active gauge",
+            f"labcode_explain_active {stats['active']}",
+            "# HELP labcode_explain_waiting Explain requests queued for a slot.",
+            "# TYPE labcode_explain_waiting gauge",
+            f"labcode_explain_waiting {stats['waiting']}",
+        ]
+
+
+class _NullClock(StageClock):
+    __slots__ = ()
+
+    def mark(self, stage):
+        pass
+
+
+# Stand-in when metrics are disabled, so the view code stays the same.
+NULL_CLOCK = _NullClock(None)
+
+
+# ---------- endpoints ----------
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    metrics = current_app.extensions.get("explain_metrics")
+    if metrics is None:
+        return jsonify({"error": "metrics are disabled"}), 404
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
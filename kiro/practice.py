@@ -0,0 +1,205 @@
+"""Practice-problem catalog with an array-backed inverted index.
+
+The catalog is a JSON list, or a CSV file with the same columns, of
+problems::
+
+    {"id", "title", "url", "platform", "difficulty", "concepts", "score"}
+
+``difficulty`` is one of :data:`DIFFICULTIES`, ``concepts`` is a list
+(``;``-separated in CSV) and ``score`` ranks problems within a concept,
+higher first (acceptance rate, votes...).
+
+Problem fields are stored column-wise. The postings of every (concept,
+difficulty) pair are one run of a single ``array("I")`` of problem numbers,
+sorted by score, and ``_offsets[concept * len(DIFFICULTIES) + difficulty]``
+is where that run starts. There are no per-concept dicts or lists, so tens
+of thousands of problems cost a few hundred KiB beyond their strings.
+
+:meth:`PracticeCatalog.top_k` walks the runs as a difficulty ladder (easy,
+medium, hard, easy, ...) and prefers platforms it has not picked yet, so
+recommendations spread across platforms when the catalog has several
+(Requirement 5.5). It looks at a bounded window of each run, so a lookup
+takes microseconds whatever the catalog size.
+"""
+import csv
+import hashlib
+import io
+import json
+from array import array
+
+from flask import Blueprint, jsonify, request
+
+DIFFICULTIES = ("easy", "medium", "hard")
+_DIFFICULTY_IDS = {name: i for i, name in enumerate(DIFFICULTIES)}
+
+# Problems examined per run when looking for an unused platform.
+DIVERSITY_WINDOW = 32
+MAX_K = 50
+
+practice_bp = Blueprint("practice", __name__)
+
+
+class CatalogError(ValueError):
+    """A catalog row is missing a field or has an unknown difficulty."""
+
+
+class PracticeCatalog:
+    def __init__(self, problems, version=None):
+        self.version = version
+        self.ids = []
+        self.titles = []
+        self.urls = []
+        self.platforms = []  # platform id -> name
+        platform_ids = {}
+        self._platform = array("H")
+        self._difficulty = array("B")
+        self._concept_ids = {}
+        keyed = []  # (run, -score, problem)
+
+        for number, row in enumerate(problems):
+            try:
+                difficulty = _DIFFICULTY_IDS[str(row["difficulty"]).strip().lower()]
+                platform = str(row["platform"]).strip()
+                concepts = row["concepts"]
+                if isinstance(concepts, str):
+                    concepts = concepts.split(";")
+                concepts = {c.strip().lower() for c in concepts} - {""}
+                score = float(row.get("score") or 0)
+                self.ids.append(str(row.get("id") or number))
+                self.titles.append(str(row["title"]))
+                self.urls.append(str(row.get("url") or ""))
+            except (KeyError, TypeError, ValueError) as exc:
+                raise CatalogError(f"problem {number}: missing or invalid {exc}") from None
+            if platform not in platform_ids:
+                platform_ids[platform] = len(self.platforms)
+                self.platforms.append(platform)
+            self._platform.append(platform_ids[platform])
+            self._difficulty.append(difficulty)
+            for concept in sorted(concepts):
+                concept_id = self._concept_ids.setdefault(concept, len(self._concept_ids))
+                keyed.append((concept_id * len(DIFFICULTIES) + difficulty, -score, number))
+
+        keyed.sort()
+        self._postings = array("I", (number for _, _, number in keyed))
+        self._offsets = array("I", bytes(4 * (len(self._concept_ids) * len(DIFFICULTIES) + 1)))
+        for run, _, _ in keyed:
+            self._offsets[run + 1] += 1
+        for run in range(1, len(self._offsets)):
+            self._offsets[run] += self._offsets[run - 1]
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "rb") as f:
+            raw = f.read()
+        version = hashlib.sha256(raw).hexdigest()[:16]
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(io.StringIO(raw.decode("utf-8-sig")))
+        else:
+            try:
+                rows = json.loads(raw)
+            except ValueError as exc:
+                raise CatalogError(f"invalid JSON: {exc}") from None
+            if isinstance(rows, dict):
+                rows = rows.get("problems", ())
+            if not isinstance(rows, list):
+                raise CatalogError("expected a list of problems")
+        return cls(rows, version)
+
+    def __len__(self):
+        return len(self.titles)
+
+    @property
+    def concepts(self):
+        return list(self._concept_ids)
+
+    def problem(self, number):
+        return {
+            "id": self.ids[number],
+            "title": self.titles[number],
+            "url": self.urls[number],
+            "platform": self.platforms[self._platform[number]],
+            "difficulty": DIFFICULTIES[self._difficulty[number]],
+        }
+
+    def count(self, concept, difficulty=None):
+        concept_id = self._concept_ids.get(concept.lower())
+        if concept_id is None:
+            return 0
+        base = concept_id * len(DIFFICULTIES)
+        if difficulty is None:
+            return self._offsets[base + len(DIFFICULTIES)] - self._offsets[base]
+        run = base + _DIFFICULTY_IDS[difficulty]
+        return self._offsets[run + 1] - self._offsets[run]
+
+    def top_numbers(self, concept, k=3, difficulties=DIFFICULTIES):
+        """Problem numbers of the top ``k`` for ``concept``, see module doc."""
+        concept_id = self._concept_ids.get(concept.lower())
+        if concept_id is None or k <= 0:
+            return []
+        base = concept_id * len(DIFFICULTIES)
+        offsets, postings, platform_of = self._offsets, self._postings, self._platform
+        cursors = []  # [next, end] per non-empty run, in ladder order
+        for difficulty in difficulties:
+            run = base + _DIFFICULTY_IDS[difficulty]
+            if offsets[run] < offsets[run + 1]:
+                cursors.append([offsets[run], offsets[run + 1]])
+
+        picked, used, taken = [], set(), set()
+        while len(picked) < k and cursors:
+            for cursor in list(cursors):
+                start, end = cursor
+                choice = None
+                for index in range(start, min(end, start + DIVERSITY_WINDOW)):
+                    if index in taken:
+                        continue
+                    if choice is None:
+                        choice = index  # best remaining, if no new platform turns up
+                    if platform_of[postings[index]] not in used:
+                        choice = index
+                        break
+                number = postings[choice]
+                picked.append(number)
+                taken.add(choice)
+                used.add(platform_of[number])
+                if len(used) == len(self.platforms):
+                    used.clear()
+                while start < end and start in taken:
+                    start += 1
+                cursor[0] = start
+                if start == end:
+                    cursors.remove(cursor)
+                if len(picked) == k:
+                    break
+        return picked
+
+    def top_k(self, concept, k=3, difficulties=DIFFICULTIES):
+        return [self.problem(number) for number in self.top_numbers(concept, k, difficulties)]
+
+
+# ---------- endpoints ----------
+
+@practice_bp.route("/api/practice", methods=["GET"])
+def api_practice():
+    """``?concept=loops&k=5[&difficulty=easy]``: top-k problems from the
+    active catalog."""
+    from rules import get_rules  # rules imports this module
+
+    catalog = get_rules().catalog
+    if catalog is None:
+        return jsonify({"error": "no practice catalog configured"}), 404
+    concept = request.args.get("concept", "")
+    difficulty = request.args.get("difficulty")
+    if difficulty is not None and difficulty not in DIFFICULTIES:
+        return jsonify({"error": f"difficulty must be one of {', '.join(DIFFICULTIES)}"}), 400
+    try:
+        k = int(request.args.get("k", 5))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= MAX_K:
+        return jsonify({"error": f"k must be between 1 and {MAX_K}"}), 400
+    difficulties = (difficulty,) if difficulty else DIFFICULTIES
+    return jsonify({
+        "concept": concept,
+        "available": catalog.count(concept, difficulty),
+        "problems": catalog.top_k(concept, k, difficulties),
+    })
@@ -0,0 +1,221 @@
+"""On-demand profiling of ``/api/explain``.
+
+Off by default. While profiling is on (``LABCODE_PROFILE=1``, or
+``POST /api/admin/profiling``), and for any request an admin sends with
+``X-Profile: 1``, the response carries a ``Server-Timing`` header with the
+stage durations from :class:`metrics.StageClock` plus the total, which
+browser dev tools show next to the request.
+
+While profiling is on, a ``sample`` fraction of requests also run under
+cProfile; ``X-Profile: 1`` always does. Only one request per process is
+profiled at a time, since the interpreter allows a single active profiler;
+others that arrive meanwhile just get the header. Each profile is dumped to
+``LABCODE_PROFILE_DIR`` as ``<name>.prof`` (``pstats`` format, for
+``snakeviz`` and the like) with ``<name>.json`` describing the request, and
+the oldest are removed past ``keep``. For streamed responses only the work
+before the first section is profiled.
+
+``GET /api/admin/profiles`` lists the slowest of the kept requests with
+their most expensive functions.
+"""
+import cProfile
+import itertools
+import json
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+from functools import wraps
+from time import perf_counter
+
+from flask import current_app, g, request
+
+from admin import is_admin
+from config import env_bool, env_float, env_int, env_str
+from metrics import StageClock
+
+NAME_RE = re.compile(r"[\w.-]+\Z")
+
+
+def server_timing(stages, total):
+    """``Server-Timing`` value for stage durations in seconds."""
+    parts = [f"{stage};dur={seconds * 1e3:.3f}" for stage, seconds in stages.items()]
+    parts.append(f"total;dur={total * 1e3:.3f}")
+    return ", ".join(parts)
+
+
+def _function_label(function):
+    path, line, name = function
+    if path == "~":  # built-in
+        return name
+    return f"{name} ({os.path.basename(path)}:{line})"
+
+
+class RequestProfiler:
+    def __init__(self, directory, sample=0.01, keep=200, enabled=False):
+        self.directory = directory
+        self.sample = sample
+        self.keep = keep
+        self.enabled = enabled
+        self._busy = threading.Lock()
+        self._names = itertools.count()
+        self._counts = threading.Lock()  # guards profiled and skipped
+        self.profiled = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            env_str("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "labcode-profiles")),
+            sample=env_float("PROFILE_SAMPLE", 0.01),
+            keep=env_int("PROFILE_KEEP", 200),
+            enabled=env_bool("PROFILE"),
+        )
+
+    def init_app(self, app):
+        app.extensions["request_profiler"] = self
+
+    def configure(self, enabled=None, sample=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample is not None:
+            self.sample = sample
+
+    # ---------- requests ----------
+
+    def run(self, view, args, kwargs):
+        forced = request.environ.get("HTTP_X_PROFILE") == "1" and is_admin()
+        if not (forced or self.enabled):
+            return view(*args, **kwargs)
+        clock = g.stage_clock = StageClock(current_app.extensions.get("explain_metrics"))
+        profile = None
+        if forced or random.random() < self.sample:
+            if self._busy.acquire(blocking=False):
+                profile = cProfile.Profile()
+            else:
+                with self._counts:
+                    self.skipped += 1
+        if profile is None:
+            response = current_app.make_response(view(*args, **kwargs))
+        else:
+            try:
+                profile.enable()
+                try:
+                    result = view(*args, **kwargs)
+                finally:
+                    profile.disable()
+            finally:
+                self._busy.release()
+            response = current_app.make_response(result)
+        total = perf_counter() - clock.started
+        response.headers["Server-Timing"] = server_timing(clock.stages, total)
+        if profile is not None:
+            self._save(profile, {
+                "seconds": round(total, 6),
+                "status": response.status_code,
+                "bytes": request.content_length,
+                "submission_id": response.headers.get("X-Submission-Id"),
+                "forced": forced,
+                "stages": {stage: round(seconds, 6) for stage, seconds in clock.stages.items()},
+            })
+        return response
+
+    def _save(self, profile, info):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        name = f"{stamp}-{os.getpid()}-{next(self._names)}"
+        base = os.path.join(self.directory, name)
+        profile.dump_stats(base + ".prof")
+        info = dict(info, name=name, time=time.time())
+        with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(base + ".json.tmp", base + ".json")
+        with self._counts:
+            self.profiled += 1
+        self._rotate()
+
+    def _rotate(self):
+        saved = sorted(self._saved(), key=lambda info: info["time"])
+        for info in saved[:max(0, len(saved) - self.keep)]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(self.directory, info["name"] + suffix))
+                except FileNotFoundError:  # another worker got there first
+                    pass
+
+    # ---------- viewer ----------
+
+    def _saved(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        saved = []
+        for file_name in names:
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), encoding="utf-8") as f:
+                    saved.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return saved
+
+    def profile_path(self, name):
+        """Path of a kept ``.prof`` file, or None."""
+        if not NAME_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name + ".prof")
+        return path if os.path.exists(path) else None
+
+    def top_functions(self, name, limit=15):
+        """The functions with the most time of their own in one profile."""
+        path = self.profile_path(name)
+        try:
+            # function -> (primitive calls, calls, own, cumulative, callers)
+            entries = pstats.Stats(path).stats if path is not None else {}
+        except OSError:  # rotated away meanwhile
+            entries = {}
+        ranked = sorted(entries.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            {
+                "function": _function_label(function),
+                "calls": calls,
+                "own_ms": round(own * 1e3, 3),
+                "cumulative_ms": round(cumulative * 1e3, 3),
+            }
+            for function, (_, calls, own, cumulative, _) in ranked
+        ]
+
+    def slowest(self, limit=10, functions=15):
+        """The slowest kept requests, each with its top functions."""
+        saved = sorted(self._saved(), key=lambda info: info["seconds"], reverse=True)[:limit]
+        for info in saved:
+            info["top"] = self.top_functions(info["name"], functions)
+        return saved
+
+    def stats(self):
+        with self._counts:
+            profiled, skipped = self.profiled, self.skipped
+        return {
+            "enabled": self.enabled,
+            "sample": self.sample,
+            "keep": self.keep,
+            "directory": self.directory,
+            "profiled": profiled,
+            "skipped_busy": skipped,
+        }
+
+
+def profiled(view):
+    """Run ``view`` through the app's :class:`RequestProfiler`, if any."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        profiler = current_app.extensions.get("request_profiler")
+        if profiler is None:
+            return view(*args, **kwargs)
+        return profiler.run(view, args, kwargs)
+    return wrapper
@@ -0,0 +1,341 @@
+"""Append-only learning-event log and per-concept mastery scores.
+
+Explain requests that carry an ``X-Student-Id`` header, and practice
+completions posted to ``/api/progress/<student>/practice``, are appended to
+``events.bin`` in ``LABCODE_PROGRESS_DIR`` as fixed-width :data:`RECORD`
+rows (16 bytes), which NumPy reads back as column views without parsing.
+Student ids and concept names are numbered in ``students.txt`` and
+``concepts.txt``, one per line, and a name is written before any event that
+uses it. Nothing is rewritten in place; a row or name torn by a crash is
+trimmed when the log is opened.
+
+Mastery (``MasteryLevel`` in ``design.md``) is computed over whole columns,
+never record by record. Each event is evidence for its (student, concept):
+1 for an explanation and 3 x accuracy for a practice problem, halved every
+``half_life`` days. ``level`` is ``100 * (1 - exp(-evidence / 5))`` and
+``confidence`` grows the same way with the number of events. One
+``np.bincount`` over ``student * concepts + concept`` scores every pair.
+
+The full computation is kept as a snapshot of the log offset and time it
+covers. Decay is exponential, so a snapshot stays exact later by scaling:
+a single-student query scales that student's row and folds in only the
+events appended since. Once more than ``refresh_events`` events are past
+the snapshot, it is recomputed in a background thread.
+"""
+import os
+import re
+import threading
+import time
+
+from flask import Blueprint, current_app, jsonify, request
+
+from config import env_float, env_int, env_str
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+EXPLAIN, PRACTICE = 0, 1
+KINDS = ("explain", "practice")
+
+EXPLAIN_WEIGHT = 1.0
+PRACTICE_WEIGHT = 3.0  # at 100% accuracy
+MASTERY_SCALE = 5.0
+DAY = 86400.0
+
+STUDENT_RE = re.compile(r"[\w.@+-]{1,64}\Z")
+MAX_CONCEPT_CHARS = 64
+MAX_CONCEPTS = 1 << 16
+
+RECORD = np.dtype([
+    ("time", "<f8"),
+    ("student", "<u4"),
+    ("concept", "<u2"),
+    ("kind", "u1"),
+    ("value", "u1"),  # accuracy in percent; 100 for explanations
+]) if np is not None else None
+
+progress_bp = Blueprint("progress", __name__)
+
+
+class ProgressError(ValueError):
+    """An invalid student id, concept or accuracy."""
+
+
+def trim_torn_tail(path, unit=None):
+    """Cut a torn tail off ``path``: to a multiple of ``unit`` bytes, or
+    after the last newline. Returns the remaining size."""
+    if not os.path.exists(path):
+        return 0
+    size = os.path.getsize(path)
+    if unit:
+        keep = size - size % unit
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+        keep = data.rfind(b"\n") + 1
+    if keep != size:
+        with open(path, "rb+") as f:
+            f.truncate(keep)
+    return keep
+
+
+class _Names:
+    """Append-only name <-> number table kept in a text file."""
+
+    def __init__(self, path):
+        trim_torn_tail(path)
+        self.names = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8", newline="") as f:
+                self.names = f.read().split("\n")[:-1]
+        self.ids = {name: number for number, name in enumerate(self.names)}
+        self._file = open(path, "a", encoding="utf-8", newline="")
+
+    def __len__(self):
+        return len(self.names)
+
+    def id_for(self, name):
+        number = self.ids.get(name)
+        if number is None:
+            self._file.write(name + "\n")
+            self._file.flush()
+            number = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return number
+
+
+class _Snapshot:
+    """Scores for events ``[0, offset)``, decayed to ``time``; rows are
+    students, columns concepts."""
+
+    def __init__(self, offset, time, evidence, events, last):
+        self.offset = offset
+        self.time = time
+        self.evidence = evidence
+        self.events = events
+        self.last = last
+
+
+class ProgressLog:
+    def __init__(self, directory, half_life_days=30.0, refresh_events=100_000):
+        if np is None:
+            raise RuntimeError("the progress log needs numpy")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.half_life = half_life_days * DAY
+        self.refresh_events = refresh_events
+        self._path = os.path.join(directory, "events.bin")
+        self._students = _Names(os.path.join(directory, "students.txt"))
+        self._concepts = _Names(os.path.join(directory, "concepts.txt"))
+        self._count = trim_torn_tail(self._path, RECORD.itemsize) // RECORD.itemsize
+        self._events = open(self._path, "ab")
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot(0, time.time(), np.zeros((0, 0)), np.zeros((0, 0), np.int64),
+                                   np.zeros((0, 0)))
+        self._refreshing = False
+        # Called as listener(records, count) under the log lock after each
+        # append, in log order; see dashboard.
+        self.listeners = []
+
+    @classmethod
+    def from_env(cls):
+        """The configured log, or None when ``LABCODE_PROGRESS_DIR`` is
+        unset or numpy is missing."""
+        directory = env_str("PROGRESS_DIR")
+        if np is None or directory is None:
+            return None
+        return cls(
+            directory,
+            half_life_days=env_float("PROGRESS_HALF_LIFE_DAYS", 30.0),
+            refresh_events=env_int("PROGRESS_REFRESH_EVENTS", 100_000),
+        )
+
+    def init_app(self, app):
+        app.extensions["progress_log"] = self
+
+    def __len__(self):
+        return self._count
+
+    # ---------- events ----------
+
+    def record(self, student, concepts, kind=EXPLAIN, accuracy=100, when=None):
+        """Append one event per concept; returns how many were written."""
+        if not isinstance(student, str) or not STUDENT_RE.match(student):
+            raise ProgressError("student id must be 1-64 letters, digits or ._@+-")
+        names = []
+        for concept in concepts:
+            name = concept.strip().lower() if isinstance(concept, str) else ""
+            if not name or len(name) > MAX_CONCEPT_CHARS or not name.isprintable():
+                raise ProgressError(f"concepts must be 1-{MAX_CONCEPT_CHARS} characters on one line")
+            if name not in names:
+                names.append(name)
+        if isinstance(accuracy, bool) or not isinstance(accuracy, (int, float)) or not 0 <= accuracy <= 100:
+            raise ProgressError("accuracy must be a number from 0 to 100")
+        if not names:
+            return 0
+        records = np.empty(len(names), RECORD)
+        records["time"] = time.time() if when is None else when
+        records["kind"] = kind
+        records["value"] = round(accuracy)
+        with self._lock:
+            if len(self._concepts) + len(names) > MAX_CONCEPTS and any(
+                    name not in self._concepts.ids for name in names):
+                raise ProgressError("too many distinct concepts")
+            records["student"] = self._students.id_for(student)
+            records["concept"] = [self._concepts.id_for(name) for name in names]
+            self._events.write(records.tobytes())
+            self._events.flush()
+            self._count += len(records)
+            for listener in self.listeners:
+                listener(records, self._count)
+        return len(records)
+
+    def student_names(self):
+        """Student ids by number; append-only, so safe to hold on to."""
+        return self._students.names
+
+    def concept_names(self):
+        return self._concepts.names
+
+    def read(self, start, stop):
+        """Records ``[start, stop)``, mapped rather than copied."""
+        if stop <= start:
+            return np.empty(0, RECORD)
+        return np.memmap(self._path, RECORD, "r", offset=start * RECORD.itemsize, shape=(stop - start,))
+
+    def _weights(self, records, now):
+        weights = np.where(records["kind"] == PRACTICE,
+                           records["value"] * (PRACTICE_WEIGHT / 100), EXPLAIN_WEIGHT)
+        return weights * np.exp2((records["time"] - now) / self.half_life)
+
+    # ---------- mastery ----------
+
+    def refresh(self, now=None):
+        """Recompute every score from the whole log and keep it as the
+        snapshot queries start from."""
+        now = time.time() if now is None else now
+        with self._lock:
+            count = self._count
+            shape = (len(self._students), len(self._concepts))
+        records = self.read(0, count)
+        key = records["student"].astype(np.int64) * shape[1] + records["concept"]
+        size = shape[0] * shape[1]
+        evidence = np.bincount(key, self._weights(records, now), minlength=size)
+        events = np.bincount(key, minlength=size)
+        last = np.zeros(size)
+        np.maximum.at(last, key, records["time"])
+        snapshot = _Snapshot(count, now, evidence.reshape(shape), events.reshape(shape),
+                             last.reshape(shape))
+        with self._lock:
+            if count >= self._snapshot.offset:
+                self._snapshot = snapshot
+        return snapshot
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="progress-refresh", daemon=True).start()
+
+    def mastery(self, student, now=None):
+        """``MasteryLevel`` dicts for every concept the student has events
+        for, strongest first; None for an unknown student."""
+        now = time.time() if now is None else now
+        with self._lock:
+            number = self._students.ids.get(student)
+            count = self._count
+            concepts = len(self._concepts)
+            snapshot = self._snapshot
+        if number is None:
+            return None
+
+        evidence = np.zeros(concepts)
+        events = np.zeros(concepts, np.int64)
+        last = np.zeros(concepts)
+        rows, columns = snapshot.evidence.shape
+        if number < rows:
+            evidence[:columns] = snapshot.evidence[number] * np.exp2((snapshot.time - now) / self.half_life)
+            events[:columns] = snapshot.events[number]
+            last[:columns] = snapshot.last[number]
+        tail = self.read(snapshot.offset, count)
+        mine = tail[tail["student"] == number]
+        if len(mine):
+            evidence += np.bincount(mine["concept"], self._weights(mine, now), minlength=concepts)
+            events += np.bincount(mine["concept"], minlength=concepts)
+            np.maximum.at(last, mine["concept"], mine["time"])
+        if len(tail) > self.refresh_events:
+            self._refresh_in_background()
+
+        seen = np.flatnonzero(events)
+        levels = 100 * -np.expm1(-evidence[seen] / MASTERY_SCALE)
+        confidence = 100 * -np.expm1(-events[seen] / MASTERY_SCALE)
+        names = self._concepts.names
+        result = [
+            {
+                "concept": names[concept],
+                "level": round(float(level), 1),
+                "confidence": round(float(conf), 1),
+                "events": int(events[concept]),
+                "last_activity": float(last[concept]),
+            }
+            for concept, level, conf in zip(seen.tolist(), levels, confidence)
+        ]
+        result.sort(key=lambda item: -item["level"])
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "events": self._count,
+                "students": len(self._students),
+                "concepts": len(self._concepts),
+                "snapshot_events": self._snapshot.offset,
+                "snapshot_age": round(time.time() - self._snapshot.time, 1),
+            }
+
+
+# ---------- endpoints ----------
+
+def _log():
+    return current_app.extensions.get("progress_log")
+
+
+@progress_bp.route("/api/progress/<student>", methods=["GET"])
+def api_progress(student):
+    """Mastery per concept for one student."""
+    log = _log()
+    if log is None:
+        return jsonify({"error": "progress tracking is disabled"}), 503
+    mastery = log.mastery(student)
+    if mastery is None:
+        return jsonify({"error": "no events for this student"}), 404
+    return jsonify({"student": student, "mastery": mastery})
+
+
+@progress_bp.route("/api/progress/<student>/practice", methods=["POST"])
+def api_progress_practice(student):
+    """Record a solved practice problem: ``{concept | concepts, accuracy}``."""
+    log = _log()
+    if log is None:
+        return jsonify({"error": "progress tracking is disabled"}), 503
+    payload = request.get_json(force=True, silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "expected {concept, accuracy}"}), 400
+    concepts = payload.get("concepts", [payload.get("concept")])
+    if not isinstance(concepts, list) or not concepts:
+        return jsonify({"error": "'concepts' must be a non-empty list"}), 400
+    try:
+        recorded = log.record(student, concepts, PRACTICE, payload.get("accuracy", 100))
+    except ProgressError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"recorded": recorded}), 201
@@ -0,0 +1,261 @@
+"""Rule tables behind the mock explanations, loaded from ``rules.json``.
+
+The JSON file declares:
+
+* ``concepts``: detection signals, in report order
+  (``{"name", "keywords", "substrings", "practice"}``).
+* ``future_courses``: ``{"when_any": [concepts], "courses": [...]}`` rules.
+* ``profiles``: per-UI wording (``mvp`` and ``dashboard``; see ``factory``)
+  for the summary, flow, variables, practice sets and job focus.
+
+The practice catalog (``LABCODE_PRACTICE_CATALOG``, default
+``practice.json``; see ``practice``) is loaded alongside, and each
+practice topic lists its top ``practice.problems`` problems from it.
+
+Everything is compiled once into a :class:`Rules` object. Each concept gets
+a bit, and the future-course and practice sections for a set of detected
+concepts are looked up by bitmask; those tables are built up front, so a
+request does no rule matching or string formatting beyond its summary.
+Section values are shared between requests and must be treated as
+read-only; each profile's ``encoder`` keeps their JSON (see ``fragments``).
+
+:func:`reload_rules` compiles a new object and swaps the module reference,
+so in-flight requests keep the rules they started with. ``Rules.version``
+(a digest of the file and the catalog) is mixed into explanation cache
+keys.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from concepts import ConceptDetector
+from config import env_str
+from fragments import FragmentEncoder
+from practice import CatalogError, PracticeCatalog
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "practice.json")
+
+# Up to this many concepts every bitmask is tabulated at load time; beyond
+# it masks are filled in on first use.
+EAGER_MASK_BITS = 10
+
+_active = None
+_load_lock = threading.Lock()
+
+
+class RulesError(ValueError):
+    """The rules file is missing a field or refers to an unknown concept."""
+
+
+class Profile:
+    """Compiled wording for one app."""
+
+    def __init__(self, name, spec, rules):
+        try:
+            self.name = name
+            self.rules = rules
+            self.summary = spec["summary"]
+            self.sampled_summary = spec.get("sampled_summary", self.summary)
+            self.flow = tuple(spec["flow"])
+            self.variables = tuple(spec["variables"])
+            self.future_fallback = tuple(spec.get("future_courses_fallback", ()))
+            self.practice_platform = spec["practice"]["platform"]
+            self.practice_sets = tuple(spec["practice"]["sets"])
+            self.practice_problems = int(spec["practice"].get("problems", 3))
+            self.practice_fallback = tuple(spec["practice_fallback"])
+            self.roles = dict(spec["roles"])
+            self.role_fallback = spec["role_fallback"]
+        except (KeyError, TypeError) as exc:
+            raise RulesError(f"profile {name!r}: missing or invalid {exc}") from None
+
+        self._practice_blocks = {
+            concept["name"]: self._practice_block(concept["name"], concept.get("practice"))
+            for concept in rules.concepts
+        }
+        self._future = {}
+        self._practice = {}
+        # Every table value below is fixed, so its JSON is encoded once.
+        self.encoder = FragmentEncoder()
+        for value in (self.flow, self.variables, self.future_fallback, self.practice_fallback,
+                      self.role_fallback, *self.roles.values()):
+            self.encoder.register(value)
+        if len(rules.order) <= EAGER_MASK_BITS:
+            for mask in range(1 << len(rules.order)):
+                self._tabulate(mask)
+
+    def _practice_block(self, topic, override=None):
+        override = override or {}
+        title = topic.title()
+        block = {
+            "topic": topic,
+            "platform": override.get("platform", self.practice_platform),
+            "sets": [s.format(title=title, name=topic) for s in override.get("sets", self.practice_sets)],
+        }
+        catalog = self.rules.catalog
+        if catalog is not None:
+            block["problems"] = catalog.top_k(topic, self.practice_problems)
+        return block
+
+    def _tabulate(self, mask):
+        courses = []
+        for rule_mask, rule_courses in self.rules.course_rules:
+            if mask & rule_mask:
+                courses.extend(c for c in rule_courses if c not in courses)
+        self._future[mask] = tuple(courses) or self.future_fallback
+        self._practice[mask] = tuple(
+            self._practice_blocks[name]
+            for bit, name in enumerate(self.rules.order) if mask >> bit & 1
+        ) or self.practice_fallback
+        self.encoder.register(self._future[mask])
+        self.encoder.register(self._practice[mask])
+
+    def sections(self, main_concepts, num_lines, language, concept, job_role, sampled=None):
+        """Yield ``(section, value)`` pairs in display order.
+
+        ``sampled`` describes a paste analysed from samples only (see
+        ``intake``); it changes the summary and is reported as a section.
+        """
+        if not main_concepts and concept:
+            main_concepts = [concept]
+        mask, unknown = self.rules.mask_for(main_concepts)
+        if mask not in self._future:
+            self._tabulate(mask)
+
+        summary = self.summary if sampled is None else self.sampled_summary
+        yield "summary", summary.format(
+            language=language,
+            num_lines=num_lines,
+            concepts=", ".join(main_concepts) or "basic syntax",
+        )
+        yield "flow", self.flow
+        yield "variables", self.variables
+        yield "future_courses", self._future[mask]
+        if unknown:
+            # A free-text concept from the form; built per request.
+            yield "practice_topics", tuple(self._practice_block(c) for c in main_concepts)
+        else:
+            yield "practice_topics", self._practice[mask]
+        yield "job_focus", self.roles.get(job_role, self.role_fallback)
+        if sampled is not None:
+            yield "sampled", sampled
+
+
+class Rules:
+    def __init__(self, data, version, catalog=None):
+        self.version = version
+        self.catalog = catalog
+        try:
+            self.concepts = list(data["concepts"])
+            signals = [
+                (c["name"], c.get("keywords", ()), c.get("substrings", ()))
+                for c in self.concepts
+            ]
+        except (KeyError, TypeError) as exc:
+            raise RulesError(f"concepts: missing or invalid {exc}") from None
+        self.detector = ConceptDetector(signals)
+        self.order = self.detector.order
+        self.bits = {name: 1 << bit for bit, name in enumerate(self.order)}
+
+        self.course_rules = []
+        for rule in data.get("future_courses", ()):
+            mask, unknown = self.mask_for(rule.get("when_any", ()))
+            if unknown or not mask:
+                raise RulesError(f"future_courses rule has unknown concepts: {rule!r}")
+            self.course_rules.append((mask, tuple(rule.get("courses", ()))))
+
+        self.profiles = {
+            name: Profile(name, spec, self)
+            for name, spec in data.get("profiles", {}).items()
+        }
+
+    def mask_for(self, concepts):
+        """Return ``(mask, unknown)`` where ``unknown`` is True if any
+        concept has no bit."""
+        mask, unknown = 0, False
+        for concept in concepts:
+            bit = self.bits.get(concept)
+            if bit is None:
+                unknown = True
+            else:
+                mask |= bit
+        return mask, unknown
+
+    def profile(self, name):
+        try:
+            return self.profiles[name]
+        except KeyError:
+            raise RulesError(f"no profile {name!r} in rules") from None
+
+
+def rules_path():
+    return env_str("RULES", DEFAULT_RULES_PATH)
+
+
+def catalog_path():
+    """Practice catalog file, or None when set to ``none`` or when the
+    default file is absent."""
+    path = env_str("PRACTICE_CATALOG")
+    if path is None:
+        return DEFAULT_CATALOG_PATH if os.path.exists(DEFAULT_CATALOG_PATH) else None
+    return None if path.lower() == "none" else path
+
+
+def load_rules(path=None):
+    """Read and compile a rules file (and the practice catalog) without
+    activating them."""
+    with open(path or rules_path(), "rb") as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw)
+    except ValueError as exc:
+        raise RulesError(f"invalid JSON: {exc}") from None
+    digest = hashlib.sha256(raw)
+    catalog = None
+    catalog_file = catalog_path()
+    if catalog_file:
+        try:
+            catalog = PracticeCatalog.from_file(catalog_file)
+        except CatalogError as exc:
+            raise RulesError(f"practice catalog: {exc}") from None
+        digest.update(catalog.version.encode())
+    return Rules(data, digest.hexdigest()[:16], catalog)
+
+
+def get_rules():
+    """Return the active rules, loading them on first use."""
+    rules = _active
+    if rules is None:
+        with _load_lock:
+            if _active is None:
+                _activate(load_rules())
+            rules = _active
+    return rules
+
+
+def reload_rules(path=None):
+    """Compile the rules file and swap it in; raises and keeps the old
+    rules if the file is invalid."""
+    with _load_lock:
+        rules = load_rules(path)
+        _activate(rules)
+    return rules
+
+
+def ensure_version(version):
+    """Reload if the active rules differ from ``version``.
+
+    Used by pool workers, which keep the rules they were forked with.
+    """
+    if get_rules().version != version:
+        reload_rules()
+
+
+def rules_version():
+    return get_rules().version
+
+
+def _activate(rules):
+    global _active
+    _active = rules
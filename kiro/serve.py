@@ -0,0 +1,187 @@
+"""Production entry point: one UI served by pre-forked worker processes.
+
+Run from the ``kiro`` directory::
+
+    python serve.py [--ui mvp] [--workers 4] [--host 0.0.0.0] [--port 5000]
+
+The parent opens the listening socket, builds the app once (rule tables
+and compiled patterns, practice catalog, concept graph, pre-rendered
+page), sends warm-up requests through it (``factory.warm_up``) and moves
+everything allocated so far out of the garbage collector's reach with
+``gc.freeze()``. Only then does it fork the workers, which share those
+pages copy-on-write; without the freeze, the first collection in each
+worker would write to every object header and copy them all. Workers
+accept from the shared socket, each running werkzeug's threaded WSGI
+server (``--sync`` for one request at a time). The parent restarts
+workers that die and stops them all on SIGINT or SIGTERM.
+
+Workers are separate processes, so the in-memory explanation cache,
+similarity index and ``/metrics`` counters are per worker; set
+``LABCODE_SHARED_CACHE`` (a file on ``/dev/shm``) to share explanations
+between them, and ``LABCODE_SINGLEFLIGHT_DIR`` so each is computed once.
+The progress log has a single writer, so ``LABCODE_PROGRESS_DIR`` needs
+``--workers 1``. Without ``os.fork`` (on Windows) the app is served from
+the parent process.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from config import env_str
+from factory import UIS, create_app, warm_up
+
+# A worker that dies sooner than this after starting is restarted after a
+# pause, so a crash at startup does not turn into a fork loop.
+MIN_WORKER_SECONDS = 1.0
+STOP_TIMEOUT = 10.0
+
+
+class QuietHandler(WSGIRequestHandler):
+    """Request handler without the per-request access log line."""
+
+    def log_request(self, code="-", size="-"):
+        pass
+
+
+class _Stop(Exception):
+    pass
+
+
+def _raise_stop(signum, frame):
+    raise _Stop
+
+
+def _exit_worker(signum, frame):
+    sys.exit(0)
+
+
+def run_worker(app, listener, host, threaded, handler):
+    """Serve from the inherited socket until told to stop. Never returns."""
+    signal.signal(signal.SIGTERM, _exit_worker)
+    signal.signal(signal.SIGINT, _exit_worker)
+    status = 0
+    try:
+        server = make_server(host, 0, app, threaded=threaded, request_handler=handler,
+                             fd=listener.fileno())
+        server.serve_forever()
+    except SystemExit:
+        # Let requests in flight finish; the parent kills us after STOP_TIMEOUT.
+        deadline = time.monotonic() + STOP_TIMEOUT - 1
+        while threading.active_count() > 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    except BaseException:  # noqa: BLE001 - reported, then the parent restarts us
+        import traceback
+
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stderr.flush()
+        os._exit(status)  # skip the parent's atexit handlers
+
+
+class Supervisor:
+    def __init__(self, app, listener, host, workers, threaded, handler):
+        self.app = app
+        self.listener = listener
+        self.host = host
+        self.workers = workers
+        self.threaded = threaded
+        self.handler = handler
+        self.children = {}  # pid -> start time
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.app, self.listener, self.host, self.threaded, self.handler)
+        self.children[pid] = time.monotonic()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, _raise_stop)
+        signal.signal(signal.SIGINT, _raise_stop)
+        try:
+            for _ in range(self.workers):
+                self.spawn()
+            while True:
+                pid, status = os.wait()
+                started = self.children.pop(pid, None)
+                if started is None:
+                    continue
+                print(f"worker {pid} exited (wait status {status}); restarting", file=sys.stderr)
+                if time.monotonic() - started < MIN_WORKER_SECONDS:
+                    time.sleep(MIN_WORKER_SECONDS)
+                self.spawn()
+        except _Stop:
+            pass
+        finally:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            self.stop()
+
+    def stop(self):
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + STOP_TIMEOUT
+        while self.children:
+            for pid in list(self.children):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    del self.children[pid]
+                elif time.monotonic() > deadline:
+                    os.kill(pid, signal.SIGKILL)
+            time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve one UI from pre-forked workers.")
+    parser.add_argument("--ui", choices=UIS, default="mvp")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sync", action="store_true",
+                        help="one request at a time per worker instead of a thread each")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and env_str("PROGRESS_DIR"):
+        parser.error("LABCODE_PROGRESS_DIR has a single writer; use --workers 1")
+
+    started = time.perf_counter()
+    forking = hasattr(os, "fork")
+    if forking:
+        # Opened first, so a port in use fails before the slow part.
+        family = socket.AF_INET6 if ":" in args.host else socket.AF_INET
+        listener = socket.create_server((args.host, args.port), family=family, backlog=args.backlog)
+    app = create_app(args.ui)
+    warmed = warm_up(app)
+    app.extensions["explain_cache"].close_db()
+    handler = WSGIRequestHandler if args.access_log else QuietHandler
+    workers = args.workers if forking else 1
+    print(f"serving {args.ui} on http://{args.host}:{args.port} with {workers} "
+          f"worker{'s' if workers > 1 else ''} (ready in {time.perf_counter() - started:.2f} s, "
+          f"{warmed} warm-up requests)", file=sys.stderr, flush=True)
+
+    gc.collect()
+    gc.freeze()
+    if not forking:
+        make_server(args.host, args.port, app, threaded=not args.sync,
+                    request_handler=handler).serve_forever()
+        return
+    Supervisor(app, listener, args.host, workers, not args.sync, handler).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Explanation cache tier shared by every worker process on a machine.
+
+With ``LABCODE_SHARED_CACHE`` set to a file path (best on a RAM-backed
+filesystem such as ``/dev/shm``), :class:`cache.ExplanationCache` checks a
+fixed-size hash table in that file, mapped into every process, between its
+per-process LRU and the SQLite tier. An explanation computed by one
+``serve.py`` worker is then a hit in all of them.
+
+The file holds ``buckets`` sets of ``ways`` fixed-size slots. A key's
+first 16 digest bytes pick its bucket and are stored as its tag; the slot
+holds the explanation as JSON. Explanations larger than a slot are not
+shared. Memory use is the file size, fixed when it is created.
+
+* Reads take no lock. Each slot starts with a sequence number that a
+  writer makes odd before changing the slot and even again after
+  (a seqlock); a reader that sees it odd, or changed by the end of its
+  copy, retries a few times and then reports a miss.
+* Writes take one of ``stripes`` locks, chosen by bucket: a thread lock
+  within the process and an ``fcntl`` record lock on the file across
+  processes.
+* A full bucket evicts with the clock algorithm: a hit sets the slot's
+  reference bit, and the bucket's hand skips (and clears) referenced slots
+  until it finds one that is not.
+
+Every process sharing a file must use the same settings. A file created
+with other geometry is never re-initialized, since other processes may
+have it mapped and shrinking it under them kills them with SIGBUS:
+:meth:`SharedCache.from_env` logs an error and the process runs without
+the shared tier. Remove the file with every worker stopped to change the
+settings. Entries outlive restarts as long as the file does; keys
+include the rules version, so stale ones just miss.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from config import env_int, env_str
+from fragments import dumps
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the shared tier is off
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+MAGIC = b"LCSHC01\0"
+_HEADER = struct.Struct("<8sIIII")  # magic, slot size, ways, buckets, stripes
+HEADER_BYTES = 64
+
+# Slot layout: sequence number, reference bit, stored-at time, tag, JSON
+# length, then the JSON itself.
+_SEQ = struct.Struct("<I")
+_META = struct.Struct("<d16sI")  # at offset 8
+REF_OFFSET = 4
+META_OFFSET = 8
+TAG_OFFSET = 16
+LENGTH_OFFSET = 32
+SLOT_HEADER = 40
+EMPTY_LENGTH = b"\0\0\0\0"
+
+READ_RETRIES = 4
+# Record-lock offsets; the locks do not touch the bytes they name.
+INIT_LOCK = 0
+STRIPE_LOCK_BASE = 1
+
+
+_log = logging.getLogger(__name__)
+
+
+class GeometryMismatch(ValueError):
+    """The file was set up with other settings by another process."""
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class SharedCache:
+    def __init__(self, path, size=64 << 20, slot_size=4096, ways=8, stripes=64, ttl=3600.0):
+        if slot_size % 64 or slot_size <= SLOT_HEADER:
+            raise ValueError("slot_size must be a multiple of 64 bytes")
+        self.path = path
+        self.slot_size = slot_size
+        self.ways = ways
+        self.stripes = stripes
+        self.ttl = ttl
+        self.buckets = max(1, size // (slot_size * ways))
+        self._bucket_bytes = slot_size * ways
+        self._hands = HEADER_BYTES
+        self._slots = HEADER_BYTES + (self.buckets + 63) // 64 * 64
+        self.size = self._slots + self.buckets * self._bucket_bytes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._counter_lock = threading.Lock()
+        self._counters = dict.fromkeys(("stores", "evictions", "too_large", "torn_reads"), 0)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._attach()
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    @classmethod
+    def from_env(cls, ttl):
+        """The shared tier configured by ``LABCODE_SHARED_CACHE``, or None."""
+        path = env_str("SHARED_CACHE")
+        if not path or fcntl is None:
+            return None
+        try:
+            return cls(
+                path,
+                size=env_int("SHARED_CACHE_MB", 64) << 20,
+                slot_size=env_int("SHARED_CACHE_SLOT", 4096),
+                ttl=ttl,
+            )
+        except GeometryMismatch as exc:
+            _log.error("shared cache tier disabled: %s", exc)
+            return None
+
+    def _attach(self):
+        header = _HEADER.pack(MAGIC, self.slot_size, self.ways, self.buckets, self.stripes)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, INIT_LOCK)
+        try:
+            current = os.pread(self._fd, _HEADER.size, 0)
+            if not current.strip(b"\0"):
+                # New, or its creator died before writing the header; either
+                # way no process has it mapped.
+                os.ftruncate(self._fd, 0)  # zero-filled again below
+                os.ftruncate(self._fd, self.size)
+                os.pwrite(self._fd, header, 0)
+            elif current != header or os.fstat(self._fd).st_size != self.size:
+                raise GeometryMismatch(
+                    f"{self.path} was created with other size or slot settings; "
+                    "remove it with every worker stopped to change them"
+                )
+            self._mm = mmap.mmap(self._fd, self.size)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, INIT_LOCK)
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+    # ---------- lookups ----------
+
+    def _bucket(self, tag):
+        return int.from_bytes(tag[:8], "little") % self.buckets
+
+    def _find(self, tag, bucket):
+        mm = self._mm
+        offset = self._slots + bucket * self._bucket_bytes
+        for _ in range(self.ways):
+            if mm[offset + TAG_OFFSET:offset + LENGTH_OFFSET] == tag:
+                return offset
+            offset += self.slot_size
+        return None
+
+    def get(self, key):
+        """``(value, stored_at)`` for ``key``, or None."""
+        tag = bytes.fromhex(key[:32])
+        offset = self._find(tag, self._bucket(tag))
+        if offset is None:
+            return None
+        mm = self._mm
+        limit = self.slot_size - SLOT_HEADER
+        for _ in range(READ_RETRIES):
+            seq = _SEQ.unpack_from(mm, offset)[0]
+            if seq & 1:
+                continue  # a writer is in the middle of this slot
+            stored_at, current, length = _META.unpack_from(mm, offset + META_OFFSET)
+            if current != tag:
+                return None  # replaced since _find
+            data = mm[offset + SLOT_HEADER:offset + SLOT_HEADER + min(length, limit)]
+            if _SEQ.unpack_from(mm, offset)[0] == seq:
+                break
+        else:
+            with self._counter_lock:
+                self._counters["torn_reads"] += 1
+            return None
+        if time.time() - stored_at >= self.ttl:
+            return None
+        mm[offset + REF_OFFSET] = 1
+        return _loads(data), stored_at
+
+    # ---------- stores ----------
+
+    @contextmanager
+    def _locked(self, stripe):
+        with self._locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, STRIPE_LOCK_BASE + stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, STRIPE_LOCK_BASE + stripe)
+
+    def put(self, key, value, stored_at):
+        """Store ``value``; returns False if it does not fit in a slot."""
+        data = dumps(value)
+        if len(data) > self.slot_size - SLOT_HEADER:
+            with self._counter_lock:
+                self._counters["too_large"] += 1
+            return False
+        tag = bytes.fromhex(key[:32])
+        bucket = self._bucket(tag)
+        mm = self._mm
+        with self._locked(bucket % self.stripes):
+            offset = self._find(tag, bucket)
+            evicted = False
+            if offset is None:
+                offset, evicted = self._victim(bucket)
+            seq = _SEQ.unpack_from(mm, offset)[0]
+            _SEQ.pack_into(mm, offset, seq + 1)
+            mm[offset + REF_OFFSET] = 0
+            mm[offset + SLOT_HEADER:offset + SLOT_HEADER + len(data)] = data
+            _META.pack_into(mm, offset + META_OFFSET, stored_at, tag, len(data))
+            _SEQ.pack_into(mm, offset, (seq + 2) & 0xFFFFFFFF)
+        with self._counter_lock:
+            self._counters["stores"] += 1
+            self._counters["evictions"] += evicted
+        return True
+
+    def _victim(self, bucket):
+        # Caller holds the bucket's stripe lock. Returns (offset, evicted).
+        mm = self._mm
+        base = self._slots + bucket * self._bucket_bytes
+        for way in range(self.ways):
+            offset = base + way * self.slot_size
+            if mm[offset + LENGTH_OFFSET:offset + SLOT_HEADER - 4] == EMPTY_LENGTH:
+                return offset, False
+        hand = mm[self._hands + bucket] % self.ways
+        for _ in range(self.ways + 1):
+            offset = base + hand * self.slot_size
+            hand = (hand + 1) % self.ways
+            if not mm[offset + REF_OFFSET]:
+                break
+            mm[offset + REF_OFFSET] = 0  # second chance
+        # All referenced: one full turn clears them and the slot at the start goes.
+        mm[self._hands + bucket] = hand
+        return offset, True
+
+    # ---------- maintenance ----------
+
+    def clear(self):
+        """Empty every slot; returns how many held an entry."""
+        mm = self._mm
+        cleared = 0
+        for bucket in range(self.buckets):
+            with self._locked(bucket % self.stripes):
+                offset = self._slots + bucket * self._bucket_bytes
+                for _ in range(self.ways):
+                    if mm[offset + LENGTH_OFFSET:offset + SLOT_HEADER - 4] != EMPTY_LENGTH:
+                        seq = _SEQ.unpack_from(mm, offset)[0]
+                        _SEQ.pack_into(mm, offset, seq + 1)
+                        _META.pack_into(mm, offset + META_OFFSET, 0.0, bytes(16), 0)
+                        _SEQ.pack_into(mm, offset, (seq + 2) & 0xFFFFFFFF)
+                        cleared += 1
+                    offset += self.slot_size
+        return cleared
+
+    def stats(self):
+        mm = self._mm
+        used = 0
+        for offset in range(self._slots + LENGTH_OFFSET, self.size, self.slot_size):
+            used += mm[offset:offset + 4] != EMPTY_LENGTH
+        with self._counter_lock:
+            stats = dict(self._counters)
+        stats.update(
+            path=self.path,
+            bytes=self.size,
+            slots=self.buckets * self.ways,
+            slot_bytes=self.slot_size,
+            ways=self.ways,
+            used=used,
+        )
+        return stats
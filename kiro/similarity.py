@@ -0,0 +1,391 @@
+"""Near-duplicate detection for submitted code (MinHash + LSH).
+
+Every paste sent to ``/api/explain`` is reduced to token shingles: runs of
+``SHINGLE`` consecutive code tokens (split as :func:`lexer.iter_tokens`
+does), so comments, string contents and layout do not count. Identifiers other than keywords
+become ``ID`` and numbers ``0``, so renaming variables does not hide a copy.
+
+Each shingle set gets a MinHash signature of ``num_perm`` values; the
+fraction of equal positions between two signatures estimates the Jaccard
+similarity of their shingle sets. Signatures are split into bands, and
+submissions sharing any band land in the same bucket, so a query only
+scores the submissions it collides with instead of the whole class.
+With the default 24 bands of 5 rows, pairs at Jaccard 0.7 collide with
+probability about 0.99, at 0.5 about 0.53 and at 0.2 under 0.01; unrelated
+solutions to the same lab typically score 0.15 to 0.3.
+
+Lab skeletons (``#include``, ``main``, the usual loop header) are shared by
+nearly every submission and can make a whole band identical. A bucket stops
+growing at ``max_bucket`` entries and is ignored by queries; copies still
+meet in the bands that cover their own code.
+
+The index keeps the ``max_entries`` most recent distinct submissions and
+forgets the oldest first. It lives in each process's memory, so under
+``serve.py --workers N`` every worker has its own. Submission ids are
+``<worker>-<number>`` with a random per-process prefix, so an id is never
+answered from another worker's submission; a worker that did not issue it
+answers 404.
+
+The index lives in memory and needs ``numpy``; without it ``/api/similar``
+answers 503 and nothing is recorded.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+
+from flask import Blueprint, current_app, jsonify, request
+
+from cache import normalize_code
+from config import env_bool, env_int
+from intake import SubmissionError, read_json_body
+from lexer import iter_code
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+SHINGLE = 5
+MAX_K = 100
+
+# Keywords of C, C++, Java and Python; any other word is an identifier.
+KEYWORDS = frozenset("""
+    and as assert auto bool break case catch char class const continue def
+    default del delete do double elif else enum except extends final finally
+    float for from global if implements import in include int is lambda long
+    new None nonlocal not or pass private protected public raise return self
+    short signed sizeof static struct super switch template this throw throws
+    try typedef union unsigned using virtual void while with yield True False
+    true false null nullptr String string vector print printf scanf cout cin
+    System out println main
+""".split())
+
+# lexer.TOKEN_RE without groups, so findall returns plain strings.
+_TOKEN_TEXT_RE = re.compile(r"[A-Za-z_]\w*|\d[\w.]*|[^\w\s]")
+# Distinct tokens remembered by the hash table below.
+_VOCAB_LIMIT = 1 << 16
+
+# Multiplier for rolling token hashes into shingle hashes (mod 2**64).
+_SHINGLE_MULT = 0x9E3779B97F4A7C15
+# Columns hashed at once when computing a signature; bounds the
+# ``num_perm x columns`` temporary.
+_SIGNATURE_BLOCK = 4096
+
+similarity_bp = Blueprint("similarity", __name__)
+
+
+class _TokenHashes(dict):
+    """Token text -> 32-bit hash of its normalized form, filled on demand."""
+
+    def __missing__(self, token):
+        if token[0].isdigit():
+            value = zlib.crc32(b"0")
+        elif (token[0].isalpha() or token[0] == "_") and token not in KEYWORDS:
+            value = zlib.crc32(b"ID")
+        else:
+            value = zlib.crc32(token.encode("utf-8", "surrogatepass"))
+        if len(self) < _VOCAB_LIMIT:
+            self[token] = value
+        return value
+
+
+_token_hashes = _TokenHashes()
+
+
+def token_hashes(code_text, language):
+    """32-bit hashes of the normalized code tokens."""
+    hashes = []
+    for segment in iter_code(code_text, language):
+        hashes.extend(map(_token_hashes.__getitem__, _TOKEN_TEXT_RE.findall(segment)))
+    return hashes
+
+
+class SimilarityIndex:
+    """MinHash signatures of stored submissions, bucketed by LSH band."""
+
+    def __init__(self, num_perm=120, bands=24, shingle=SHINGLE, max_bucket=1000,
+                 max_chars=256 << 10, max_entries=50_000, seed=1):
+        if np is None:
+            raise RuntimeError("the similarity index needs numpy")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        self.max_bucket = max_bucket
+        self.max_chars = max_chars
+        self.max_entries = max_entries
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: (a * x + b) >> 32 with odd a, mod 2**64.
+        self._a = (rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        # Row ``id % max_entries`` holds the signature of submission ``id``.
+        self._signatures = np.empty((min(1024, max_entries), num_perm), dtype=np.uint32)
+        self._buckets = [{} for _ in range(bands)]
+        self.entries = {}  # id -> {"digest", "language", "count", "first_seen"}
+        self._by_digest = {}
+        self._next_id = 0
+        self._evicted = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker = None
+
+    @classmethod
+    def from_env(cls):
+        """The configured index, or None when disabled or numpy is missing."""
+        if np is None or not env_bool("SIMILARITY", True):
+            return None
+        return cls(
+            num_perm=env_int("SIMILARITY_PERM", 120),
+            bands=env_int("SIMILARITY_BANDS", 24),
+            shingle=env_int("SIMILARITY_SHINGLE", SHINGLE),
+            max_bucket=env_int("SIMILARITY_MAX_BUCKET", 1000),
+            max_chars=env_int("SIMILARITY_MAX_CHARS", 256 << 10),
+            max_entries=env_int("SIMILARITY_MAX_ENTRIES", 50_000),
+        )
+
+    def init_app(self, app):
+        app.extensions["similarity_index"] = self
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ---------- ids ----------
+
+    def _prefix(self):
+        # Drawn again in each forked worker, whose ids restart from the
+        # parent's count; an id from another worker then does not resolve.
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._worker = os.urandom(4).hex()
+        return self._worker
+
+    def public_id(self, entry_id):
+        """The id clients see, unique to this process: ``<worker>-<id>``."""
+        return f"{self._prefix()}-{entry_id}"
+
+    def parse_id(self, public):
+        """The stored id for a :meth:`public_id`, or None if it was issued
+        by another worker or has been evicted."""
+        prefix, _, number = public.partition("-")
+        if prefix != self._prefix() or not number.isdigit():
+            return None
+        entry_id = int(number)
+        with self._lock:
+            return entry_id if entry_id in self.entries else None
+
+    # ---------- signatures ----------
+
+    def shingles(self, hashes):
+        """Distinct 64-bit shingle hashes for a token hash sequence."""
+        tokens = np.asarray(hashes, dtype=np.uint64)
+        if len(tokens) == 0:
+            return tokens
+        width = min(self.shingle, len(tokens))
+        count = len(tokens) - width + 1
+        shingles = tokens[:count].copy()
+        mult = np.uint64(_SHINGLE_MULT)
+        for offset in range(1, width):
+            shingles *= mult
+            shingles += tokens[offset:offset + count]
+        return np.unique(shingles)
+
+    def signature(self, code_text, language):
+        """MinHash signature of a paste, or None if it has no tokens."""
+        shingles = self.shingles(token_hashes(code_text, language))
+        if len(shingles) == 0:
+            return None
+        signature = np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        a, b = self._a[:, None], self._b[:, None]
+        for start in range(0, len(shingles), _SIGNATURE_BLOCK):
+            block = shingles[None, start:start + _SIGNATURE_BLOCK]
+            values = ((a * block + b) >> np.uint64(32)).astype(np.uint32)
+            np.minimum(signature, values.min(axis=1), out=signature)
+        return signature
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    # ---------- index ----------
+
+    def add(self, normalized, language):
+        """Record a submission; return its id, or None if it has no tokens
+        or is longer than ``max_chars`` (hashing it would slow the request
+        more than a lab-sized copy check is worth).
+
+        ``normalized`` is the paste after :func:`cache.normalize_code`;
+        identical ones share an entry whose ``count`` is bumped instead.
+        """
+        if len(normalized) > self.max_chars:
+            return None
+        digest = hashlib.sha256(f"{language}\0{normalized}".encode("utf-8", "surrogatepass")).hexdigest()
+        with self._lock:
+            entry_id = self._by_digest.get(digest)
+            if entry_id is not None:
+                self.entries[entry_id]["count"] += 1
+                return entry_id
+        signature = self.signature(normalized, language)
+        if signature is None:
+            return None
+        with self._lock:
+            entry_id = self._by_digest.get(digest)
+            if entry_id is not None:  # added while we hashed
+                self.entries[entry_id]["count"] += 1
+                return entry_id
+            entry_id = self._next_id
+            self._next_id += 1
+            if len(self.entries) >= self.max_entries:
+                self._evict(entry_id - self.max_entries)
+            row = entry_id % self.max_entries
+            if row == len(self._signatures):
+                grown = np.empty((min(2 * row, self.max_entries), self.num_perm), dtype=np.uint32)
+                grown[:row] = self._signatures
+                self._signatures = grown
+            self._signatures[row] = signature
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                ids = bucket.setdefault(key, [])
+                if len(ids) < self.max_bucket:
+                    ids.append(entry_id)
+            self.entries[entry_id] = {
+                "digest": digest,
+                "language": language,
+                "count": 1,
+                "first_seen": time.time(),
+            }
+            self._by_digest[digest] = entry_id
+            return entry_id
+
+    def _evict(self, entry_id):
+        # Caller holds self._lock; ``entry_id`` is the oldest entry, whose
+        # signature row is about to be reused.
+        entry = self.entries.pop(entry_id)
+        del self._by_digest[entry["digest"]]
+        signature = self._signatures[entry_id % self.max_entries]
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            ids = bucket.get(key)
+            if ids and ids[0] == entry_id:  # oldest first, unless the bucket was full
+                del ids[0]
+                if not ids:
+                    del bucket[key]
+        self._evicted += 1
+
+    def query(self, signature, k=5, exclude=None):
+        """``(matches, candidates)``: up to ``k`` ``(id, score)`` pairs, best
+        first, and how many stored submissions shared a band."""
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                ids = bucket.get(key, ())
+                if len(ids) < self.max_bucket:
+                    candidates.update(ids)
+            candidates.discard(exclude)
+            if not candidates:
+                return [], 0
+            ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            scores = (self._signatures[ids % self.max_entries] == signature).mean(axis=1)
+        if len(ids) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.lexsort((ids, -scores))
+        return [(int(ids[i]), float(scores[i])) for i in order], len(candidates)
+
+    def similar_to(self, entry_id, k=5):
+        with self._lock:
+            signature = self._signatures[entry_id % self.max_entries].copy()
+        return self.query(signature, k, exclude=entry_id)
+
+    def stats(self):
+        with self._lock:
+            sizes = [len(ids) for bucket in self._buckets for ids in bucket.values()]
+            submissions = len(self.entries)
+        return {
+            "submissions": submissions,
+            "max_entries": self.max_entries,
+            "evicted": self._evicted,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "buckets": len(sizes),
+            "largest_bucket": max(sizes, default=0),
+            "full_buckets": sum(size >= self.max_bucket for size in sizes),
+        }
+
+
+# ---------- endpoints ----------
+
+def _index():
+    return current_app.extensions.get("similarity_index")
+
+
+def _matches_response(index, matches, candidates):
+    found = []
+    for entry_id, score in matches:
+        entry = index.entries.get(entry_id)
+        if entry is not None:  # else evicted since the query
+            found.append({
+                "id": index.public_id(entry_id),
+                "score": round(score, 4),
+                "language": entry["language"],
+                "count": entry["count"],
+            })
+    return jsonify({
+        "matches": found,
+        "candidates": candidates,
+        "indexed": len(index),
+    })
+
+
+def _top_k(value):
+    try:
+        k = int(value)
+    except (TypeError, ValueError):
+        return None
+    return k if 1 <= k <= MAX_K else None
+
+
+@similarity_bp.route("/api/similar", methods=["POST"])
+def api_similar():
+    """Top-k stored submissions similar to ``{code, language}``; the
+    query itself is not recorded."""
+    index = _index()
+    if index is None:
+        return jsonify({"error": "similarity index is disabled"}), 503
+    try:
+        payload = read_json_body(request, current_app.extensions["intake_limits"])
+    except SubmissionError as exc:
+        return jsonify({"error": str(exc)}), exc.status
+    if not isinstance(payload, dict):
+        return jsonify({"error": "expected {code, language, k}"}), 400
+    for name in ("code", "language"):
+        if not isinstance(payload.get(name, ""), str):
+            return jsonify({"error": f"'{name}' must be a string"}), 400
+    k = _top_k(payload.get("k", 5))
+    if k is None:
+        return jsonify({"error": f"k must be between 1 and {MAX_K}"}), 400
+    code_text = payload.get("code", "")
+    if len(code_text) > index.max_chars:
+        return jsonify({"error": f"code longer than {index.max_chars} characters"}), 413
+    signature = index.signature(normalize_code(code_text), payload.get("language", "C"))
+    if signature is None:
+        return _matches_response(index, [], 0)
+    return _matches_response(index, *index.query(signature, k))
+
+
+@similarity_bp.route("/api/similar/<submission_id>", methods=["GET"])
+def api_similar_to(submission_id):
+    """Top-k submissions similar to a stored one (see ``X-Submission-Id``)."""
+    index = _index()
+    if index is None:
+        return jsonify({"error": "similarity index is disabled"}), 503
+    entry_id = index.parse_id(submission_id)
+    if entry_id is None:
+        return jsonify({"error": "no such submission in this worker"}), 404
+    k = _top_k(request.args.get("k", 5))
+    if k is None:
+        return jsonify({"error": f"k must be between 1 and {MAX_K}"}), 400
+    return _matches_response(index, *index.similar_to(entry_id, k))
@@ -0,0 +1,130 @@
+"""Coalescing of identical in-flight explanation requests ("single flight").
+
+When a lab group hits "Generate explanation" on the same program at once,
+the first request for a cache key becomes the leader and computes; the
+others wait for its result instead of computing it again.
+
+Across worker processes the leader additionally takes an ``fcntl`` lock
+file (``LABCODE_SINGLEFLIGHT_DIR``) and re-checks the cache once it holds
+it, so with the SQLite tier (``LABCODE_CACHE_DB``) a program explained in
+one worker is picked up by leaders waiting in the others (``late_hits``).
+Keys share a fixed set of lock files, so unrelated keys occasionally wait
+on each other but the directory never grows.
+
+A leader that fails passes its exception to its followers. A leader that
+is abandoned (a streaming client disconnected) or is too slow lets the
+followers compute on their own.
+"""
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; cross-worker locks are off
+    fcntl = None
+
+LOCK_SLOTS = 256
+
+
+class Flight:
+    """One in-progress computation and the requests waiting on it."""
+
+    def __init__(self, key):
+        self.key = key
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        """Return the leader's value, or None if it gave up or timed out."""
+        if not self.done.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class SingleFlight:
+    def __init__(self, lock_dir=None, timeout=30.0):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("leaders", "coalesced", "abandoned", "timeouts", "worker_lock_waits", "late_hits"), 0
+        )
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def begin(self, key):
+        """Return ``(flight, leader)``; a leader must call :meth:`finish`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight(key)
+                self._counters["leaders"] += 1
+                return flight, True
+            self._counters["coalesced"] += 1
+            return flight, False
+
+    def finish(self, flight, value=None, error=None):
+        """Publish the leader's outcome; ``value`` None means abandoned."""
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            if value is None and error is None:
+                self._counters["abandoned"] += 1
+        flight.value, flight.error = value, error
+        flight.done.set()
+
+    def follow(self, flight):
+        """Wait for a leader; None means the caller should compute itself."""
+        value = flight.wait(self.timeout)
+        if value is None and not flight.done.is_set():
+            self.record("timeouts")
+        return value
+
+    def do(self, key, compute):
+        """Run ``compute()`` once for concurrent callers with the same key."""
+        flight, leader = self.begin(key)
+        if not leader:
+            value = self.follow(flight)
+            return value if value is not None else compute()
+        try:
+            value = compute()
+        except BaseException as exc:
+            self.finish(flight, error=exc if isinstance(exc, Exception) else None)
+            raise
+        self.finish(flight, value)
+        return value
+
+    @contextmanager
+    def worker_lock(self, key):
+        """Hold the cross-worker lock for ``key`` (no-op without a lock dir)."""
+        if not self.lock_dir:
+            yield
+            return
+        slot = zlib.crc32(key.encode()) % LOCK_SLOTS
+        fd = os.open(os.path.join(self.lock_dir, f"slot-{slot:03d}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.record("worker_lock_waits")
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # releases the lock
+
+    def record(self, counter, n=1):
+        with self._lock:
+            self._counters[counter] += n
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._flights)
+        stats["cross_worker"] = bool(self.lock_dir)
+        return stats
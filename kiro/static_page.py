@@ -0,0 +1,55 @@
+"""Pre-rendered HTML pages served straight from memory.
+
+The UI pages have no template variables, so they are encoded once at startup
+together with gzip (and, when the optional ``brotli`` package is installed,
+brotli) variants. Each variant gets a strong ETag and conditional GETs are
+answered with 304 without touching the body.
+"""
+import gzip
+import hashlib
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Clients may keep the page but must revalidate; a deploy changes the ETag.
+CACHE_CONTROL = "public, no-cache"
+
+
+class PrerenderedPage:
+    def __init__(self, html, mimetype="text/html"):
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.mimetype = mimetype
+        # content-coding -> (ETag, bytes); strong ETags must differ per coding.
+        self.variants = {"identity": (digest, body)}
+        self.variants["gzip"] = (f"{digest}-gz", gzip.compress(body, 9, mtime=0))
+        if brotli is not None:
+            self.variants["br"] = (f"{digest}-br", brotli.compress(body, quality=11))
+        self._preference = [c for c in ("br", "gzip", "identity") if c in self.variants]
+
+    def negotiate(self, accept_encodings, if_none_match):
+        """Return ``(status, headers, body)`` for parsed request headers."""
+        coding = accept_encodings.best_match(self._preference) or "identity"
+        etag, body = self.variants[coding]
+
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+
+        if if_none_match.contains_weak(etag):
+            return 304, headers, b""
+        return 200, headers, body
+
+    def response(self, request):
+        status, headers, body = self.negotiate(request.accept_encodings, request.if_none_match)
+        if status == 304:
+            return Response(status=304, headers=headers)
+        return Response(body, mimetype=self.mimetype, headers=headers)
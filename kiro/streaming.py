@@ -0,0 +1,137 @@
+"""Incremental delivery of explanation sections.
+
+``/api/explain`` streams when the client sends ``Accept: application/x-ndjson``
+or ``Accept: text/event-stream`` (or ``?stream=ndjson|sse``). Each section is
+written as soon as the explainer yields it:
+
+* NDJSON: one ``{"section": name, "data": value}`` object per line, then
+  ``{"done": true}``.
+* SSE: ``event: section`` messages with the same payload, then ``event: done``.
+
+A failure after the first byte cannot change the status code, so it is
+reported in-band as ``{"error": ...}``.
+
+With cross-worker single flight (``LABCODE_SINGLEFLIGHT_DIR``) the leader
+computes every section before sending the first, so the lock other
+workers wait on is never held while a client reads.
+"""
+import json
+
+from flask import Response
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+SSE_MIMETYPE = "text/event-stream"
+
+_FORMATS = {"ndjson": NDJSON_MIMETYPE, "sse": SSE_MIMETYPE}
+
+
+# Sent with every stream; X-Accel-Buffering asks nginx not to buffer it.
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def stream_format(request):
+    """Return ``"ndjson"``, ``"sse"`` or ``None`` for a plain JSON response."""
+    return choose_format(request.args.get("stream"), request.accept_mimetypes)
+
+
+def choose_format(requested, accept):
+    """Format from a ``?stream=`` value and a parsed ``Accept`` header."""
+    if requested in _FORMATS:
+        return requested
+    best = accept.best_match([NDJSON_MIMETYPE, SSE_MIMETYPE, "application/json"])
+    if best == NDJSON_MIMETYPE:
+        return "ndjson"
+    if best == SSE_MIMETYPE:
+        return "sse"
+    return None
+
+
+def cache_sections(sections, cache, key):
+    """Pass sections through and store the assembled explanation once complete."""
+    explanation = {}
+    for name, value in sections:
+        explanation[name] = value
+        yield name, value
+    cache.put(key, explanation)
+
+
+def coalesced_sections(cache, key, produce):
+    """Sections for ``key`` from the cache, from an identical request already
+    in flight, or from ``produce()`` with this request as the leader."""
+    cached = cache.get(key)
+    if cached is None:
+        flight, leader = cache.flights.begin(key)
+        if leader:
+            yield from _lead(cache, flight, produce)
+            return
+        cached = cache.flights.follow(flight)
+        if cached is None:
+            yield from cache_sections(produce(), cache, key)
+            return
+    yield from cached.items()
+
+
+def _lead(cache, flight, produce):
+    if cache.flights.lock_dir:
+        yield from _lead_across_workers(cache, flight, produce)
+        return
+    complete, error = None, None
+    try:
+        explanation = cache.recheck(flight.key)
+        if explanation is not None:
+            yield from explanation.items()
+        else:
+            explanation = {}
+            for name, value in produce():
+                explanation[name] = value
+                yield name, value
+            cache.put(flight.key, explanation)
+        complete = explanation
+    except Exception as exc:
+        error = exc
+        raise
+    finally:
+        # A client that disconnects mid-stream leaves complete unset and
+        # followers compute for themselves.
+        cache.flights.finish(flight, complete, error)
+
+
+def _lead_across_workers(cache, flight, produce):
+    # The worker lock is an fcntl slot lock other workers block on, so it
+    # must not be held while a client reads the stream at its own pace:
+    # compute, store and publish the sections under it, then stream them.
+    try:
+        explanation = cache.fill(flight.key, lambda: dict(produce()))
+    except BaseException as exc:
+        cache.flights.finish(flight, error=exc if isinstance(exc, Exception) else None)
+        raise
+    cache.flights.finish(flight, explanation)
+    yield from explanation.items()
+
+
+def mimetype_for(fmt):
+    return _FORMATS[fmt]
+
+
+def encode_event(fmt, event, payload):
+    body = json.dumps(payload)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {body}\n\n"
+    return body + "\n"
+
+
+def encode_events(sections, fmt):
+    """Yield the wire text for each section, then the done (or error) event."""
+    try:
+        for name, value in sections:
+            yield encode_event(fmt, "section", {"section": name, "data": value})
+    except Exception as exc:  # noqa: BLE001 - status line is already sent
+        yield encode_event(fmt, "error", {"error": f"{type(exc).__name__}: {exc}"})
+        return
+    yield encode_event(fmt, "done", {"done": True})
+
+
+def stream_response(sections, fmt):
+    return Response(
+        encode_events(sections, fmt), mimetype=_FORMATS[fmt], headers=STREAM_HEADERS
+    )
@@ -0,0 +1,12 @@
+"""The modules under test are flat files in ``kiro``, imported the way the
+entry points import them (``python app.py`` from that directory)."""
+import os
+import sys
+
+KIRO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if KIRO not in sys.path:
+    sys.path.insert(0, KIRO)
+
+# Settings from the caller's environment would change what the tests see.
+for name in [name for name in os.environ if name.startswith("LABCODE_")]:
+    del os.environ[name]
@@ -0,0 +1,61 @@
+import pytest
+
+from factory import create_app
+
+BODY = {"code": "for (;;) {}", "language": "C"}
+
+
+@pytest.fixture
+def admitted(monkeypatch):
+    def make(**settings):
+        monkeypatch.setenv("LABCODE_ADMISSION", "1")
+        for name, value in settings.items():
+            monkeypatch.setenv(f"LABCODE_{name}", str(value))
+        return create_app("mvp").test_client()
+    return make
+
+
+def test_rate_limit_is_per_client(admitted):
+    client = admitted(RATE_LIMIT=0.5, RATE_BURST=2)
+    ana = {"X-Student-Id": "ana"}
+    assert client.post("/api/explain", json=BODY, headers=ana).status_code == 200
+    assert client.post("/api/explain", json=BODY, headers=ana).status_code == 200
+    refused = client.post("/api/explain", json=BODY, headers=ana)
+    assert refused.status_code == 429
+    assert refused.headers["Retry-After"] == "2"
+    assert refused.get_json()["retry_after"] == 2
+    # A batch spends a token of the same bucket.
+    assert client.post("/api/explain/batch", json=[BODY], headers=ana).status_code == 429
+    assert client.post("/api/explain", json=BODY, headers={"X-Student-Id": "ben"}).status_code == 200
+
+
+def test_full_queue_is_shed(admitted):
+    client = admitted(ADMISSION_SLOTS=1, ADMISSION_QUEUE=0, RATE_LIMIT=0)
+    admission = client.application.extensions["admission"]
+    # A stream holds its slot until the body has been sent.
+    stream = client.post("/api/explain?stream=ndjson", json=BODY, buffered=False)
+    assert admission.stats()["active"] == 1
+    refused = client.post("/api/explain", json=BODY)
+    assert refused.status_code == 503
+    assert "queue full" in refused.get_json()["error"]
+    assert int(refused.headers["Retry-After"]) >= 1
+    assert client.post("/api/explain/batch", json=[BODY]).status_code == 503
+
+    stream.get_data()
+    stream.close()
+    assert admission.stats()["active"] == 0
+    assert client.post("/api/explain", json=BODY).status_code == 200
+    assert admission.stats()["queue_full"] == 2
+
+
+def test_queue_wait_runs_out(admitted):
+    client = admitted(ADMISSION_SLOTS=1, ADMISSION_QUEUE=4, ADMISSION_WAIT=0.05, RATE_LIMIT=0)
+    admission = client.application.extensions["admission"]
+    stream = client.post("/api/explain?stream=ndjson", json=BODY, buffered=False)
+    refused = client.post("/api/explain", json=BODY)
+    assert refused.status_code == 503
+    assert "timed out" in refused.get_json()["error"]
+    stream.close()
+    stats = admission.stats()
+    assert (stats["timed_out"], stats["waiting"], stats["active"]) == (1, 0, 0)
+    assert 'reason="timed_out"' in client.get("/metrics").get_data(as_text=True)
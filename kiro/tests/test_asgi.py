@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import asgi
+from backends import StubModelBackend
+from factory import create_app
+
+
+def test_backend_semaphore_follows_the_running_loop():
+    # Built outside any loop, as asgi.main() does before uvicorn starts one.
+    backend = StubModelBackend("mvp", concurrency=1, latency=0.01)
+
+    async def contended():
+        # Two explanations for one slot: the second waits on the semaphore.
+        return await asyncio.gather(*(
+            backend.explain("for (;;) {}", "C", "", "SDE") for _ in range(2)
+        ))
+
+    for _ in range(2):
+        first, second = asyncio.run(contended())
+        assert first == second
+        assert "loops" in first["summary"]
+    assert backend.in_flight == 0
+
+
+def call(app, method, path, body=b"", headers=(), query=b"", chunks=None):
+    """One request through the ASGI app: ``(status, headers, body)``."""
+    parts = list(chunks) if chunks is not None else [body]
+    messages = [
+        {"type": "http.request", "body": part, "more_body": number < len(parts) - 1}
+        for number, part in enumerate(parts)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+    }
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    response_headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], response_headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_asgi_matches_the_flask_app():
+    app = asgi.create_app("mvp")
+    body = json.dumps({"code": "for (;;) {}", "language": "C"}).encode()
+    status, headers, content = call(app, "POST", "/api/explain", body)
+    assert status == 200
+    flask_response = create_app("mvp").test_client().post("/api/explain", data=body)
+    assert content == flask_response.data
+    assert headers["etag"] == flask_response.headers["ETag"]
+
+    status, _, content = call(app, "POST", "/api/explain", body, [("If-None-Match", headers["etag"])])
+    assert (status, content) == (304, b"")
+
+    status, headers, content = call(app, "POST", "/api/explain", query=b"stream=ndjson",
+                                    chunks=[body[:5], body[5:]])
+    assert headers["content-type"].startswith("application/x-ndjson")
+    assert json.loads(content.splitlines()[-1]) == {"done": True}
+
+
+def test_asgi_errors():
+    app = asgi.create_app("mvp")
+    assert call(app, "POST", "/api/explain", b"not json")[0] == 400
+    assert call(app, "DELETE", "/api/explain")[0] == 405
+    assert call(app, "GET", "/nope")[0] == 404
+    app.limits.max_body = 10
+    body = json.dumps({"code": "x" * 20}).encode()
+    assert call(app, "POST", "/api/explain", body, [("Content-Length", str(len(body)))])[0] == 413
+    # Without Content-Length the limit applies as the body arrives.
+    assert call(app, "POST", "/api/explain", chunks=[body[:8], body[8:]])[0] == 413
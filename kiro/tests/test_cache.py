@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from cache import ExplanationCache, normalize_code, normalize_lines
+from factory import create_app
+from shared_cache import GeometryMismatch, SharedCache
+
+
+def test_normalize_code():
+    assert normalize_code("\r\n\n  int  a ;\t\r\n\tb\t=\t1;  \n\n") == "  int a ;\n\tb = 1;"
+    assert normalize_code("x\ry") == "x\ny"
+    assert normalize_code(" \n \t\n") == ""
+
+
+def test_normalize_lines_keeps_blank_ends():
+    assert normalize_lines("\n a  b \n") == ["", " a b", ""]
+
+
+def test_indentation_is_part_of_the_key():
+    inside = "for x in items:\n    total += x\n    print(total)\n"
+    after = "for x in items:\n    total += x\nprint(total)\n"
+    cache = ExplanationCache("mvp")
+    keys = {cache.key_for(normalize_code(code), "Python", "", "") for code in (inside, after)}
+    assert len(keys) == 2
+
+
+def test_long_whitespace_runs_are_linear():
+    # A paste of spaces with no newline once backtracked quadratically.
+    text = "a" + " " * 200_000 + "b" + "\t " * 100_000 + "\n"
+    start = time.perf_counter()
+    assert normalize_code(text) == "a b"
+    assert normalize_code(" " * 200_000 + "a") == " " * 200_000 + "a"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_equal_after_normalizing_means_same_key():
+    cache = ExplanationCache("mvp")
+    key = cache.key_for(normalize_code("int  a;\n"), "C", "", "SDE")
+    assert key == cache.key_for(normalize_code("int a;  \r\n\n"), "C", "", "SDE")
+    assert key != cache.key_for(normalize_code("int a;"), "C", "", "Data")
+    assert key != cache.scan_key_for(normalize_code("int a;"), "C")
+
+
+def test_lru_and_ttl():
+    cache = ExplanationCache("mvp", maxsize=2, ttl=60.0)
+    for name in "abc":
+        cache.put(name, {"v": name})
+    assert cache.get("a") is None
+    assert cache.get("c") == {"v": "c"}
+    cache.ttl = 0.0
+    assert cache.get("c") is None
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"]) == (1, 1)
+
+
+def test_sqlite_tier_survives_and_prunes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = ExplanationCache("mvp", db_path=path, ttl=60.0)
+    first.put("k", {"summary": "s"})
+    assert ExplanationCache("mvp", db_path=path, ttl=60.0).get("k") == {"summary": "s"}
+    assert ExplanationCache("mvp", db_path=path, ttl=0.0).stats()["pruned"] == 1
+    assert ExplanationCache("mvp", db_path=path, ttl=60.0).get("k") is None
+
+
+def test_get_or_compute_computes_once():
+    cache = ExplanationCache("mvp")
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1) or {"n": len(calls)}) == {"n": 1}
+    assert len(calls) == 1
+
+
+# ---------- shared tier ----------
+
+def test_shared_tier_is_seen_by_every_worker(tmp_path, monkeypatch):
+    pytest.importorskip("fcntl")
+    monkeypatch.setenv("LABCODE_SHARED_CACHE", str(tmp_path / "shared.bin"))
+    monkeypatch.setenv("LABCODE_SHARED_CACHE_MB", "1")
+    # Two apps map the file like two serve.py workers.
+    first, second = create_app("mvp").test_client(), create_app("mvp").test_client()
+    body = {"code": "for (;;) {}", "language": "C"}
+    assert first.post("/api/explain", json=body).status_code == 200
+    assert second.post("/api/explain", json=body).get_json() == first.post("/api/explain", json=body).get_json()
+    stats = second.get("/api/admin/cache").get_json()
+    assert (stats["shared_hits"], stats["misses"]) == (1, 0)
+
+    # A flush empties the shared table too, so a new worker misses.
+    assert second.post("/api/admin/cache/flush").get_json()["flushed"] >= 1
+    third = create_app("mvp").test_client()
+    third.post("/api/explain", json=body)
+    assert third.get("/api/admin/cache").get_json()["shared_hits"] == 0
+
+
+def test_shared_tier_entries_too_large_are_not_shared(tmp_path):
+    pytest.importorskip("fcntl")
+    shared = SharedCache(str(tmp_path / "shared.bin"), size=1 << 16, slot_size=128)
+    key = "ab" * 32
+    assert shared.put(key, {"v": "x" * 200}, time.time()) is False
+    assert shared.put(key, {"v": "x"}, time.time()) is True
+    assert shared.get(key)[0] == {"v": "x"}
+    assert shared.stats()["too_large"] == 1
+    shared.close()
+
+
+def test_shared_tier_with_other_geometry_is_left_alone(tmp_path, monkeypatch, caplog):
+    pytest.importorskip("fcntl")
+    path = str(tmp_path / "shared.bin")
+    SharedCache(path, size=1 << 20).close()
+    with pytest.raises(GeometryMismatch):
+        SharedCache(path, size=2 << 20)
+    monkeypatch.setenv("LABCODE_SHARED_CACHE", path)
+    monkeypatch.setenv("LABCODE_SHARED_CACHE_MB", "2")
+    assert SharedCache.from_env(60.0) is None
+    assert "shared cache tier disabled" in caplog.text
+    # The app still serves, from its own tiers.
+    client = create_app("mvp").test_client()
+    assert client.post("/api/explain", json={"code": "int x;"}).status_code == 200
+    assert "shared" not in client.get("/api/admin/cache").get_json()
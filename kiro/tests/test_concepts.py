@@ -0,0 +1,48 @@
+import pytest
+
+from concepts import SMALL_SOURCE, count_lines
+from rules import get_rules
+
+
+@pytest.fixture
+def detector():
+    return get_rules().detector
+
+
+@pytest.mark.parametrize("language, code, expected", [
+    ("C", "int a[3];\nfor (i = 0; i < 3; i++)\n    if (a[i]) f();\n", ["loops", "arrays", "conditions"]),
+    ("Python", "def twice(x):\n    return x * 2\n", ["functions"]),
+    ("Java", "while (true) { }\n", ["loops"]),
+    ("C", "x = 1;\n", []),
+])
+def test_detect(detector, language, code, expected):
+    assert detector.detect(code, language) == expected
+
+
+def test_signals_in_comments_and_strings_do_not_count(detector):
+    code = '// for each item\nprintf("if [ while ]");\n/* void f() */\n'
+    assert detector.detect(code, "C") == []
+
+
+def test_keywords_match_whole_words_only(detector):
+    assert detector.detect("forever = iffy + whiled;\n", "C") == []
+    assert detector.detect("x = 1; if(x) y();\n", "C") == ["conditions"]
+
+
+def test_large_sources_match_small_ones(detector):
+    filler = "x = x + 1;\n" * (SMALL_SOURCE // 10)
+    code = filler + "/* for */ while (x) { }\n" + filler
+    assert len(code) > SMALL_SOURCE
+    assert detector.detect(code, "C") == ["loops"]
+    assert detector.detect(code.replace("while", "whilst"), "C") == []
+
+
+def test_mask_matches_detect(detector):
+    code = "for (;;) { a[0] = 1; }"
+    mask = detector.mask(code)
+    assert [name for bit, name in enumerate(detector.order) if mask >> bit & 1] == ["loops", "arrays"]
+
+
+@pytest.mark.parametrize("text", ["", "one", "\n\n a\nb \n\n", "a\n" * 50_000 + "  \n" * 5000])
+def test_count_lines(text):
+    assert count_lines(text) == len(text.strip().split("\n"))
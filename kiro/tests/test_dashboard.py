@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from dashboard import ClassDashboard  # noqa: E402
+from factory import create_app  # noqa: E402
+from progress import EXPLAIN, ProgressLog  # noqa: E402
+
+DAY = 20_000  # any fixed UTC day
+WHEN = DAY * 86400.0 + 60
+
+
+def _dashboard(tmp_path, **kwargs):
+    return ClassDashboard(ProgressLog(str(tmp_path)), **kwargs)
+
+
+def test_rejoining_a_class_keeps_the_old_position(tmp_path):
+    dashboard = _dashboard(tmp_path)
+    dashboard.enroll("ana", "c1")
+    dashboard.enroll("ben", "c1")
+    dashboard.log.record("ana", ["loops"], EXPLAIN, when=WHEN)
+    dashboard.enroll("ana", "c2")
+    dashboard.enroll("ana", "c1")
+    dashboard.log.record("ana", ["loops"], EXPLAIN, when=WHEN)
+
+    summary = dashboard.summary("c1", days=1, end_day=DAY)
+    assert summary["enrolled"] == 2
+    assert summary["active_students"] == 1
+    assert summary["concepts"][0]["explains"] == 2
+
+    # Positions survive a restart (replayed from roster.txt) and a rebuild.
+    dashboard.log._events.close()
+    again = _dashboard(tmp_path)
+    assert again._roster.position == {"ana": 0, "ben": 1}
+    again.rebuild()
+    assert again.summary("c1", days=1, end_day=DAY)["active_students"] == 1
+
+
+def test_concurrent_checkpoints_use_their_own_temp_files(tmp_path):
+    dashboard = _dashboard(tmp_path)
+    dashboard.enroll("ana", "c1")
+    dashboard.log.record("ana", ["loops", "arrays"], EXPLAIN, when=WHEN)
+    threads = [threading.Thread(target=dashboard.checkpoint) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ["concepts.txt", "dashboard.json", "events.bin", "roster.txt", "students.txt"]
+    )
+    with open(tmp_path / "dashboard.json") as f:
+        assert json.load(f)["offset"] == 2
+
+
+def test_failed_checkpoint_leaves_no_temp_file(tmp_path, monkeypatch):
+    dashboard = _dashboard(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        dashboard.checkpoint()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+# ---------- endpoints ----------
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABCODE_PROGRESS_DIR", str(tmp_path))
+    return create_app("mvp").test_client()
+
+
+def test_dashboard_endpoints(client):
+    response = client.post("/api/classes/cs1/students", json={"students": ["ana", "ben"]})
+    assert response.get_json() == {"class": "cs1", "enrolled": 2}
+    code = {"code": "for (int i = 0; i < n; i++) {}", "language": "C"}
+    client.post("/api/explain", json=code, headers={"X-Student-Id": "ana"})
+    # The header enrols a student on their first explanation.
+    client.post("/api/explain", json=code, headers={"X-Student-Id": "cy", "X-Class-Id": "cs1"})
+    client.post("/api/progress/ben/practice", json={"concept": "loops"})
+
+    summary = client.get("/api/classes/cs1/dashboard?days=1").get_json()
+    assert (summary["enrolled"], summary["active_students"]) == (3, 3)
+    loops = {item["concept"]: item for item in summary["concepts"]}["loops"]
+    assert (loops["explains"], loops["practices"], loops["students"]) == (2, 1, 3)
+    assert summary["days"][-1]["students"] == 3
+
+    rebuilt = client.post("/api/admin/dashboard/rebuild").get_json()
+    assert (rebuilt["classes"], rebuilt["students"]) == (1, 3)
+    assert client.get("/api/classes/cs1/dashboard?days=1").get_json() == summary
+
+
+@pytest.mark.parametrize("query", ["days=0", "days=91", "days=x", "end=yesterday"])
+def test_dashboard_bad_queries(client, query):
+    assert client.get(f"/api/classes/cs1/dashboard?{query}").status_code == 400
+
+
+@pytest.mark.parametrize("body", [{}, {"students": []}, {"students": ["a b"]}, {"students": "ana"}])
+def test_enrol_bad_bodies(client, body):
+    assert client.post("/api/classes/cs1/students", json=body).status_code == 400
+
+
+def test_dashboard_disabled():
+    client = create_app("mvp").test_client()
+    assert client.get("/api/classes/cs1/dashboard").status_code == 503
+    assert client.post("/api/classes/cs1/students", json={"students": ["ana"]}).status_code == 503
+    assert client.post("/api/admin/dashboard/rebuild").status_code == 503
@@ -0,0 +1,33 @@
+import importlib
+import os
+import pkgutil
+
+import pytest
+
+from conftest import KIRO
+
+# Optional dependencies a module may need; without them it is skipped.
+OPTIONAL = {"numpy", "orjson"}
+ENTRY_POINTS = ["app", "app1", "asgi", "serve", "ingest", "factory"]
+BENCHES = sorted("bench." + info.name for info in pkgutil.iter_modules([os.path.join(KIRO, "bench")]))
+
+
+@pytest.mark.parametrize("name", ENTRY_POINTS + BENCHES)
+def test_imports(name):
+    try:
+        module = importlib.import_module(name)
+    except ImportError as exc:
+        if exc.name in OPTIONAL:
+            pytest.skip(f"{exc.name} is not installed")
+        raise
+    if name.startswith("bench."):
+        assert callable(module.main)
+
+
+@pytest.mark.parametrize("name", ["app", "app1"])
+def test_apps_serve_the_page(name):
+    client = importlib.import_module(name).app.test_client()
+    assert client.get("/").status_code == 200
+    response = client.post("/api/explain", json={"code": "for (;;) {}", "language": "C"})
+    assert response.status_code == 200
+    assert "loops" in response.get_json()["summary"]
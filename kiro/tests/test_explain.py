@@ -0,0 +1,114 @@
+import io
+import json
+
+import pytest
+
+from factory import create_app
+
+LOOP = "int s = 0;\nfor (int i = 0; i < n; i++)\n    s += a[i];\n"
+
+
+@pytest.fixture
+def client():
+    return create_app("mvp").test_client()
+
+
+def test_explain_json(client):
+    response = client.post("/api/explain", json={"code": LOOP, "language": "C", "job_role": "SDE"})
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "loops" in response.get_json()["summary"]
+
+
+def test_ndjson_stream(client):
+    response = client.post("/api/explain?stream=ndjson", json={"code": LOOP, "language": "C"})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[-1] == {"done": True}
+    sections = {event["section"]: event["data"] for event in events[:-1]}
+    # The same sections as the JSON answer, which the stream also cached.
+    plain = client.post("/api/explain", json={"code": LOOP, "language": "C"}).get_json()
+    assert sections == plain
+
+
+def test_sse_stream_from_accept(client):
+    response = client.post("/api/explain", json={"code": LOOP, "language": "C"},
+                           headers={"Accept": "text/event-stream"})
+    assert response.mimetype == "text/event-stream"
+    messages = response.get_data(as_text=True).split("\n\n")[:-1]
+    assert all(message.startswith("event: ") for message in messages)
+    assert messages[-1] == 'event: done\ndata: {"done": true}'
+    assert messages[0].startswith("event: section\ndata: {")
+
+
+def test_etag_revalidation(client):
+    body = {"code": LOOP, "language": "C"}
+    first = client.post("/api/explain", json=body)
+    etag = first.headers["ETag"]
+    again = client.post("/api/explain", json=body, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+    # Spacing-only edits keep the ETag; other options and formats do not.
+    spaced = dict(body, code=LOOP.replace("s = 0", "s  =  0"))
+    assert client.post("/api/explain", json=spaced, headers={"If-None-Match": etag}).status_code == 304
+    role = dict(body, job_role="Data")
+    assert client.post("/api/explain", json=role, headers={"If-None-Match": etag}).status_code == 200
+    stream = client.post("/api/explain?stream=ndjson", json=body, headers={"If-None-Match": etag})
+    assert stream.status_code == 200
+    assert stream.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("body", [b"not json", b"[1]", b'{"code": 3}'])
+def test_explain_bad_bodies(client, body):
+    response = client.post("/api/explain", data=body, content_type="application/json")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_explain_body_is_bounded(client):
+    client.application.extensions["intake_limits"].max_body = 100
+    body = json.dumps({"code": "x" * 200}).encode()
+    assert client.post("/api/explain", data=body).status_code == 413
+    response = client.post("/api/explain", input_stream=io.BytesIO(body),
+                           environ_overrides={"wsgi.input_terminated": True})
+    assert response.status_code == 413
+
+
+# ---------- batch ----------
+
+def test_batch_keeps_order_and_reports_bad_items(client):
+    items = [
+        {"code": LOOP, "language": "C"},
+        {"code": 3},
+        "not an item",
+        {"code": LOOP, "language": "C"},
+    ]
+    response = client.post("/api/explain/batch", json={"items": items})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert len(results) == 4
+    assert "loops" in results[0]["explanation"]["summary"]
+    assert results[0] == results[3]
+    assert results[1] == {"error": "'code' must be a string"}
+    assert results[2] == {"error": "item must be an object"}
+
+
+@pytest.mark.parametrize("body", [b"not json", b'{"items": 3}'])
+def test_batch_bad_bodies(client, body):
+    assert client.post("/api/explain/batch", data=body).status_code == 400
+
+
+def test_batch_limits(client):
+    extensions = client.application.extensions
+    extensions["batch_explainer"].max_items = 2
+    items = [{"code": f"int v{n};"} for n in range(3)]
+    assert client.post("/api/explain/batch", json=items).status_code == 413
+    extensions["intake_limits"].max_body = 50
+    body = json.dumps([{"code": "x" * 100}]).encode()
+    assert client.post("/api/explain/batch", data=body).status_code == 413
+    response = client.post("/api/explain/batch", input_stream=io.BytesIO(body),
+                           environ_overrides={"wsgi.input_terminated": True})
+    assert response.status_code == 413
@@ -0,0 +1,128 @@
+import json
+import random
+
+import pytest
+
+from cache import normalize_code
+from factory import ExplainEngine, create_app
+from incremental import EditError, IncrementalAnalyzer, ProgramTooLarge, UnknownBase
+from rules import get_rules
+
+PROGRAM = """#include <stdio.h>
+int main(void)
+{
+    int a[4] = {1, 2, 3, 4};
+    int total = 0;
+    for (int i = 0; i < 4; i++)
+        total += a[i];
+    printf("%d\\n", total);
+    return 0;
+}
+"""
+TYPED = ["/* open", "close */", "if (total > 3) total = 0;", 'puts("for");', "", "void f(void) { }"]
+
+
+@pytest.fixture
+def engine():
+    return ExplainEngine("mvp")
+
+
+def full(engine, lines):
+    code = normalize_code("\n".join(lines))
+    return get_rules().detector.detect(code, "C"), engine.explain(code, "C", "", "SDE")
+
+
+def test_submit_matches_full_analysis(engine):
+    analyzer = IncrementalAnalyzer(engine)
+    version, analysed = analyzer.submit(PROGRAM, "C")
+    concepts, explanation = full(engine, PROGRAM.split("\n"))
+    assert version.concepts() == concepts == ["loops", "arrays", "functions"]
+    assert analyzer.explain(version, "", "SDE") == explanation
+    assert analysed == len(PROGRAM.split("\n"))
+    assert analyzer.submit(PROGRAM, "C") == (version, 0)
+
+
+def test_edits_match_full_analysis(engine):
+    analyzer = IncrementalAnalyzer(engine)
+    lines = PROGRAM.split("\n")
+    version, _ = analyzer.submit(PROGRAM, "C")
+    rng = random.Random(5)
+    for _ in range(100):
+        start = rng.randrange(len(lines) + 1)
+        end = rng.randint(start, min(len(lines), start + 2))
+        new = rng.sample(TYPED, rng.randint(0, 2))
+        version, _ = analyzer.apply(version.id, [{"start": start, "end": end, "lines": new}])
+        lines[start:end] = new
+        concepts, explanation = full(engine, lines)
+        assert version.concepts() == concepts
+        assert analyzer.explain(version, "", "SDE") == explanation
+
+
+def test_one_line_edit_reanalyses_one_line(engine):
+    analyzer = IncrementalAnalyzer(engine)
+    version, _ = analyzer.submit(PROGRAM, "C")
+    version, analysed = analyzer.apply(version.id, [{"start": 4, "end": 5, "lines": ["    int total = 1;"]}])
+    assert analysed == 1
+
+
+def test_bad_edits(engine):
+    analyzer = IncrementalAnalyzer(engine)
+    version, _ = analyzer.submit(PROGRAM, "C")
+    with pytest.raises(UnknownBase):
+        analyzer.apply("nope", [])
+    for edits in ("x", [{"start": 5, "end": 2}], [{"start": 0, "lines": [1]}],
+                  [{"start": 3}, {"start": 1}]):
+        with pytest.raises(EditError):
+            analyzer.apply(version.id, edits)
+
+
+def test_endpoint():
+    client = create_app("mvp").test_client()
+    first = client.post("/api/explain/incremental", json={"code": PROGRAM, "language": "C"})
+    assert first.status_code == 200
+    body = first.get_json()
+    assert body["signals"] == {"loops": 1, "arrays": 2, "functions": 1}
+
+    edit = {"start": 6, "end": 7, "lines": ["        if (a[i]) total += a[i];"]}
+    second = client.post("/api/explain/incremental", json={"base": body["version"], "edits": [edit]})
+    assert second.status_code == 200
+    assert second.get_json()["signals"] == {"loops": 1, "arrays": 2, "functions": 1, "conditions": 1}
+
+    assert client.post("/api/explain/incremental", json={"base": "gone", "edits": []}).status_code == 409
+    assert client.post("/api/explain/incremental", data="[]").status_code == 400
+
+
+def test_programs_over_max_chars_are_refused(engine):
+    analyzer = IncrementalAnalyzer(engine, max_chars=len(PROGRAM))
+    version, _ = analyzer.submit(PROGRAM, "C")
+    with pytest.raises(ProgramTooLarge):
+        analyzer.submit(PROGRAM + "x", "C")
+    analyzer.max_chars = version.chars
+    with pytest.raises(ProgramTooLarge):
+        analyzer.apply(version.id, [{"start": 0, "end": 0, "lines": ["int grown;"]}])
+    # Shrinking edits are fine.
+    analyzer.apply(version.id, [{"start": 0, "end": 1, "lines": []}])
+    assert analyzer.stats()["too_large"] == 2
+
+
+def test_lines_held_are_capped(engine):
+    size = len(PROGRAM.split("\n"))
+    analyzer = IncrementalAnalyzer(engine, max_lines=3 * size)
+    version, _ = analyzer.submit(PROGRAM, "C")
+    for number in range(10):
+        version, _ = analyzer.apply(version.id, [{"start": 0, "end": 1, "lines": [f"int v{number};"]}])
+    stats = analyzer.stats()
+    assert stats["versions"] == 3
+    assert stats["lines_held"] == 3 * size
+
+
+def test_endpoint_limits():
+    app = create_app("mvp")
+    client = app.test_client()
+    app.extensions["intake_limits"].max_body = 200
+    body = json.dumps({"code": "x" * 300}).encode()
+    assert client.post("/api/explain/incremental", data=body).status_code == 413
+    app.extensions["incremental"].max_chars = 10
+    response = client.post("/api/explain/incremental", json={"code": "int a, b, c;"})
+    assert response.status_code == 413
+    assert "/api/explain" in response.get_json()["error"]
@@ -0,0 +1,41 @@
+import json
+
+import ingest
+from batch import BatchExplainer
+from factory import create_app
+
+MANUAL = "# Lab 1: Loops\n\n## Experiment 1: Sum\n\n```c\nfor (int i = 0; i < n; i++) s += i;\n```\n"
+
+
+def _ingester(out_dir):
+    app = create_app("mvp")
+    explainer = BatchExplainer.from_env(
+        app.extensions["explain_engine"].explain, app.extensions["explain_cache"]
+    )
+    return ingest.Ingester(str(out_dir), explainer)
+
+
+def test_malformed_manual_fails_alone(tmp_path, monkeypatch):
+    manuals = tmp_path / "manuals"
+    manuals.mkdir()
+    (manuals / "good.md").write_text(MANUAL)
+    (manuals / "bad.md").write_text(MANUAL)
+    parse_manual = ingest.parse_manual
+
+    def fragile(path, language="C"):
+        if path.endswith("bad.md"):
+            raise ValueError("unbalanced fence")
+        return parse_manual(path, language)
+
+    monkeypatch.setattr(ingest, "parse_manual", fragile)
+    out = tmp_path / "labs"
+    ingester = _ingester(out)
+    try:
+        counts = ingester.run([str(manuals)])
+    finally:
+        ingester.explainer.shutdown()
+
+    assert counts["failed"] == 1
+    assert counts["ingested"] == 1
+    manifest = json.loads((out / "manifest.json").read_text())
+    assert [entry["lab"] for entry in manifest["files"].values()] == ["good.json"]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from intake import BodyTooLarge, IntakeLimits, SubmissionError, SubmissionReader
+
+
+def read(body, limits=None, chunk=7):
+    reader = SubmissionReader(limits or IntakeLimits())
+    for start in range(0, len(body), chunk):
+        reader.feed(body[start:start + chunk])
+    return reader.close()
+
+
+def test_small_body_is_parsed_whole():
+    body = json.dumps({"code": "int x;", "language": "Java", "job_role": "SDE"}).encode()
+    submission = read(body)
+    assert (submission.code, submission.language, submission.concept, submission.job_role) == (
+        "int x;", "Java", "", "SDE")
+    assert submission.sampled is None
+
+
+def test_defaults_when_fields_are_missing():
+    submission = read(b"{}")
+    assert (submission.code, submission.language) == ("", "C")
+
+
+@pytest.mark.parametrize("body", [b"not json", b"[1, 2]", b'{"code": 3}', b'{"language": null}'])
+def test_bad_bodies_are_refused(body):
+    with pytest.raises(SubmissionError) as info:
+        read(body)
+    assert info.value.status == 400
+
+
+def test_body_over_max_body_is_refused():
+    limits = IntakeLimits(max_body=100)
+    with pytest.raises(BodyTooLarge) as info:
+        read(json.dumps({"code": "x" * 200}).encode(), limits)
+    assert info.value.status == 413
+
+
+def test_large_code_is_sampled():
+    limits = IntakeLimits(sample_threshold=1000, sample_chars=200)
+    lines = [f"line {i} é \"q\"" for i in range(500)]
+    code = "\n".join(lines)
+    body = json.dumps({"code": code, "language": "Python"}).encode()
+    submission = read(body, limits, chunk=64)
+
+    assert submission.code is None
+    assert submission.language == "Python"
+    assert submission.num_lines == len(lines)
+    assert submission.sampled["total_chars"] == len(code)
+    assert code.startswith(submission.prefix)
+    assert code.endswith(submission.suffix)
+    assert len(submission.prefix) <= 200 and len(submission.suffix) <= 200
+
+
+def test_sampled_fields_after_code_are_read():
+    limits = IntakeLimits(sample_threshold=100, sample_chars=50)
+    body = json.dumps({"code": "a = 1\n" * 100, "job_role": "Data"}).encode()
+    assert read(body, limits).job_role == "Data"
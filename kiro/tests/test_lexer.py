@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from lexer import Lexer, iter_code, iter_tokens
+
+
+def code_of(text, language):
+    return " ".join(iter_code(text, language))
+
+
+@pytest.mark.parametrize("language, text", [
+    ("C", 'int a; // for\n/* if */ b = "while"; c = \'[\';\n'),
+    ("Java", 'String s = """\nfor if\n"""; // while\nint a;\n'),
+    ("Python", 'x = """for\nif""" # while\ny = \'[\'\n'),
+    ("C++", 'auto s = R"d(for " if)d"; int z;\n'),
+])
+def test_comments_and_strings_are_not_code(language, text):
+    code = code_of(text, language)
+    for word in ("for", "if", "while", "["):
+        assert word not in code
+    assert code.split()[:1] == text.split()[:1]
+
+
+def test_unterminated_constructs_end_the_code():
+    assert code_of("a; /* never closed\nfor (;;) {}\n", "C").split() == ["a;"]
+    assert code_of('a = "open\nb = 2\n', "C").split() == ["a", "=", "b", "=", "2"]
+
+
+def test_unknown_language_lexes_as_c():
+    assert code_of("a // b\n", "Brainfuck").split() == ["a"]
+
+
+def test_tokens():
+    assert list(iter_tokens("x1 = 3.5 + y; // c", "C")) == [
+        ("word", "x1"), ("punct", "="), ("number", "3.5"), ("punct", "+"),
+        ("word", "y"), ("punct", ";"),
+    ]
+
+
+def test_chunked_feed_matches_whole_text():
+    rng = random.Random(3)
+    pieces = ["int a;", "/*", "*/", "//", '"', "'", "\\", "\n", "for", " ", "x[1]"]
+    for _ in range(200):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+        whole = "".join(Lexer("C").segments(text))
+        lexer = Lexer("C")
+        parts = []
+        pos = 0
+        while pos < len(text):
+            size = rng.randint(1, 8)
+            parts.extend(lexer.feed(text[pos:pos + size]))
+            pos += size
+        parts.extend(lexer.close())
+        assert "".join(parts) == whole
+
+
+def test_state_resumes_between_lines():
+    lexer = Lexer("C")
+    assert "".join(lexer.feed("a /* b\n")) == "a "
+    assert not lexer.in_code
+    state = lexer.state
+
+    resumed = Lexer("C")
+    resumed.resume(state)
+    assert "".join(resumed.feed("still comment */ c\n")) == " c\n"
+    assert resumed.state is None
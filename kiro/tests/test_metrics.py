@@ -0,0 +1,48 @@
+import re
+
+from factory import create_app
+
+BODY = {"code": "for (;;) {}", "language": "C", "job_role": "free text"}
+
+
+def sample(text, name, **labels):
+    """The value of one sample in Prometheus text output, or None."""
+    for line in text.splitlines():
+        match = re.match(rf"{name}\{{(.*)\}} (\S+)$", line)
+        if match and all(f'{key}="{value}"' in match.group(1) for key, value in labels.items()):
+            return float(match.group(2))
+    return None
+
+
+def test_metrics_count_outcomes_and_stages():
+    client = create_app("mvp").test_client()
+    first = client.post("/api/explain", json=BODY)
+    client.post("/api/explain", json=BODY)
+    client.post("/api/explain", json=BODY, headers={"If-None-Match": first.headers["ETag"]})
+    client.post("/api/explain", json=dict(BODY, language="Cobol"))
+    client.post("/api/explain", data=b"not json")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    text = response.get_data(as_text=True)
+    requests = "labcode_explain_requests_total"
+    # Free-text labels are folded into "other".
+    assert sample(text, requests, language="C", job_role="other", outcome="miss") == 1
+    assert sample(text, requests, language="C", job_role="other", outcome="hit") == 1
+    assert sample(text, requests, language="C", job_role="other", outcome="not_modified") == 1
+    assert sample(text, requests, language="other", outcome="miss") == 1
+    assert sample(text, requests, outcome="error") == 1
+    assert "free text" not in text and "Cobol" not in text
+    # Only the miss detected and built; only the 304 revalidated.
+    stages = "labcode_explain_stage_seconds_count"
+    assert sample(text, stages, language="C", stage="detect") == 1
+    assert sample(text, stages, language="C", stage="build") == 1
+    assert sample(text, stages, language="C", stage="revalidate") == 1
+
+
+def test_metrics_disabled(monkeypatch):
+    monkeypatch.setenv("LABCODE_METRICS", "0")
+    client = create_app("mvp").test_client()
+    assert client.post("/api/explain", json=BODY).status_code == 200
+    assert client.get("/metrics").status_code == 404
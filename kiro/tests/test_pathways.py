@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from factory import create_app
+from pathways import ConceptGraph, GraphError
+
+NODES = [
+    {"name": "basics", "kind": "concept", "difficulty": "easy", "weeks": 1, "requires": []},
+    {"name": "loops", "kind": "concept", "difficulty": "easy", "weeks": 1, "requires": ["basics"]},
+    {"name": "functions", "kind": "concept", "difficulty": "easy", "weeks": 1, "requires": ["basics"]},
+    {"name": "arrays", "kind": "concept", "difficulty": "easy", "weeks": 2, "requires": ["loops"]},
+    {"name": "recursion", "kind": "concept", "difficulty": "medium", "weeks": 4, "requires": ["functions"]},
+    {"name": "Algorithms", "kind": "course", "difficulty": "hard", "weeks": 14,
+     "requires": ["arrays", "recursion"]},
+]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps({"nodes": NODES}))
+    monkeypatch.setenv("LABCODE_CONCEPT_GRAPH", str(path))
+    return create_app("mvp").test_client()
+
+
+def names(nodes):
+    return [node["name"] for node in nodes]
+
+
+def test_pathways(client):
+    response = client.get("/api/pathways?concept=Arrays&known=basics")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["concept"]["name"] == "arrays"
+    assert names(body["prerequisites"]) == ["basics", "loops"]
+    assert names(body["courses"]) == ["Algorithms"]
+    assert body["leads_to"] == []
+    assert body["position"] == {"known": 1, "total": 2, "remaining": ["loops"], "remaining_weeks": 1}
+
+
+def test_quickest_path(client):
+    body = client.get("/api/pathways/path?from=basics&to=Algorithms").get_json()
+    # Through arrays (1 + 2 weeks) rather than recursion (1 + 4).
+    assert names(body["path"]) == ["basics", "loops", "arrays", "Algorithms"]
+    assert body["weeks"] == 1 + 2 + 14
+    unreachable = client.get("/api/pathways/path?from=arrays&to=recursion")
+    assert unreachable.status_code == 404
+    assert "does not build on" in unreachable.get_json()["error"]
+
+
+@pytest.mark.parametrize("url, status", [
+    ("/api/pathways", 400),
+    ("/api/pathways?concept=nope", 404),
+    ("/api/pathways?concept=arrays&known=nope", 404),
+    ("/api/pathways/path?from=basics", 400),
+    ("/api/pathways/path?from=nope&to=arrays", 404),
+])
+def test_pathway_errors(client, url, status):
+    assert client.get(url).status_code == status
+
+
+def test_pathways_disabled(monkeypatch):
+    monkeypatch.setenv("LABCODE_CONCEPT_GRAPH", "none")
+    client = create_app("mvp").test_client()
+    assert client.get("/api/pathways?concept=loops").status_code == 503
+    assert client.get("/api/pathways/path?from=a&to=b").status_code == 503
+
+
+@pytest.mark.parametrize("nodes, message", [
+    ([{"name": "a", "requires": ["b"]}, {"name": "b", "requires": ["a"]}], "cycle"),
+    ([{"name": "a", "requires": ["zz"]}], "unknown node"),
+    ([{"name": "a"}, {"name": "A"}], "duplicate"),
+])
+def test_bad_graphs(nodes, message):
+    with pytest.raises(GraphError, match=message):
+        ConceptGraph(nodes)
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from factory import create_app
+from practice import CatalogError, PracticeCatalog
+
+PROBLEMS = [
+    {"id": "a1", "title": "A1", "platform": "A", "difficulty": "easy", "concepts": ["loops"], "score": 90},
+    {"id": "a2", "title": "A2", "platform": "A", "difficulty": "easy", "concepts": ["loops"], "score": 80},
+    {"id": "b1", "title": "B1", "platform": "B", "difficulty": "easy", "concepts": ["loops"], "score": 10},
+    {"id": "a3", "title": "A3", "platform": "A", "difficulty": "medium", "concepts": "loops;arrays",
+     "score": 70},
+    {"id": "a4", "title": "A4", "platform": "A", "difficulty": "hard", "concepts": ["arrays"], "score": 5},
+]
+
+
+@pytest.fixture
+def client():
+    return create_app("mvp").test_client()
+
+
+def test_difficulty_ladder_spreads_platforms():
+    catalog = PracticeCatalog(PROBLEMS)
+    # Easy then medium; the second easy pick goes to the unused platform B.
+    assert [p["id"] for p in catalog.top_k("Loops", 4)] == ["a1", "a3", "b1", "a2"]
+    assert [p["id"] for p in catalog.top_k("loops", 5, ("easy",))] == ["a1", "b1", "a2"]
+    assert catalog.count("loops") == 4
+    assert catalog.count("arrays", "hard") == 1
+    assert catalog.top_k("nothing") == []
+
+
+def test_bad_catalog_rows():
+    with pytest.raises(CatalogError, match="problem 0"):
+        PracticeCatalog([{"title": "x", "platform": "A", "difficulty": "trivial", "concepts": []}])
+    with pytest.raises(CatalogError):
+        PracticeCatalog([{"platform": "A", "difficulty": "easy", "concepts": []}])
+
+
+def test_catalog_files(tmp_path):
+    path = tmp_path / "problems.json"
+    path.write_text(json.dumps({"problems": PROBLEMS}))
+    assert len(PracticeCatalog.from_file(str(path))) == len(PROBLEMS)
+    csv_path = tmp_path / "problems.csv"
+    csv_path.write_text("id,title,platform,difficulty,concepts,score\nc1,C1,C,easy,loops;arrays,3\n")
+    catalog = PracticeCatalog.from_file(str(csv_path))
+    assert catalog.concepts == ["arrays", "loops"]
+    path.write_text("{")
+    with pytest.raises(CatalogError, match="invalid JSON"):
+        PracticeCatalog.from_file(str(path))
+
+
+def test_practice_endpoint(client):
+    response = client.get("/api/practice?concept=loops&k=2&difficulty=easy")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["concept"] == "loops"
+    assert len(body["problems"]) == 2
+    assert {p["difficulty"] for p in body["problems"]} == {"easy"}
+    assert body["available"] >= 2
+    assert client.get("/api/practice?concept=unheard-of").get_json()["problems"] == []
+
+
+@pytest.mark.parametrize("query", ["k=0", "k=51", "k=x", "difficulty=trivial"])
+def test_practice_bad_queries(client, query):
+    assert client.get(f"/api/practice?concept=loops&{query}").status_code == 400
@@ -0,0 +1,73 @@
+import pstats
+
+import pytest
+
+from factory import create_app
+
+BODY = {"code": "for (;;) {}", "language": "C"}
+FORCE = {"X-Profile": "1"}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABCODE_PROFILE_DIR", str(tmp_path))
+    return create_app("mvp").test_client()
+
+
+def test_off_by_default(client):
+    response = client.post("/api/explain", json=BODY)
+    assert "Server-Timing" not in response.headers
+    assert client.get("/api/admin/profiles").get_json() == {"profiles": []}
+
+
+def test_forced_profile_is_kept_and_served(client, tmp_path):
+    response = client.post("/api/explain", json=BODY, headers=FORCE)
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert "parse;dur=" in timing and "total;dur=" in timing
+
+    (profile,) = client.get("/api/admin/profiles?top=5").get_json()["profiles"]
+    assert profile["forced"] and profile["status"] == 200
+    assert 0 < len(profile["top"]) <= 5
+    download = client.get(f"/api/admin/profiles/{profile['name']}")
+    assert download.status_code == 200
+    path = tmp_path / "download.prof"
+    path.write_bytes(download.data)
+    assert pstats.Stats(str(path)).total_calls > 0
+    assert client.get("/api/admin/profiles/nope").status_code == 404
+    assert client.get("/api/admin/profiles/..%2Fsecret").status_code == 404
+
+
+def test_settings_and_rotation(client):
+    response = client.post("/api/admin/profiling", json={"enabled": True, "sample": 1})
+    assert response.get_json()["enabled"] is True
+    client.application.extensions["request_profiler"].keep = 2
+    for number in range(4):
+        assert "Server-Timing" in client.post("/api/explain", json={"code": f"int v{number};"}).headers
+    stats = client.get("/api/admin/profiling").get_json()
+    assert stats["profiled"] == 4
+    assert len(client.get("/api/admin/profiles").get_json()["profiles"]) == 2
+
+
+def test_busy_profiler_is_skipped(client):
+    profiler = client.application.extensions["request_profiler"]
+    with profiler._busy:  # another request is being profiled
+        response = client.post("/api/explain", json=BODY, headers=FORCE)
+    assert "Server-Timing" in response.headers
+    stats = profiler.stats()
+    assert (stats["profiled"], stats["skipped_busy"]) == (0, 1)
+
+
+@pytest.mark.parametrize("body", [[], {"enabled": "yes"}, {"sample": 2}, {"sample": True}])
+def test_bad_settings(client, body):
+    assert client.post("/api/admin/profiling", json=body).status_code == 400
+
+
+def test_admin_token_is_required(client, monkeypatch):
+    monkeypatch.setenv("LABCODE_ADMIN_TOKEN", "secret")
+    response = client.post("/api/explain", json=BODY, headers=FORCE)
+    assert "Server-Timing" not in response.headers
+    assert client.get("/api/admin/profiles").status_code == 403
+    assert client.post("/api/admin/profiling", json={"enabled": True}).status_code == 403
+    allowed = client.get("/api/admin/profiles", headers={"X-Admin-Token": "secret"})
+    assert allowed.status_code == 200
@@ -0,0 +1,53 @@
+import pytest
+
+from factory import create_app
+
+pytest.importorskip("numpy")
+
+LOOP = "int s = 0;\nfor (int i = 0; i < n; i++)\n    s += a[i];\n"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABCODE_PROGRESS_DIR", str(tmp_path))
+    return create_app("mvp").test_client()
+
+
+def test_explanations_and_practice_build_mastery(client):
+    ana = {"X-Student-Id": "ana"}
+    assert client.post("/api/explain", json={"code": LOOP, "language": "C"}, headers=ana).status_code == 200
+    response = client.post("/api/progress/ana/practice", json={"concept": "Loops", "accuracy": 50})
+    assert response.status_code == 201
+    assert response.get_json() == {"recorded": 1}
+
+    mastery = {item["concept"]: item for item in client.get("/api/progress/ana").get_json()["mastery"]}
+    assert mastery["loops"]["events"] == 2
+    assert 0 < mastery["loops"]["level"] < 100
+    stats = client.get("/api/admin/progress").get_json()
+    assert stats["students"] == 1
+    assert client.post("/api/admin/progress/refresh").get_json()["snapshot_events"] == stats["events"]
+
+
+def test_revalidated_explanations_are_still_recorded(client):
+    ana = {"X-Student-Id": "ana"}
+    first = client.post("/api/explain", json={"code": LOOP, "language": "C"}, headers=ana)
+    again = client.post("/api/explain", json={"code": LOOP, "language": "C"},
+                        headers=dict(ana, **{"If-None-Match": first.headers["ETag"]}))
+    assert again.status_code == 304
+    mastery = client.get("/api/progress/ana").get_json()["mastery"]
+    assert {item["concept"]: item["events"] for item in mastery}["loops"] == 2
+
+
+def test_progress_errors(client):
+    assert client.get("/api/progress/nobody").status_code == 404
+    bad_id = client.post("/api/explain", json={"code": LOOP}, headers={"X-Student-Id": "a b"})
+    assert bad_id.status_code == 400
+    for body in ([], {"concepts": []}, {"concept": "loops", "accuracy": 101}, {"concept": "x\ny"}):
+        assert client.post("/api/progress/ana/practice", json=body).status_code == 400
+
+
+def test_progress_disabled():
+    client = create_app("mvp").test_client()
+    assert client.get("/api/progress/ana").status_code == 503
+    assert client.post("/api/progress/ana/practice", json={"concept": "loops"}).status_code == 503
+    assert client.get("/api/admin/progress").status_code == 503
@@ -0,0 +1,61 @@
+import io
+import json
+
+import pytest
+
+from factory import create_app
+
+pytest.importorskip("numpy")
+
+LOOP = "int s = 0;\nfor (int i = 0; i < n; i++) {\n    s += a[i] * 2;\n}\nprintf(\"%d\", s);\n"
+
+
+@pytest.fixture
+def client():
+    return create_app("mvp").test_client()
+
+
+def test_lone_surrogate_is_explained_and_indexed(client):
+    # json.loads turns the escape into a lone surrogate, which strict UTF-8
+    # encoding refuses.
+    body = b'{"code": "int x = 1; \\ud800 y;\\nfor (;;) {}", "language": "C"}'
+    response = client.post("/api/explain", data=body, content_type="application/json")
+    assert response.status_code == 200
+    assert "X-Submission-Id" in response.headers
+    similar = client.post("/api/similar", data=body)
+    assert similar.status_code == 200
+
+
+def test_similar_submissions(client):
+    first = client.post("/api/explain", json={"code": LOOP, "language": "C"})
+    submission_id = first.headers["X-Submission-Id"]
+    client.post("/api/explain", json={"code": "x = 1\nprint(x)\n", "language": "Python"})
+
+    edited = LOOP.replace("s += a[i] * 2;", "s += a[i] * 3;")
+    response = client.post("/api/similar", json={"code": edited, "language": "C", "k": 2})
+    assert response.status_code == 200
+    matches = response.get_json()["matches"]
+    assert matches[0]["id"] == submission_id
+
+    assert client.get(f"/api/similar/{submission_id}").status_code == 200
+    assert client.get("/api/similar/nope-1").status_code == 404
+
+
+@pytest.mark.parametrize("body, status", [
+    (b"[1]", 400),
+    (b"not json", 400),
+    (json.dumps({"code": 3}).encode(), 400),
+    (json.dumps({"code": "x", "k": 0}).encode(), 400),
+])
+def test_similar_bad_requests(client, body, status):
+    assert client.post("/api/similar", data=body).status_code == status
+
+
+def test_similar_body_is_bounded(client):
+    client.application.extensions["intake_limits"].max_body = 100
+    body = json.dumps({"code": "x" * 200}).encode()
+    assert client.post("/api/similar", data=body).status_code == 413
+    # Without Content-Length only limit + 1 bytes are read.
+    response = client.post("/api/similar", input_stream=io.BytesIO(body),
+                           environ_overrides={"wsgi.input_terminated": True})
+    assert response.status_code == 413